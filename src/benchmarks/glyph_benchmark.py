@@ -0,0 +1,59 @@
+"""Throughput benchmark for drawing note glyphs on exported pages
+
+Run from src directory: python -m benchmarks.glyph_benchmark [notes] [rounds]
+"""
+import sys
+import random
+from time import perf_counter
+from PIL import Image, ImageDraw, ImageFont
+import config.shaku_constants as consts
+from services.conversions import GraphicsConverter
+from services.glyph_cache import GlyphCache
+
+def random_glyphs(note_count: int, seed: int=0):
+    """Create (position, text) -pairs of random notes spread on an exported page"""
+    rnd = random.Random(seed)
+    width, height = consts.EXPORT_SHEET_SIZE
+    codes = list(consts.NOTE_TEXT_CODES.values())
+    return [
+        ((rnd.randrange(0, width - 100), rnd.randrange(0, height - 100)), rnd.choice(codes))
+        for _ in range(note_count)
+        ]
+
+def _best_rate(draw_notes, note_count: int, rounds: int):
+    best = None
+    for _ in range(rounds):
+        image = Image.new("RGB", consts.EXPORT_SHEET_SIZE, (255, 255, 255))
+        start = perf_counter()
+        draw_notes(image)
+        elapsed = perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return note_count / best
+
+def run(note_count: int=5000, rounds: int=5):
+    """Time drawing notes with ImageDraw.text and with GlyphCache
+
+    Returns:
+        (text, cached) -tuple of notes per second of the best round
+    """
+    font_size = GraphicsConverter().scale(consts.SHEET_NOTE_SIZE) + consts.EXPORT_NOTE_FONT_SIZE_INCREMENT
+    font = ImageFont.truetype(consts.NOTE_FONT, font_size)
+    glyphs = random_glyphs(note_count)
+    cache = GlyphCache()
+
+    def draw_text(image):
+        draft = ImageDraw.Draw(image)
+        for position, text in glyphs:
+            draft.text(position, text, font=font, anchor="lt", fill=consts.NOTE_COLOR)
+
+    def draw_cached(image):
+        for position, text in glyphs:
+            cache.paste(image, position, text, font, consts.NOTE_COLOR)
+
+    return _best_rate(draw_text, note_count, rounds), _best_rate(draw_cached, note_count, rounds)
+
+if __name__ == "__main__":
+    arguments = [int(argument) for argument in sys.argv[1:3]]
+    text, cached = run(*arguments)
+    print(f"ImageDraw.text: {text:.0f} notes per second")
+    print(f"GlyphCache: {cached:.0f} notes per second")
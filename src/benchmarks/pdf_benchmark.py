@@ -0,0 +1,51 @@
+"""Benchmark of raster and vector PDF export
+
+Run from src directory: python -m benchmarks.pdf_benchmark [pages] [rounds]
+"""
+import os
+import sys
+from time import perf_counter
+from entities.shaku_music import ShakuMusic
+from services.image_creator import ImageCreator
+from services.pdf_creator import PdfCreator
+from benchmarks.rhythm_benchmark import random_part
+
+def random_music(page_count: int):
+    """Create music of two random parts, filling about given count of pages"""
+    music = ShakuMusic()
+    for part_no in (1, 2):
+        music.add_part(part_no)
+        part = random_part(page_count * 106, seed=part_no)
+        for note in part.notes:
+            music.parts[part_no].add_note(note.pitch, note.lenght)
+    return music
+
+def _best(export, rounds: int):
+    best = None
+    for _ in range(rounds):
+        start = perf_counter()
+        size = export()
+        elapsed = perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, size
+
+def run(page_count: int=20, rounds: int=3):
+    """Time exporting music as raster and as vector PDF
+
+    Returns:
+        Dictionary mapping backend names to (count of pages, seconds of best round, bytes) -tuples
+    """
+    os.environ.setdefault("MODE", "Tozan")
+    os.environ.setdefault("MEASURE_LENGHT", "2")
+    music = random_music(page_count)
+    image_creator = ImageCreator(workers=1)
+    pdf_creator = PdfCreator()
+    pages = image_creator.page_count(music)
+    raster = _best(lambda: sum(len(page) for page in image_creator.export_pages(music, True).values()), rounds)
+    vector = _best(lambda: len(pdf_creator.create_pdf(music, True)), rounds)
+    return {"raster": (pages,) + raster, "vector": (pages,) + vector}
+
+if __name__ == "__main__":
+    arguments = [int(argument) for argument in sys.argv[1:3]]
+    for backend, (pages, seconds, size) in run(*arguments).items():
+        print(f"{backend}: {pages} pages in {seconds:.2f} s, {size / 1000:.0f} kB")
@@ -0,0 +1,53 @@
+"""Throughput benchmark for Tozan rhythm notation
+
+Run from src directory: python -m benchmarks.rhythm_benchmark [notes] [rounds]
+"""
+import os
+import sys
+import random
+from time import perf_counter
+from entities.shaku_part import ShakuPart
+from services.layout_cache import LayoutCache
+from services.layout_context import LayoutContext
+from services.time_notation import ShakuRhythmNotation
+
+def random_part(note_count: int, seed: int=0):
+    """Create a part of random notes and breaks"""
+    rnd = random.Random(seed)
+    part = ShakuPart(1)
+    for _ in range(note_count):
+        if rnd.random() < 0.1:
+            part.add_note(-1, rnd.choice([4, 8, 16]))
+        else:
+            part.add_note(rnd.randint(0, 20), rnd.choice([2, 4, 6, 8, 12, 16]))
+    return part
+
+def run(note_count: int=20000, rounds: int=5):
+    """Time rhythm notation of a random part, page by page as the UI and exporters do
+
+    Returns:
+        Measures per second of the best round
+    """
+    os.environ.setdefault("MODE", "Tozan")
+    os.environ.setdefault("MEASURE_LENGHT", "2")
+    context = LayoutContext(2, int(os.getenv("MEASURE_LENGHT")), "Tozan")
+    part = random_part(note_count)
+    layout = LayoutCache().get_layout(part, context)
+    pages = [
+        (part.pitches[start:end], part.lenghts[start:end], layout.coordinates(start, end))
+        for page, start, end in layout.page_ranges()
+        ]
+    rhy = ShakuRhythmNotation(context)
+    measures = part.total_duration / context.measure_duration
+    best = None
+    for _ in range(rounds):
+        start = perf_counter()
+        for pitches, lenghts, positions in pages:
+            rhy.tozan_rhytms(pitches, lenghts, positions)
+        elapsed = perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return measures / best
+
+if __name__ == "__main__":
+    arguments = [int(argument) for argument in sys.argv[1:3]]
+    print(f"{run(*arguments):.0f} measures per second")
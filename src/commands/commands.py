@@ -1,10 +1,10 @@
 import os
-import pygame
 from services.filing import FileManager
 from services.image_creator import ImageCreator
+from services.pdf_creator import PdfCreator
 from services.svg_creator import SvgCreator
+from services.export_cache import ExportCache
 from services.midi_creator import MidiCreator
-from services.conversions import MusicConverter
 from services.music_player import MusicPlayer
 from ui.messages import ShakuMessage, ShakuConfigMenu
 from ui.ui import UI
@@ -15,6 +15,7 @@ class Commands:
     def __init__(self, main_ui: UI):
         self._main_ui = main_ui
         self._shaku_filename = None
+        self._export_cache = ExportCache()
 
     def set_properties(self, music: ShakuMusic, ui: UI):
         ui.messages.append(ShakuConfigMenu(ui, self))
@@ -64,15 +65,33 @@ class Commands:
 
     def export_pdf(self, music: ShakuMusic, grid_option):
         filemanager = FileManager()
-        image_creator = ImageCreator()
-        images = image_creator.create_images(music, grid_option)
-        filemanager.save_pdf(images)
+        if os.getenv("EXPORT_PDF_BACKEND", "raster") == "vector":
+            pdf_creator = PdfCreator(self._main_ui.display_lists, cache=self._export_cache)
+            filemanager.save_pdf(pdf_creator.create_pdf(music, grid_option))
+            return
+        image_creator = ImageCreator(self._main_ui.display_lists, cache=self._export_cache)
+        page_count = image_creator.page_count(music)
+        pages = image_creator.iter_pages(music, grid_option)
+        try:
+            filemanager.save_pdf(
+                pages,
+                lambda page: self._main_ui.show_progress(consts.MESSAGE_EXPORT_PROGRESS.format(page, page_count))
+                )
+        finally:
+            self._main_ui.show_progress()
 
     def export_svg(self, music: ShakuMusic, grid_option):
         filemanager = FileManager()
-        svg_creator = SvgCreator()
-        svgs = svg_creator.create_svg(music, grid_option)
-        filemanager.save_svg(svgs)
+        svg_creator = SvgCreator(self._main_ui.display_lists, cache=self._export_cache)
+        page_count = svg_creator.page_count(music)
+        svgs = svg_creator.iter_writers(music, grid_option)
+        try:
+            filemanager.save_svg(
+                svgs,
+                lambda page: self._main_ui.show_progress(consts.MESSAGE_EXPORT_PROGRESS.format(page, page_count))
+                )
+        finally:
+            self._main_ui.show_progress()
 
     def export_midi(self, music: ShakuMusic):
         filemanager = FileManager()
@@ -84,15 +103,13 @@ class Commands:
 
     def save_wav(self, music: ShakuMusic):
         filemanager = FileManager()
-        creator = MidiCreator()
-        converter = MusicConverter()
-        for part in music.parts.values():
-            creator.create_track(part)
-        midi = creator.generate_midi()
-        tmp_filename = "shakutmp"
-        filename = filemanager.save_midi(midi)
-        converter.convert(filename, filename[:-4] + " .wav")
-        os.remove(filename)
+        engine = self._main_ui.audio_engine
+        filemanager.save_wav(engine.render(music.parts.values()), engine.sample_rate)
+
+    def export_stems(self, music: ShakuMusic):
+        filemanager = FileManager()
+        engine = self._main_ui.audio_engine
+        filemanager.save_stems(engine.render_stems(music.parts.values()), engine.sample_rate)
 
     def upload_to_aws_s3(self, music: ShakuMusic):
         filemanager = FileManager()
@@ -124,8 +141,8 @@ class Commands:
         return i
 
     def play_music(self, music: ShakuMusic):
-        player = MusicPlayer()
-        if pygame.mixer.music.get_busy():
-            pygame.mixer.music.stop()
+        player = MusicPlayer(self._main_ui.audio_engine, self._main_ui.window.after)
+        if player.playing:
+            player.stop()
         else:
             player.play(music.parts.values())
@@ -69,6 +69,8 @@ EXPORT_NOTE_FONT_SIZE_INCREMENT = 20
 
 EXPORT_NOTE_CORRECTION_ON_X_AXIS = -10
 
+EXPORT_RENDERER_VERSION = 1 # part of cache keys of exported pages, increase whenever exported pages change
+
 NOTE_TO_RHYTM_SPACING = 16
 
 RHYTM_LINE2_TO_LINE1_SPACING = 4
@@ -159,6 +161,24 @@ OCTAVE_TEXT_CODES = {"Otsu": "B", "Kan": "N", "Daikan": "M"}
 
 
 
+# AUDIO :
+
+SOUND_FONT = "~/.fluidsynth/default_sound_font.sf2" # overridden by SOUND_FONT environment variable
+
+SAMPLE_RATE = 44100
+
+RELEASE_SECONDS = 1.5 # audio rendered after last note ends, for its release to fade out
+
+EFFECTS_FLUSH_SECONDS = 10 # most silence rendered before a render, for reverb and chorus of previous one to decay
+
+STREAM_CHUNK_BEATS = 8 # beats of music at least synthesized at a time while playing, chunks end where a note does
+
+STREAM_SYNTHESIZERS = 2 # most parts synthesized at the same time while playing, each synthesizer loads sound font again
+
+STREAM_POLL_INTERVAL = 100 # milliseconds between checks for queueing next chunk of played music
+
+
+
 # ALERT / ERROR MESSAGES :
 
 MESSAGE_PADDING = (50, 40)
@@ -192,4 +212,6 @@ MESSAGE_SUCCESFUL_UPLOAD = f"You have succesfully uploaded the composition to th
 
 MESSAGE_CONFIG_MENU_TITLE = "Set configurations / properties"
 
+MESSAGE_EXPORT_PROGRESS = "Exporting page {} / {}"
+
 MESSAGE_CONFIG_MENU_BODY = "Some basic settings - Shakunotator will keep your last settings as default"
@@ -1,5 +1,4 @@
 from entities.shaku_part import ShakuPart
-from entities.shaku_note import ShakuNote
 from entities.shaku_notation import ShakuNotation
 
 class ShakuMusic:
@@ -11,6 +10,7 @@ class ShakuMusic:
         parts: Dictionary mapping each part name to a ShakuPart -instance
         measure_lenght: lenght of each measure in the sheet music (1 unit = 2 quarter notes)
         spacing: Multiplier for spacing between each row of music per part
+        revision: changes whenever name, composer, spacing, parts or their notes change
     """
     def __init__(self):
         """Constructor, initializes class attributes"""
@@ -18,6 +18,7 @@ class ShakuMusic:
         self._composer = ""
         self._parts = {}
         self._spacing = 1
+        self._revision = 0
 
     @property
     def name(self):
@@ -29,6 +30,7 @@ class ShakuMusic:
         """Set composition name"""
         if len(name) + len(self._composer) < 50:
             self._name = name
+            self._revision += 1
         else:
             raise ValueError("Name & Composer combination too long")
 
@@ -42,6 +44,7 @@ class ShakuMusic:
         """Set composer name"""
         if len(composer) + len(self._name) < 50:
             self._composer = composer
+            self._revision += 1
         else:
             raise ValueError("Name & Composer combination too long")
 
@@ -60,9 +63,15 @@ class ShakuMusic:
         """Set spacing"""
         if spacing > 0:
             self._spacing = spacing
+            self._revision += 1
         else:
             raise ValueError("Spacing has to be a positive value")
 
+    @property
+    def revision(self):
+        """Get revision, a tuple that changes whenever music or notes of any part change"""
+        return (self._revision,) + tuple(part.revision for part in self._parts.values())
+
     def add_part(self, part_id: int):
         """Adds a new musical part into the composition if there is room
 
@@ -76,6 +85,7 @@ class ShakuMusic:
             raise ValueError(f"Part already exists for given id: {part_id}")
         self.spacing += 1
         self._parts[part_id] = ShakuPart(part_id)
+        self._revision += 1
 
     def data_correct(self, data):
         """Runs a check if loaded JSON contains correct high level values
@@ -111,10 +121,10 @@ class ShakuMusic:
                 "notations": [],
                 "notation_at_current_pos": part_data.notation_at_current_pos
             }
-            for note in part_data.notes:
+            for pitch, lenght in zip(part_data.pitches, part_data.lenghts):
                 data["parts"][part_n]["notes"].append({
-                    "pitch": note.pitch,
-                    "lenght": note.lenght,
+                    "pitch": pitch,
+                    "lenght": lenght,
                 })
             for notation in part_data.notations:
                 data["parts"][part_n]["notations"].append({
@@ -136,16 +146,13 @@ class ShakuMusic:
             part = self._parts[int(part_id)] = ShakuPart(
                 part_data["part_no"],
                 )
-            part.notation_at_current_pos = part_data["notation_at_current_pos"]
             for note in part_data["notes"]:
-                recovered_note = ShakuNote(
-                    int(note["pitch"]),
-                    int(note["lenght"])
-                    )
-                part.notes.append(recovered_note)
+                part.add_note(int(note["pitch"]), int(note["lenght"]))
+            part.notation_at_current_pos = part_data["notation_at_current_pos"]
             for notation in part_data["notations"]:
                 recovered_notation = ShakuNotation(
                     notation["type"],
                     notation["relative_note"]
                     )
                 part.notations.append(recovered_notation)
+        self._revision += 1
@@ -20,6 +20,11 @@ class ShakuNotation:
         """Get ID of note the notation is relative to"""
         return self._relative_note
 
+    @relative_note.setter
+    def relative_note(self, note_id: int):
+        """Set ID of note the notation is relative to"""
+        self._relative_note = note_id
+
     @property
     def notation_type(self):
         """Get notation type"""
@@ -5,6 +5,8 @@ class ShakuNote:
         pitch: note pitch on pentatonic scale, 0 representing the base note of the scale
         lenght: Relative duration of musical note depicted. Defaults to 8
     """
+    __slots__ = ("_pitch", "_lenght")
+
     def __init__(self, pitch: int, lenght: int):
         """Constructor, sets up attributes depicting a musical note
 
@@ -34,3 +36,61 @@ class ShakuNote:
     def lenght(self, lenght):
         """Set note lenght"""
         self._lenght = lenght
+
+class ShakuNoteView:
+    """Lightweight handle to a note stored inside a ShakuPart
+
+    The part keeps its notes as typed arrays, views are created on demand
+    and read / write straight through to the part's storage.
+
+    Attributes:
+        index: position of the note in its part
+        pitch: note pitch, 0 representing the base note of the scale
+        lenght: Relative duration of musical note depicted
+    """
+    __slots__ = ("_part", "_index")
+
+    def __init__(self, part, index: int):
+        """Constructor, binds view to a note slot of a part
+
+        Args:
+            part: ShakuPart instance holding the note
+            index: position of the note in the part
+        """
+        self._part = part
+        self._index = index
+
+    @property
+    def index(self):
+        """Get position of note in its part"""
+        return self._index
+
+    @property
+    def pitch(self):
+        """Get note pitch"""
+        return self._part.pitches[self._index]
+
+    @pitch.setter
+    def pitch(self, pitch):
+        """Set note pitch"""
+        self._part.edit_note(self._index, pitch=pitch)
+
+    @property
+    def lenght(self):
+        """Get note lenght"""
+        return self._part.lenghts[self._index]
+
+    @lenght.setter
+    def lenght(self, lenght):
+        """Set note lenght"""
+        self._part.edit_note(self._index, lenght=lenght)
+
+    def detach(self):
+        """Get a standalone ShakuNote copy of the viewed note"""
+        return ShakuNote(self.pitch, self.lenght)
+
+    def __copy__(self):
+        return self.detach()
+
+    def __deepcopy__(self, memo):
+        return self.detach()
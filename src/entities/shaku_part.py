@@ -1,29 +1,92 @@
-from entities.shaku_note import ShakuNote
+from array import array
+from bisect import bisect_right
+from collections.abc import Sequence
+from itertools import accumulate
+from weakref import WeakKeyDictionary
+from entities.shaku_note import ShakuNoteView
 from entities.shaku_notation import ShakuNotation
 
+class ShakuNotes(Sequence):
+    """Read-mostly sequence of the notes of a part, handing out ShakuNoteView -instances
+
+    Attributes:
+        part: ShakuPart instance whose notes are represented
+    """
+    def __init__(self, part):
+        """Constructor, binds sequence to a part
+
+        Args:
+            part: ShakuPart instance whose notes are represented
+        """
+        self._part = part
+
+    def __len__(self):
+        return len(self._part.pitches)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [ShakuNoteView(self._part, i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("note index out of range")
+        return ShakuNoteView(self._part, index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield ShakuNoteView(self._part, i)
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence) or len(other) != len(self):
+            return False
+        for note, other_note in zip(self, other):
+            if (note.pitch, note.lenght) != (other_note.pitch, other_note.lenght):
+                return False
+        return True
+
+    def __repr__(self):
+        pairs = ", ".join(f"({p}, {l})" for p, l in zip(self._part.pitches, self._part.lenghts))
+        return f"ShakuNotes([{pairs}])"
+
+    def append(self, note):
+        """Add a note to end of part
+
+        Args:
+            note: any object with pitch and lenght attributes (eg. ShakuNote)
+        """
+        self._part.add_note(note.pitch, note.lenght)
+
 class ShakuPart:
     """Class depicting a part in a multipartite or solo shakuhachi sheet music
 
+    Notes are stored column-wise in typed arrays (pitches and lenghts),
+    ShakuNoteView -instances are created on demand when notes are accessed one by one.
+    A cumulative duration index is kept up to date on every change so that the
+    duration until any note is a lookup instead of a sum. Caches built from the
+    notes can ask which notes have changed since they last looked (consume_changes).
+
     Attributes:
         part_no: number of part on musical notation sheet
-        notes: list of musical notes contained in part
+        notes: sequence of musical notes contained in part
+        pitches: pitch of each note in part (array, do not modify directly)
+        lenghts: lenght of each note in part (array, do not modify directly)
         notations: list of non-pitch, non-duration notations contained in part
-        start_x: x-axis for positioning first note of the part
-        measure_counter: value used in calculating note positioning with regards to musical measure
-        spacing: value depicting how much x-axis room to leave between rows of notes
-        rows: count of rows used on musical sheet by the part
         notation_at_current_pos: True if there is a notation related to next note position
+        revision: counter incremented on every change of notes or misc notations
     """
     def __init__(self, part_id: int):
         """Constructor, intializes class attributes
 
         Args:
             part_id: number of part on musical notation sheet
-            start_x: x-axis for positioning first note of the part
-            spacing: value depicting how much x-axis room to leave between rows of notes
         """
         self._part_no = part_id
-        self._notes = []
+        self._pitches = array("h")
+        self._lenghts = array("h")
+        self._durations = array("l", [0])
+        self._notes = ShakuNotes(self)
+        self._revision = 0
+        self._changes = WeakKeyDictionary()
         self._notations = []
         self._notation_at_current_pos = False
 
@@ -46,6 +109,7 @@ class ShakuPart:
     def notations(self, notations):
         """Set misc notations on part"""
         self._notations = notations
+        self._revision += 1
 
     @property
     def part_no(self):
@@ -57,10 +121,31 @@ class ShakuPart:
         """Get part notes"""
         return self._notes
 
+    @property
+    def pitches(self):
+        """Get pitches of part notes as an array"""
+        return self._pitches
+
+    @property
+    def lenghts(self):
+        """Get lenghts of part notes as an array"""
+        return self._lenghts
+
+    @property
+    def revision(self):
+        """Get revision counter of part notes and misc notations"""
+        return self._revision
+
+    @property
+    def total_duration(self):
+        """Get sum of lenghts of all notes in part"""
+        return self._durations[-1]
+
     def clear_pre_existing_notation(self):
         """Remove last notation if it is at end of the part where next note is to be inserted"""
         if self.notation_at_current_pos:
             self._notations.pop(-1)
+            self._revision += 1
 
     def append_misc_notation(self, notation_type: str):
         """Adds a notation next to the position where next note will be
@@ -71,9 +156,10 @@ class ShakuPart:
         Returns:
             Reference to inserted notation
         """
-        notation = ShakuNotation(notation_type, len(self.notes))
+        notation = ShakuNotation(notation_type, len(self._pitches))
         self._notations.append(notation)
         self._notation_at_current_pos = True
+        self._revision += 1
 
     def add_note(self, pitch: int, lenght: int):
         """Adds a note on part
@@ -81,20 +167,123 @@ class ShakuPart:
         Args:
             pitch: Note pitch
             lenght: Note lenght
+        """
+        self._pitches.append(pitch)
+        self._lenghts.append(lenght)
+        self._durations.append(self._durations[-1] + lenght)
+        self._notation_at_current_pos = False
+        self._mark_changed(len(self._lenghts) - 1)
+
+    def insert_note(self, note_id: int, pitch: int, lenght: int):
+        """Inserts a note in front of an existing note, notations of following notes move along with them
+
+        Args:
+            note_id: number of note the new note is placed in front of,
+                negative numbers count from end of part as with list.insert
+            pitch: Note pitch
+            lenght: Note lenght
+        """
+        note_id = self._position(note_id)
+        self._pitches.insert(note_id, pitch)
+        self._lenghts.insert(note_id, lenght)
+        self._durations.insert(note_id + 1, 0)
+        self._reindex(note_id)
+        for notation in self._notations:
+            if notation.relative_note >= note_id:
+                notation.relative_note += 1
+        self._mark_changed(note_id)
+
+    def remove_note(self, note_id: int):
+        """Removes a note from part, notations of following notes move along with them
+
+        Args:
+            note_id: number of note to remove, negative numbers count from end of part
+        """
+        note_id = range(len(self._lenghts))[note_id]
+        del self._pitches[note_id]
+        del self._lenghts[note_id]
+        del self._durations[note_id + 1]
+        self._reindex(note_id)
+        for notation in self._notations:
+            if notation.relative_note > note_id:
+                notation.relative_note -= 1
+        self._mark_changed(note_id)
+
+    def edit_note(self, note_id: int, pitch: int=None, lenght: int=None):
+        """Changes pitch and / or lenght of an existing note
+
+        Args:
+            note_id: number of note in question, negative numbers count from end of part
+            pitch: New pitch, if None pitch is kept
+            lenght: New lenght, if None lenght is kept
+        """
+        note_id = range(len(self._lenghts))[note_id]
+        if pitch is not None:
+            self._pitches[note_id] = pitch
+        if lenght is not None and lenght != self._lenghts[note_id]:
+            self._lenghts[note_id] = lenght
+            self._reindex(note_id)
+        self._mark_changed(note_id)
+
+    def consume_changes(self, consumer):
+        """Get first note changed since consumer last called this, and forget the changes
+
+        Args:
+            consumer: object (eg. a cache) tracking changes of this part
 
         Returns:
-            True if note was added, False if no space for it
+            number of first changed note, 0 if consumer is new, None if nothing has changed
         """
-        self.notes.append(ShakuNote(pitch, lenght))
-        self._notation_at_current_pos = False
+        if consumer not in self._changes:
+            self._changes[consumer] = None
+            return 0
+        first_changed = self._changes[consumer]
+        self._changes[consumer] = None
+        return first_changed
+
+    def _mark_changed(self, note_id: int):
+        """Internal function, records a change at given note for all consumers"""
+        self._revision += 1
+        for consumer, first_changed in list(self._changes.items()):
+            if first_changed is None or note_id < first_changed:
+                self._changes[consumer] = note_id
+
+    def _position(self, note_id: int):
+        """Internal function, converts a note number into a position between 0 and count of notes
+
+        Negative numbers count from end of part, and numbers out of range are clamped, as in list.insert.
+        """
+        if note_id < 0:
+            note_id += len(self._lenghts)
+        return min(max(note_id, 0), len(self._lenghts))
+
+    def _reindex(self, note_id: int):
+        """Internal function, recalculates cumulative durations from given note onward"""
+        self._durations[note_id:] = array("l", accumulate(
+            self._lenghts[note_id:],
+            initial=self._durations[note_id]
+            ))
 
     def get_duration_until(self, note_id: int):
         """Get duration until a specific note
 
         Args:
-            note_id: number of note in question
+            note_id: number of note in question, negative numbers count from end of part
 
         Returns:
             duration (sum of lenght of previous notes) until note specified
         """
-        return sum([note.lenght for note in self.notes[:note_id]])
+        return self._durations[self._position(note_id)]
+
+    def get_note_at(self, duration):
+        """Get the note which is sounding at given point of time
+
+        Args:
+            duration: point of time as sum of note lenghts from start of part
+
+        Returns:
+            number of note sounding at given time, None if time is outside of part
+        """
+        if duration < 0 or duration >= self._durations[-1]:
+            return None
+        return bisect_right(self._durations, duration) - 1
@@ -0,0 +1,95 @@
+import os
+import hashlib
+import threading
+from io import BytesIO
+from collections import OrderedDict
+import numpy as np
+from services.export_cache import ExportCache
+
+class AudioCache:
+    """Size bounded in-memory cache of rendered audio, with optional spill to disk
+
+    Audio is keyed by a hash of the notes rendered and settings affecting the sound,
+    see key. When total size of audio in memory exceeds the limit, least recently
+    used audio is dropped from memory, and written to spill cache if there is one.
+    Cached audio is read-only. Audio may be stored and got from several threads.
+    """
+    def __init__(self, max_bytes: int=None, spill: ExportCache=None):
+        """Constructor, initializes an empty cache
+
+        Args:
+            max_bytes: limit of total size of audio in memory, defaults to AUDIO_CACHE_SIZE
+                environment variable in megabytes or 128 megabytes if it is not set
+            spill: on-disk cache of audio dropped from memory, defaults to one in
+                AUDIO_CACHE_DIR environment variable, or none if it is not set
+        """
+        self._max_bytes = max_bytes if max_bytes is not None else int(os.getenv("AUDIO_CACHE_SIZE", "128")) * 2**20
+        if spill is None and os.getenv("AUDIO_CACHE_DIR"):
+            spill = ExportCache(os.getenv("AUDIO_CACHE_DIR"))
+        self._spill = spill
+        self._samples = OrderedDict()
+        self._size = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._samples)
+
+    @property
+    def size(self):
+        """Get total size of audio in memory in bytes"""
+        return self._size
+
+    def key(self, parts: list, settings: tuple):
+        """Get key of audio of musical parts rendered with given settings
+
+        Args:
+            parts: list of ShakuPart instances
+            settings: tuple of everything else affecting the sound, eg. tempo, volume and instrument
+
+        Returns:
+            Key as a hexadecimal string
+        """
+        notes = [(list(part.pitches), list(part.lenghts)) for part in parts]
+        return hashlib.sha256(repr((settings, notes)).encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        """Get cached audio and mark it as most recently used
+
+        Args:
+            key: key of audio, see key
+
+        Returns:
+            numpy array of samples, None if it is not cached
+        """
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is not None:
+                self._samples.move_to_end(key)
+                return samples
+            data = self._spill.get(key) if self._spill is not None else None
+            if data is None:
+                return None
+            samples = np.load(BytesIO(data))
+            self.put(key, samples)
+            return samples
+
+    def put(self, key: str, samples):
+        """Store audio, dropping least recently used audio from memory if cache grows too large
+
+        Args:
+            key: key of audio, see key
+            samples: numpy array of samples
+        """
+        with self._lock:
+            if key in self._samples:
+                self._size -= self._samples.pop(key).nbytes
+            samples.flags.writeable = False
+            self._samples[key] = samples
+            self._size += samples.nbytes
+            while self._size > self._max_bytes:
+                oldest, dropped = self._samples.popitem(last=False)
+                self._size -= dropped.nbytes
+                if self._spill is not None:
+                    data = BytesIO()
+                    np.save(data, dropped)
+                    self._spill.put(oldest, data.getvalue())
@@ -0,0 +1,385 @@
+import os
+import queue
+import threading
+import numpy as np
+import pygame
+import config.shaku_constants as consts
+from entities.shaku_part import ShakuPart
+from services.audio_cache import AudioCache
+from services.midi_creator import MidiCreator
+from services.synthesizer import Synthesizer
+
+def mix(stems: dict, muted=(), solo=()):
+    """Mix audio stems of musical parts together
+
+    Mix is as long as the longest stem, whether it is heard or not.
+
+    Args:
+        stems: dictionary mapping part numbers to numpy arrays of 16-bit samples
+        muted: numbers of parts not heard. Defaults to ().
+        solo: numbers of parts heard, if any, others are not heard. Defaults to ().
+
+    Returns:
+        numpy array of 16-bit samples, with a row of (left, right) for each frame
+    """
+    frames = max((len(samples) for samples in stems.values()), default=0)
+    mixed = np.zeros((frames, 2), dtype=np.int32)
+    for part_no, samples in stems.items():
+        if part_no not in muted and (not solo or part_no in solo):
+            mixed[:len(samples)] += samples
+    return np.clip(mixed, -32768, 32767).astype(np.int16)
+
+def _consume(chunks, ready: queue.Queue, stopping: threading.Event):
+    """Consume chunks of audio in a thread of its own, putting them in queue as they are ready
+
+    Queue ends with None, preceded by the exception consuming chunks raised, if any.
+
+    Args:
+        chunks: iterator of numpy arrays of 16-bit samples
+        ready: queue to put chunks in
+        stopping: event set to stop consuming chunks
+    """
+    try:
+        for chunk in chunks:
+            ready.put(chunk)
+            if stopping.is_set():
+                break
+    except Exception as error: # pylint: disable=broad-except # raised again in thread of playback
+        ready.put(error)
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+        ready.put(None)
+
+class AudioEngine:
+    """Long-lived audio service owning synthesizers and the pygame mixer
+
+    Synthesizers (with their sound font) and mixer are started on first use and kept
+    for the lifetime of the application, so playback and audio exports don't pay
+    for starting them again. Each part is rendered into a stem of its own and stems
+    are cached, so only parts changed since their last render are synthesized again.
+    Playback can be streamed, synthesizing changed parts in chunks in a thread of
+    its own while earlier chunks are played, see stream and play_stream. Parts
+    streamed at the same time are synthesized with synthesizers of their own, started
+    when that many parts are streamed for the first time. As each synthesizer loads
+    the sound font again, at most STREAM_SYNTHESIZERS are started, and further changed
+    parts are synthesized whole before the first chunk. Parts are rendered at once, eg.
+    for export, with another synthesizer, so rendering does not stop music being streamed.
+    Close engine when application exits.
+    """
+    def __init__(
+            self,
+            sound_font: str=None,
+            sample_rate: int=consts.SAMPLE_RATE,
+            cache: AudioCache=None,
+            create_synthesizer=None
+            ):
+        """Constructor, nothing is started until needed
+
+        Args:
+            sound_font: path of SF2 sound font, see Synthesizer. Defaults to None.
+            sample_rate: sample rate of rendered and played audio. Defaults to 44100.
+            cache: Cache of rendered audio to use, a new one is created if None
+            create_synthesizer: function(sound_font, sample_rate) starting a synthesizer,
+                Synthesizer is started if None
+        """
+        self._sound_font = sound_font
+        self._sample_rate = sample_rate
+        self._cache = cache if cache is not None else AudioCache()
+        self._create_synthesizer = create_synthesizer if create_synthesizer is not None else Synthesizer
+        self._synthesizer = None
+        self._synthesizers = []
+        self._mixer = False
+        self._sounds = []
+        self._channel = None
+        self._stream = None
+        self._consumer = None
+        self._stopping = None
+
+    @property
+    def sample_rate(self):
+        """Get sample rate of rendered and played audio"""
+        return self._sample_rate
+
+    @property
+    def playing(self):
+        """Get True if audio is being played or streamed"""
+        return self._stream is not None or (self._mixer and pygame.mixer.get_busy())
+
+    def render(self, parts: list, ro_daimeri_pitch: int=60, muted=(), solo=()):
+        """Synthesize musical parts into PCM audio, mixed from stems of parts
+
+        Args:
+            parts: list of ShakuPart instances
+            ro_daimeri_pitch: Base pitch of Shakuhachi in MIDI format. Defaults to 60.
+            muted: numbers of parts not heard. Defaults to ().
+            solo: numbers of parts heard, if any, others are not heard. Defaults to ().
+
+        Returns:
+            numpy array of 16-bit samples, with a row of (left, right) for each frame
+        """
+        return mix(self.render_stems(parts, ro_daimeri_pitch), muted, solo)
+
+    def render_stems(self, parts: list, ro_daimeri_pitch: int=60):
+        """Synthesize each musical part with notes into a PCM audio stem of its own
+
+        Args:
+            parts: list of ShakuPart instances
+            ro_daimeri_pitch: Base pitch of Shakuhachi in MIDI format. Defaults to 60.
+
+        Returns:
+            Dictionary mapping part numbers to read-only numpy arrays of 16-bit samples
+
+        Raises:
+            ValueError: if there are no notes on any part
+        """
+        stems = {}
+        for part in parts:
+            if len(part.pitches) > 0:
+                stems[part.part_no] = self._render_stem(part, ro_daimeri_pitch)
+        if not stems:
+            raise ValueError("No notes on any part to render audio from")
+        return stems
+
+    def stream(self, parts: list, ro_daimeri_pitch: int=60, muted=(), solo=(), chunk_beats: float=None):
+        """Synthesize heard musical parts into mixed PCM audio in time ordered chunks, as they are consumed
+
+        Stems of heard parts are taken from cache, and only parts changed since their last
+        render are synthesized, each in chunks with a synthesizer of its own, mixed chunk by
+        chunk with cached stems. Changed parts beyond STREAM_SYNTHESIZERS are synthesized whole
+        before the first chunk, and mixed like cached stems. Chunks end where a note of the longest heard part ends, see
+        _chunk_boundaries. Once all chunks are consumed, stems of synthesized parts are cached.
+        If stems of all heard parts are cached, they are mixed at once into a single chunk.
+        Notes of parts are read when called, so parts may be edited while chunks are consumed
+        in another thread. Synthesizers must not be used for anything else until all chunks
+        are consumed.
+
+        Args:
+            parts: list of ShakuPart instances
+            ro_daimeri_pitch: Base pitch of Shakuhachi in MIDI format. Defaults to 60.
+            muted: numbers of parts not heard. Defaults to ().
+            solo: numbers of parts heard, if any, others are not heard. Defaults to ().
+            chunk_beats: least lenght of chunks in beats, defaults to STREAM_CHUNK_BEATS
+
+        Returns:
+            iterator of numpy arrays of 16-bit samples, with a row of (left, right) for each frame
+        """
+        heard = [
+            part for part in parts
+            if len(part.pitches) > 0 and part.part_no not in muted and (not solo or part.part_no in solo)
+            ]
+        if not heard:
+            return iter(())
+        stems = {}
+        creators = {}
+        keys = {}
+        for part in heard:
+            creator = MidiCreator()
+            creator.create_track(part, ro_daimeri_pitch)
+            keys[part.part_no] = self._cache.key([part], self._settings(creator, ro_daimeri_pitch))
+            samples = self._cache.get(keys[part.part_no])
+            if samples is None:
+                creators[part.part_no] = creator
+            else:
+                stems[part.part_no] = samples
+        if not creators:
+            return iter([mix(stems)])
+        longest = max(heard, key=lambda part: part.total_duration)
+        boundaries = self._chunk_boundaries(longest, chunk_beats or consts.STREAM_CHUNK_BEATS)
+        synthesizers = self._ready_synthesizers(min(len(creators), consts.STREAM_SYNTHESIZERS))
+        return self._iter_stream(creators, keys, stems, boundaries, synthesizers)
+
+    def _iter_stream(self, creators: dict, keys: dict, stems: dict, boundaries: list, synthesizers: list):
+        """Internal function, synthesizes parts of stream chunk by chunk, mixing them with cached stems
+
+        Args:
+            creators: dictionary mapping numbers of parts to synthesize to MidiCreator instances of them
+            keys: dictionary mapping numbers of parts to their cache keys
+            stems: dictionary mapping numbers of cached parts to their stems
+            boundaries: times in beats at which chunks end, see _chunk_boundaries
+            synthesizers: synthesizers of parts synthesized in chunks, in order of creators,
+                further parts are synthesized whole with the first one
+
+        Yields:
+            numpy arrays of 16-bit samples, with a row of (left, right) for each frame
+        """
+        streamed = list(creators.items())[:len(synthesizers)]
+        stems = dict(stems)
+        for part_no, creator in list(creators.items())[len(synthesizers):]:
+            stems[part_no] = synthesizers[0].render(creator)
+            self._cache.put(keys[part_no], stems[part_no])
+        renders = {
+            part_no: synthesizer.iter_render(creator, boundaries)
+            for (part_no, creator), synthesizer in zip(streamed, synthesizers)
+            }
+        rendered = {part_no: [] for part_no in renders}
+        frame = 0
+        while renders:
+            chunks = {}
+            for part_no, render in list(renders.items()):
+                chunk = next(render, None)
+                if chunk is None:
+                    del renders[part_no]
+                    continue
+                rendered[part_no].append(chunk)
+                chunks[part_no] = chunk
+            frames = max((len(chunk) for chunk in chunks.values()), default=0)
+            if frames == 0:
+                continue
+            for part_no, samples in stems.items():
+                chunks[part_no] = samples[frame:frame + frames]
+            frame += frames
+            yield mix(chunks)
+        rest = {part_no: samples[frame:] for part_no, samples in stems.items() if len(samples) > frame}
+        if rest:
+            yield mix(rest)
+        for part_no, chunks in rendered.items():
+            self._cache.put(keys[part_no], np.concatenate(chunks))
+
+    def _chunk_boundaries(self, part: ShakuPart, chunk_beats: float):
+        """Internal function, get times in beats at which streamed chunks end
+
+        Each chunk lasts at least chunk_beats, and ends where a note of part ends,
+        found from cumulative durations of notes of part.
+
+        Args:
+            part: ShakuPart instance, chunks of which are streamed
+            chunk_beats: least lenght of chunks in beats
+
+        Returns:
+            List of times in beats, before end of part
+        """
+        step = chunk_beats * 8 # lenghts of notes are in eighths of a beat, as in MidiTrack
+        boundaries = []
+        duration = step
+        while duration < part.total_duration:
+            note_id = part.get_note_at(duration)
+            if part.get_duration_until(note_id) < duration:
+                note_id += 1
+            boundary = part.get_duration_until(note_id)
+            if boundary >= part.total_duration:
+                break
+            boundaries.append(boundary / 8)
+            duration = boundary + step
+        return boundaries
+
+    def _settings(self, creator: MidiCreator, ro_daimeri_pitch: int):
+        """Internal function, get settings affecting the sound, for cache keys"""
+        sound_font = self._sound_font or os.getenv("SOUND_FONT", consts.SOUND_FONT)
+        return (creator.tempo, creator.volume, creator.instrument, ro_daimeri_pitch, self._sample_rate, sound_font)
+
+    def _ready_synthesizers(self, count: int):
+        """Internal function, get given count of synthesizers, starting them if needed"""
+        while len(self._synthesizers) < count:
+            self._synthesizers.append(self._create_synthesizer(self._sound_font, self._sample_rate))
+        return self._synthesizers[:count]
+
+    def _render_stem(self, part, ro_daimeri_pitch: int):
+        """Internal function, get stem of a part from cache or synthesize it, starting synthesizer of renders if needed"""
+        creator = MidiCreator()
+        creator.create_track(part, ro_daimeri_pitch)
+        key = self._cache.key([part], self._settings(creator, ro_daimeri_pitch))
+        samples = self._cache.get(key)
+        if samples is None:
+            if self._synthesizer is None:
+                self._synthesizer = self._create_synthesizer(self._sound_font, self._sample_rate)
+            samples = self._synthesizer.render(creator)
+            self._cache.put(key, samples)
+        return samples
+
+    def play(self, samples):
+        """Play PCM audio, stopping anything played before
+
+        Args:
+            samples: numpy array of 16-bit samples, as returned by render
+        """
+        self.stop()
+        self._start_mixer()
+        self._sounds = [pygame.mixer.Sound(buffer=samples.tobytes())]
+        self._channel = self._sounds[0].play()
+
+    def play_stream(self, chunks):
+        """Start playing chunks of PCM audio, stopping anything played before
+
+        Chunks are consumed in a thread of their own, so synthesizing them does not
+        block the calling thread. Call pump regularly from the calling thread during
+        playback, it starts playing first chunk and queues next ones as they are ready.
+
+        Args:
+            chunks: iterator of numpy arrays of 16-bit samples, eg. as yielded by stream
+        """
+        self.stop()
+        self._start_mixer()
+        self._stream = queue.Queue()
+        self._stopping = threading.Event()
+        self._consumer = threading.Thread(target=_consume, args=(chunks, self._stream, self._stopping), daemon=True)
+        self._consumer.start()
+        self.pump()
+
+    def _start_mixer(self):
+        """Internal function, starts mixer if it is not started"""
+        if not self._mixer:
+            pygame.mixer.init(frequency=self._sample_rate, size=-16, channels=2)
+            self._mixer = True
+
+    def pump(self):
+        """Play or queue next chunk of streamed audio if it is ready and there is room for it in queue of mixer channel
+
+        Returns:
+            True if there are still chunks to queue, else False
+
+        Raises:
+            Exception: raised while synthesizing streamed audio, ending stream
+        """
+        if self._stream is None:
+            return False
+        if self._channel is not None and self._channel.get_queue() is not None:
+            return True
+        try:
+            chunk = self._stream.get_nowait()
+        except queue.Empty:
+            return True
+        if chunk is None or isinstance(chunk, Exception):
+            self._end_stream()
+            if chunk is not None:
+                raise chunk
+            return False
+        sound = pygame.mixer.Sound(buffer=chunk.tobytes())
+        if self._channel is None:
+            self._sounds = [sound]
+            self._channel = sound.play()
+        else:
+            self._sounds = self._sounds[-1:] + [sound]
+            self._channel.queue(sound)
+        return True
+
+    def _end_stream(self):
+        """Internal function, stops consuming streamed chunks and waits for it to end"""
+        if self._stream is None:
+            return
+        self._stopping.set()
+        self._consumer.join()
+        self._stream = None
+        self._consumer = None
+        self._stopping = None
+
+    def stop(self):
+        """Stop audio being played, and synthesizing of streamed audio"""
+        self._end_stream()
+        if self._mixer:
+            pygame.mixer.stop()
+        self._channel = None
+
+    def close(self):
+        """Stop playback, synthesizers and mixer"""
+        self.stop()
+        self._sounds = []
+        if self._synthesizer is not None:
+            self._synthesizer.close()
+            self._synthesizer = None
+        for synthesizer in self._synthesizers:
+            synthesizer.close()
+        self._synthesizers = []
+        if self._mixer:
+            pygame.mixer.quit()
+            self._mixer = False
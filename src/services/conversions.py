@@ -1,18 +1,5 @@
-from midi2audio import FluidSynth
 import config.shaku_constants as consts
 
-class MusicConverter:
-    """Converts MIDI music representation to .wav audio -format"""
-    def convert(self, source: str, target: str):
-        """Converts MIDI music representation to .wav audio -format
-
-        Args:
-            source: relative path of MIDI file
-            target: relative path of .wav file
-        """
-        synth = FluidSynth()
-        synth.midi_to_audio(source, target)
-
 class GraphicsConverter:
     """Class for scaling items from app-internal sheet size to export sheet size"""
     def scale(self, item):
@@ -0,0 +1,331 @@
+import hashlib
+import config.shaku_constants as consts
+from entities.shaku_music import ShakuMusic
+from entities.shaku_note import ShakuNote
+from entities.shaku_part import ShakuPart
+from services.layout_cache import LayoutCache, PartLayout
+from services.layout_context import LayoutContext
+from services.rhythm_cache import RhythmCache
+
+class Glyph:
+    """A shakuhachi note glyph on sheet
+
+    Attributes:
+        page: page number (1 being first page)
+        pitch: note pitch
+        position: (x, y) -coordinates of top left corner of glyph
+        part: part number
+        note: number of note in part, None for ghost notes
+    """
+    __slots__ = ("_page", "_pitch", "_position", "_part", "_note")
+
+    def __init__(self, page: int, pitch: int, position: tuple, part: int, note: int=None):
+        self._page = page
+        self._pitch = pitch
+        self._position = position
+        self._part = part
+        self._note = note
+
+    @property
+    def page(self):
+        """Get page number"""
+        return self._page
+
+    @property
+    def pitch(self):
+        """Get note pitch"""
+        return self._pitch
+
+    @property
+    def position(self):
+        """Get coordinates of glyph"""
+        return self._position
+
+    @property
+    def part(self):
+        """Get part number"""
+        return self._part
+
+    @property
+    def note(self):
+        """Get number of note in part, None for ghost notes"""
+        return self._note
+
+class Line:
+    """A straight rhythm notation line on sheet
+
+    Attributes:
+        page: page number (1 being first page)
+        points: (x_start, y_start, x_end, y_end) -coordinates
+    """
+    __slots__ = ("_page", "_points")
+
+    def __init__(self, page: int, points: tuple):
+        self._page = page
+        self._points = points
+
+    @property
+    def page(self):
+        """Get page number"""
+        return self._page
+
+    @property
+    def points(self):
+        """Get line coordinates"""
+        return self._points
+
+class Arc(Line):
+    """A curved tie on sheet, going from start through mid point to end
+
+    Attributes:
+        page: page number (1 being first page)
+        points: (x_start, y_start, x_mid, y_mid, x_end, y_end) -coordinates
+    """
+    __slots__ = ()
+
+class Text:
+    """A line of text on sheet
+
+    Attributes:
+        page: page number (1 being first page)
+        text: text to draw
+        position: (x, y) -coordinates of text anchor
+        align: "left" if text starts from position, "right" if it ends to it
+    """
+    __slots__ = ("_page", "_text", "_position", "_align")
+
+    def __init__(self, page: int, text: str, position: tuple, align: str="left"):
+        self._page = page
+        self._text = text
+        self._position = position
+        self._align = align
+
+    @property
+    def page(self):
+        """Get page number"""
+        return self._page
+
+    @property
+    def text(self):
+        """Get text"""
+        return self._text
+
+    @property
+    def position(self):
+        """Get coordinates of text"""
+        return self._position
+
+    @property
+    def align(self):
+        """Get text alignment"""
+        return self._align
+
+class DisplayPage:
+    """Primitives of one page, in the layers they are drawn in
+
+    Attributes:
+        notes: Glyph instances of notes
+        texts: Text instances
+        rhythms: Line and Arc instances of rhythm notation, and Glyph instances of ghost notes
+    """
+    def __init__(self):
+        self.notes = []
+        self.texts = []
+        self.rhythms = []
+
+    def digest(self):
+        """Get hash of everything drawn on page, in drawing order
+
+        Pages drawing the same primitives in the same places have the same digest,
+        regardless of which parts or notes the primitives come from.
+
+        Returns:
+            SHA-256 digest as a hexadecimal string
+        """
+        content = (
+            [(glyph.pitch, glyph.position) for glyph in self.notes],
+            [(text.text, text.position, text.align) for text in self.texts],
+            [
+                (item.pitch, item.position) if isinstance(item, Glyph) else (type(item).__name__, item.points)
+                for item in self.rhythms
+                ],
+            )
+        return hashlib.sha256(repr(content).encode("utf-8")).hexdigest()
+
+class DisplayList:
+    """Backend neutral description of everything drawn on sheet music pages
+
+    Coordinates are in sheet (UI) size, backends scale them as needed.
+    Measure grid is not included, see grid_lines.
+
+    Attributes:
+        context: LayoutContext the list was built with
+        pages: dict mapping page numbers to DisplayPage instances, in page order
+    """
+    def __init__(self, context: LayoutContext):
+        self._context = context
+        self._pages = {1: DisplayPage()}
+
+    @property
+    def context(self):
+        """Get LayoutContext the list was built with"""
+        return self._context
+
+    @property
+    def pages(self):
+        """Get pages"""
+        return self._pages
+
+    def page(self, page: int):
+        """Get a page, adding pages up to it if missing
+
+        Args:
+            page: page number (1 being first page)
+
+        Returns:
+            DisplayPage instance
+        """
+        while page not in self._pages:
+            self._pages[len(self._pages) + 1] = DisplayPage()
+        return self._pages[page]
+
+def grid_lines(spacing: int, measure_lenght: int):
+    """Get lines of musical measure grid on sheet
+
+    Args:
+        spacing: Width of each section of grid (1 unit = 20px)
+        measure_lenght: Height of each section of grid (1 unit = 55px)
+
+    Returns:
+        List of (x_start, y_start, x_end, y_end) -tuples
+    """
+    x_axis = list(consts.GRID_X)
+    y_axis = list(consts.GRID_Y)
+    increment = consts.NOTE_ROW_SPACING * spacing
+    x_axis[1] -= (x_axis[1] - x_axis[0]) % increment
+    lines = []
+    for temp_x in range(x_axis[0], x_axis[1] + 3, increment):
+        lines.append((temp_x, y_axis[0], temp_x, y_axis[1]))
+    increment = consts.VERTICAL_SPACE_PER_FOURTH_NOTE * measure_lenght
+    for temp_y in range(y_axis[0], y_axis[1] + 1, increment):
+        lines.append((x_axis[0], temp_y, x_axis[1], temp_y))
+    return lines
+
+class DisplayListBuilder:
+    """Builds display lists of music, shared by sheet UI and exporters
+
+    The latest display list is cached and reused for as long as music revision and
+    layout context stay the same, so exporting the same score in several formats
+    does the layout work only once.
+    """
+    def __init__(self, layouts: LayoutCache=None, rhythms: RhythmCache=None):
+        """Constructor
+
+        Args:
+            layouts: Cache of note layouts to use, a new one is created if None
+            rhythms: Cache of rhythm notations to use, a new one is created if None
+        """
+        self._layouts = layouts if layouts is not None else LayoutCache()
+        self._rhythms = rhythms if rhythms is not None else RhythmCache()
+        self._key = None
+        self._display_list = None
+
+    @property
+    def layouts(self):
+        """Get cache of note layouts"""
+        return self._layouts
+
+    @property
+    def rhythms(self):
+        """Get cache of rhythm notations"""
+        return self._rhythms
+
+    def get_display_list(self, music: ShakuMusic, context: LayoutContext):
+        """Get display list of music
+
+        Args:
+            music: ShakuMusic instance
+            context: LayoutContext of the sheet
+
+        Returns:
+            DisplayList instance
+        """
+        key = (music, music.revision, context.key)
+        if key == self._key:
+            return self._display_list
+        display_list = DisplayList(context)
+        layouts = [(part, self._layouts.get_layout(part, context)) for part in music.parts.values()]
+        for part, layout in layouts:
+            for glyph in self.note_glyphs(part, layout):
+                display_list.page(glyph.page).notes.append(glyph)
+        display_list.page(1).texts.extend(self.title_texts(music))
+        for part, layout in layouts:
+            for item in self.rhythm_items(part, layout, context):
+                display_list.page(item.page).rhythms.append(item)
+        self._key = key
+        self._display_list = display_list
+        return display_list
+
+    def note_glyphs(self, part: ShakuPart, layout: PartLayout, start: int=0):
+        """Get glyphs of notes of a part
+
+        Args:
+            part: ShakuPart instance
+            layout: PartLayout of part
+            start: number of first note to get glyph for. Defaults to 0.
+
+        Returns:
+            List of Glyph instances
+        """
+        pages = layout.pages[start:].tolist()
+        positions = layout.coordinates(start)
+        pitches = part.pitches[start:]
+        part_no = part.part_no
+        return [
+            Glyph(page + 1, pitch, position, part_no, note)
+            for note, page, pitch, position in zip(range(start, len(layout)), pages, pitches, positions)
+            ]
+
+    def rhythm_items(self, part: ShakuPart, layout: PartLayout, context: LayoutContext, first_page: int=0):
+        """Get rhythm notations of a part as primitives
+
+        Args:
+            part: ShakuPart instance
+            layout: PartLayout of part
+            context: LayoutContext of the sheet
+            first_page: first page to get notations for (0 being first page). Defaults to 0.
+
+        Returns:
+            List of Line, Arc and Glyph (for "ghost notes") instances
+        """
+        items = []
+        if context.mode != "Tozan":
+            return items
+        for page, start, end in layout.page_ranges(first_page):
+            positions = layout.coordinates(start, end)
+            notations = self._rhythms.get_rhytms(part, page, start, end, positions, context)
+            for notation in notations:
+                if isinstance(notation[0], ShakuNote): # "ghost note", a note needs to be redrawn after measure line
+                    x_axis, y_axis = notation[1]
+                    if y_axis == consts.PARTS_Y_START:
+                        x_axis -= context.row_distance
+                    items.append(Glyph(page + 1, notation[0].pitch, (x_axis, y_axis), part.part_no))
+                elif len(notation) == 6:
+                    items.append(Arc(page + 1, notation))
+                else:
+                    items.append(Line(page + 1, notation))
+        return items
+
+    def title_texts(self, music: ShakuMusic):
+        """Get name and composer of music as texts on first page
+
+        Args:
+            music: ShakuMusic instance
+
+        Returns:
+            List of Text instances
+        """
+        return [
+            Text(1, music.name, consts.NAME_POSITION, "right"),
+            Text(1, music.composer, consts.COMPOSER_POSITION, "left")
+            ]
@@ -0,0 +1,126 @@
+import os
+import hashlib
+from collections import OrderedDict
+from services.display_list import DisplayPage
+
+class ExportCache:
+    """Size bounded on-disk cache of exported pages of sheet music
+
+    Each entry is one page encoded by an export backend (eg. PNG image, single page
+    PDF or svg drawing), stored in a file named by its key. Key is a hash of the
+    content of the page and the settings it was rendered with, so an edit of music
+    invalidates only the pages it changes. When total size of entries exceeds the
+    limit, least recently used entries are removed. Use is tracked by modification
+    times of the files, so the order is kept between sessions.
+    """
+    def __init__(self, directory: str=None, max_bytes: int=None):
+        """Constructor, entries already in directory are indexed on first use
+
+        Args:
+            directory: directory of cached pages, defaults to EXPORT_CACHE_DIR environment
+                variable or .cache/shakunotator/pages in home directory if it is not set
+            max_bytes: limit of total size of entries, defaults to EXPORT_CACHE_SIZE
+                environment variable in megabytes or 256 megabytes if it is not set
+        """
+        if directory is None:
+            directory = os.getenv("EXPORT_CACHE_DIR") or os.path.join(
+                os.path.expanduser("~"), ".cache", "shakunotator", "pages"
+                )
+        self._directory = directory
+        self._max_bytes = max_bytes if max_bytes is not None else int(os.getenv("EXPORT_CACHE_SIZE", "256")) * 2**20
+        self._entries = None
+        self._size = 0
+
+    def __len__(self):
+        self._load()
+        return len(self._entries)
+
+    @property
+    def directory(self):
+        """Get directory of cached pages"""
+        return self._directory
+
+    @property
+    def size(self):
+        """Get total size of entries in bytes"""
+        self._load()
+        return self._size
+
+    def key(self, page: DisplayPage, settings: tuple):
+        """Get key of a page rendered with given settings
+
+        Args:
+            page: DisplayPage instance
+            settings: tuple of everything else affecting the output, eg. backend, format and layout
+
+        Returns:
+            Key as a hexadecimal string
+        """
+        return hashlib.sha256((repr(settings) + page.digest()).encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        """Get a cached page and mark it as most recently used
+
+        Args:
+            key: key of page, see key
+
+        Returns:
+            Page as bytes, None if it is not cached
+        """
+        self._load()
+        if key not in self._entries:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+            os.utime(path)
+        except OSError:
+            self._size -= self._entries.pop(key)
+            return None
+        self._entries.move_to_end(key)
+        return data
+
+    def put(self, key: str, data: bytes):
+        """Store a page, removing least recently used pages if cache grows too large
+
+        Args:
+            key: key of page, see key
+            data: page as bytes
+        """
+        self._load()
+        if len(data) > self._max_bytes:
+            return
+        os.makedirs(self._directory, exist_ok=True)
+        path = self._path(key)
+        with open(path + ".tmp", "wb") as file:
+            file.write(data)
+        os.replace(path + ".tmp", path)
+        self._size += len(data) - self._entries.get(key, 0)
+        self._entries[key] = len(data)
+        self._entries.move_to_end(key)
+        while self._size > self._max_bytes:
+            oldest, size = self._entries.popitem(last=False)
+            self._size -= size
+            try:
+                os.remove(self._path(oldest))
+            except OSError:
+                pass
+
+    def _path(self, key: str):
+        """Internal function, get path of file of an entry"""
+        return os.path.join(self._directory, key)
+
+    def _load(self):
+        """Internal function, indexes entries in directory in order of use, if not yet done"""
+        if self._entries is not None:
+            return
+        files = []
+        if os.path.isdir(self._directory):
+            with os.scandir(self._directory) as entries:
+                files = [
+                    (entry.stat().st_mtime_ns, entry.name, entry.stat().st_size)
+                    for entry in entries if entry.is_file() and not entry.name.endswith(".tmp")
+                    ]
+        self._entries = OrderedDict((name, size) for _, name, size in sorted(files))
+        self._size = sum(self._entries.values())
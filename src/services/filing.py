@@ -1,14 +1,16 @@
+import os
 import json
 import io
+import wave
 from json.decoder import JSONDecodeError
 from tkinter import filedialog
 import boto3
 from boto3.session import Session
 from botocore.exceptions import NoCredentialsError
-from svgwrite import Drawing
 from PIL import Image
 from midiutil import MIDIFile
 import config.shaku_constants as consts
+from services.pdf_writer import PdfWriter
 
 class FileManager:
     """Class handling saving, loading and uploading files"""
@@ -52,47 +54,77 @@ class FileManager:
         except AttributeError:
             return None
 
-    def save_pdf(self, images: dict):
-        """Promtps user with file dialog and exports file into .pdf -format if file was specified
+    def save_pdf(self, pages, progress=None):
+        """Promtps user with file dialog and exports pages into a single .pdf -file if file was specified
+
+        Pages are written one at a time, each copied into the file as soon as it is
+        received, so pages can be streamed without keeping them all in memory.
 
         Args:
-            image (Image): [description]
+            pages: dictionary or iterable of (page number, page) -pairs in page order, page being
+                a PDF document of its own as bytes or a PIL Image instance, or a complete PDF document as bytes
+            progress: function called with page number after each page is written. Defaults to None.
 
         Returns:
             True if file was exported to PDF, else False
         """
-        try:
-            with filedialog.asksaveasfile(mode='wb', defaultextension=".pdf") as file:
-                images[1].save(file, format="pdf")
-            filename = file.name
-        except AttributeError:
+        file = filedialog.asksaveasfile(mode='wb', defaultextension=".pdf")
+        if not file:
             return False
-        for key, value in images.items():
-            if key == 1:
-                continue
-            with open(filename[:-4] + "(" + str(key) + ").pdf", mode="wb") as file:
-                value.save(file, format="pdf")
-
-    def save_svg(self, svgs: dict):
-        """Promtps user with file dialog and exports file into .svg -format if file was specified
+        with file:
+            if isinstance(pages, bytes):
+                file.write(pages)
+                return True
+            if isinstance(pages, dict):
+                pages = pages.items()
+            writer = PdfWriter(file)
+            for number, page in pages:
+                if isinstance(page, Image.Image):
+                    document = io.BytesIO()
+                    page.save(document, format="PDF")
+                    page = document.getvalue()
+                writer.add_page(page)
+                if progress is not None:
+                    progress(number)
+            writer.close()
+        return True
+
+    def save_svg(self, svgs, progress=None):
+        """Promtps user with file dialog and exports pages into .svg -files if file was specified
+
+        First page is written to the specified file and each following page N next to it
+        as "name(N).svg". Every page is written as soon as it is received, in any order.
 
         Args:
-            svg (Drawing): [description]
+            svgs: dictionary or iterable of (page number, svg -format drawing) -pairs, drawing
+                being a string or a function writing it into the text file given to it
+            progress: function called with page number after each page is written. Defaults to None.
 
         Returns:
             True if file was exported to SVG, else False
         """
-        try:
-            with filedialog.asksaveasfile(mode='w', defaultextension=".svg") as file:
-                svgs[1].write(file, indent=2, pretty=False)
-            filename = file.name                    
-        except AttributeError:
+        file = filedialog.asksaveasfile(mode='w', defaultextension=".svg")
+        if not file:
             return False
-        for key, value in svgs.items():
-            if key == 1:
-                continue
-            with open(filename[:-4] + "(" + str(key) + ").svg", mode="w") as file:
-                value.write(file, indent=2, pretty=False) #DO WE NEED THIS INDENT + PRETTY THING?
+        with file:
+            if isinstance(svgs, dict):
+                svgs = svgs.items()
+            for number, svg in svgs:
+                if number == 1:
+                    self._write_svg(file, svg)
+                else:
+                    with open(file.name[:-4] + "(" + str(number) + ").svg", mode="w") as page_file:
+                        self._write_svg(page_file, svg)
+                if progress is not None:
+                    progress(number)
+        return True
+
+    def _write_svg(self, file, svg):
+        """Internal function, writes svg -format drawing or lets it write itself into file"""
+        if callable(svg):
+            svg(file)
+        else:
+            file.write(svg)
 
     def save_midi(self, midi: MIDIFile, name: str=None):
         """Exports file into .mid -format if file is specified
@@ -115,6 +147,53 @@ class FileManager:
         except AttributeError:
             return False
 
+    def save_wav(self, samples, sample_rate: int):
+        """Promtps user with file dialog and exports audio into .wav -format if file was specified
+
+        Args:
+            samples: numpy array of 16-bit samples, with a row of (left, right) for each frame
+            sample_rate: sample rate of audio
+
+        Returns:
+            True if file was exported to WAV, else False
+        """
+        file = filedialog.asksaveasfile(mode="wb", defaultextension=".wav")
+        if not file:
+            return False
+        with file:
+            self._write_wav(file, samples, sample_rate)
+        return True
+
+    def save_stems(self, stems: dict, sample_rate: int):
+        """Promtps user with file dialog and exports audio stems of parts into .wav -files if file was specified
+
+        Stem of each part N is written next to the specified file as "name(part N).wav",
+        specified file itself is neither written nor removed.
+
+        Args:
+            stems: dictionary mapping part numbers to numpy arrays of 16-bit samples
+            sample_rate: sample rate of audio
+
+        Returns:
+            True if stems were exported to WAV, else False
+        """
+        name = filedialog.asksaveasfilename(defaultextension=".wav")
+        if not name:
+            return False
+        base = os.path.splitext(name)[0]
+        for part_no, samples in stems.items():
+            with open(base + "(part " + str(part_no) + ").wav", mode="wb") as stem_file:
+                self._write_wav(stem_file, samples, sample_rate)
+        return True
+
+    def _write_wav(self, file, samples, sample_rate: int):
+        """Internal function, writes 16-bit stereo audio into a file in .wav -format"""
+        with wave.open(file, "wb") as audio:
+            audio.setnchannels(2)
+            audio.setsampwidth(2)
+            audio.setframerate(sample_rate)
+            audio.writeframes(samples.astype("<i2").tobytes())
+
     def upload_to_aws_s3(self, data: dict, name: str):
         """Uploads .shaku -format (JSON) -data to AWS S3 -bucket
 
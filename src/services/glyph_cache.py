@@ -0,0 +1,65 @@
+import math
+from PIL import Image, ImageDraw, ImageFont
+
+class GlyphCache:
+    """Rasterized glyphs of note font, composited onto images by pasting
+
+    Each glyph is rasterized by FreeType only once per font, size and sub-pixel
+    offset. The same mask is used for every colour, pasting a colour through it
+    gives the same pixels as drawing the glyph with ImageDraw.text. Glyphs are
+    antialiased, except on black and white ("1" mode) images.
+    """
+    def __init__(self):
+        self._masks = {}
+
+    def __len__(self):
+        return len(self._masks)
+
+    def get_mask(self, text: str, font: ImageFont.FreeTypeFont, start: tuple=(0.0, 0.0), mode: str="L"):
+        """Get rasterized glyph, rasterizing it if not cached
+
+        Args:
+            text: character(s) of glyph
+            font: PIL FreeTypeFont to rasterize with
+            start: sub-pixel (x, y) -offset of glyph. Defaults to (0.0, 0.0).
+            mode: "L" for antialiased mask, "1" for black and white. Defaults to "L".
+
+        Returns:
+            (mask, offset) -tuple, mask being a PIL Image and offset
+            its (x, y) -offset from drawing position
+        """
+        key = (font.path, font.size, text, start, mode)
+        glyph = self._masks.get(key)
+        if glyph is None:
+            glyph = self._rasterize(text, font, start, mode)
+            self._masks[key] = glyph
+        return glyph
+
+    def _rasterize(self, text: str, font: ImageFont.FreeTypeFont, start: tuple, mode: str):
+        """Internal function, draws glyph with margins and crops it to its ink"""
+        left, top, right, bottom = font.getbbox(text, mode, anchor="lt")
+        margin_x = 2 - min(left, 0)
+        margin_y = 2 - min(top, 0)
+        image = Image.new(mode, (margin_x + right + 2, margin_y + bottom + 2), 0)
+        ImageDraw.Draw(image).text(
+            (margin_x + start[0], margin_y + start[1]), text, font=font, anchor="lt", fill=255
+            )
+        box = image.getbbox() or (0, 0, 0, 0)
+        return (image.crop(box), (box[0] - margin_x, box[1] - margin_y))
+
+    def paste(self, image: Image.Image, position: tuple, text: str, font: ImageFont.FreeTypeFont, fill):
+        """Draw a glyph on image, anchored from its top left corner
+
+        Args:
+            image: PIL Image to draw on
+            position: (x, y) -coordinates of glyph
+            text: character(s) of glyph
+            font: PIL FreeTypeFont of glyph
+            fill: colour of glyph
+        """
+        x_axis, y_axis = position
+        start = (math.modf(x_axis)[0], math.modf(y_axis)[0])
+        mask, offset = self.get_mask(text, font, start, "1" if image.mode == "1" else "L")
+        x_axis = int(x_axis) + offset[0]
+        y_axis = int(y_axis) + offset[1]
+        image.paste(fill, (x_axis, y_axis, x_axis + mask.width, y_axis + mask.height), mask)
@@ -1,11 +1,38 @@
 import os
+import time
+from io import BytesIO
+from collections import deque
 from PIL import Image, ImageFont, ImageDraw
 import config.shaku_constants as consts
 from entities.shaku_music import ShakuMusic
-from entities.shaku_note import ShakuNote
 from services.conversions import GraphicsConverter
-from services.positioning import ShakuPositions
-from services.time_notation import ShakuRhythmNotation
+from services.display_list import DisplayListBuilder, DisplayPage, Glyph, Line, Arc, grid_lines
+from services.export_cache import ExportCache
+from services.glyph_cache import GlyphCache
+from services.layout_context import LayoutContext
+from services.worker_pool import spawn_pool
+
+COLOR_MODES = ("1", "L", "RGB")
+
+_worker_creators = {}
+
+def _render_page(job: tuple):
+    """Render and encode one page in a worker process
+
+    Args:
+        job: (color_mode, page, context, grid_included, save_options) -tuple, see ImageCreator.iter_pages
+
+    Returns:
+        Encoded page as bytes
+    """
+    color_mode, page, context, grid_included, save_options = job
+    if color_mode not in _worker_creators:
+        _worker_creators[color_mode] = ImageCreator(workers=1, color_mode=color_mode)
+    return _worker_creators[color_mode].encode_page(page, context, grid_included, save_options)
+
+def _ink(color: tuple, color_mode: str):
+    """Convert an RGB colour to pixel value of given image mode"""
+    return Image.new("RGB", (1, 1), color).convert(color_mode).getpixel((0, 0))
 
 class ImageCreator:
     """Class for generating production grade image of sheet music
@@ -15,22 +42,46 @@ class ImageCreator:
         font: Font for text on image
         draft: PIL ImageDraw instance for drawing lines and text on image
     """
-    def __init__(self):
-        """Constructor, generates necessary PIL instances"""
+    def __init__(
+            self,
+            display_lists: DisplayListBuilder=None,
+            workers: int=None,
+            glyphs: GlyphCache=None,
+            color_mode: str=None,
+            cache: ExportCache=None
+            ):
+        """Constructor, generates necessary PIL instances
+
+        Args:
+            display_lists: Builder of display lists to use, a new one is created if None
+            workers: count of processes rendering pages in export_pages,
+                defaults to EXPORT_WORKERS environment variable or 1 if it is not set
+            glyphs: Cache of rasterized note glyphs to use, a new one is created if None
+            color_mode: PIL image mode of pages, "1" (black and white), "L" (grayscale) or "RGB",
+                defaults to EXPORT_COLOR_MODE environment variable or "RGB" if it is not set
+            cache: Cache of pages encoded by iter_pages and export_pages, pages are not cached if None
+
+        Raises:
+            ValueError: if color mode is not supported
+        """
+        self._color_mode = color_mode if color_mode is not None else os.getenv("EXPORT_COLOR_MODE", "RGB")
+        if self._color_mode not in COLOR_MODES:
+            raise ValueError(f"Unsupported color mode {self._color_mode}, expected one of {COLOR_MODES}")
+        self._paper = _ink((255, 255, 255), self._color_mode)
+        self._note_ink = _ink(consts.NOTE_COLOR, self._color_mode)
+        self._text_ink = _ink(consts.TEXT_COLOR, self._color_mode)
+        self._grid_ink = _ink(consts.GRID_COLOR, self._color_mode)
         self._images = {}
-        self._drafts = {}
-        self._pos = ShakuPositions()
+        self._templates = {}
+        self._workers = workers if workers is not None else int(os.getenv("EXPORT_WORKERS", "1"))
+        self._display_lists = display_lists if display_lists is not None else DisplayListBuilder()
+        self._glyphs = glyphs if glyphs is not None else GlyphCache()
+        self._cache = cache
         self._scaler = GraphicsConverter().scale
         font_size = self._scaler(consts.SHEET_NOTE_SIZE) + consts.EXPORT_NOTE_FONT_SIZE_INCREMENT
         self._note_font = ImageFont.truetype(consts.NOTE_FONT, font_size)
         self._text_font = ImageFont.truetype(consts.TEXT_FONT, self._scaler(consts.TEXT_FONT_SIZE))
 
-    def _add_image(self, key: int):
-        self._images[key] =Image.new("RGB", consts.EXPORT_SHEET_SIZE, (255, 255, 255))
-
-    def _add_draft(self, key: int, image):
-        self._drafts[key] = ImageDraw.Draw(image)
-
     def _draw_grid_line(self, page, line: tuple, width, fill):
         """Draws one line of musical measure grid on image
 
@@ -47,127 +98,226 @@ class ImageCreator:
             measure_lenght: Height of each section of grid (1 unit = 220px)
             drawing_function: Function used for drawing grid
         """
-        x_axis = list(self._scaler(consts.GRID_X))
-        y_axis = list(self._scaler(consts.GRID_Y))
-        x_axis[1] -= (x_axis[1] - x_axis[0]) % (self._scaler(consts.NOTE_ROW_SPACING) * spacing)
-        increment = self._scaler(consts.NOTE_ROW_SPACING) * spacing
-        for temp_x in range(x_axis[0], x_axis[1] + 3, increment):
-            drawing_function(
-                page,
-                ((temp_x, y_axis[0]), (temp_x, y_axis[1])),
-                self._scaler(consts.GRID_LINE_WIDHT), consts.GRID_COLOR
-                )
-        increment = self._scaler(consts.VERTICAL_SPACE_PER_FOURTH_NOTE) * measure_lenght
-        for temp_y in range(y_axis[0], y_axis[1] + 1, increment):
-            drawing_function(
-                page,
-                ((x_axis[0], temp_y), (x_axis[1], temp_y)),
-                self._scaler(consts.GRID_LINE_WIDHT), consts.GRID_COLOR
-                )
+        width = self._scaler(consts.GRID_LINE_WIDHT)
+        for line in grid_lines(spacing, measure_lenght):
+            drawing_function(page, self._scaler(line), width, self._grid_ink)
 
-    def create_images(self, music: ShakuMusic, grid_included: bool=False):
+    def page_template(self, context: LayoutContext, grid_included: bool=False):
+        """Get an empty page, rendered only once for each spacing and measure lenght
+
+        Args:
+            context: LayoutContext of the sheet
+            grid_included: If True, page has a measure grid. Defaults to False.
+
+        Returns:
+            PIL Image instance, to be copied before drawing on it
+        """
+        key = (context.spacing, context.measure_lenght) if grid_included else None
+        template = self._templates.get(key)
+        if template is None:
+            template = Image.new(self._color_mode, consts.EXPORT_SHEET_SIZE, self._paper)
+            if grid_included:
+                self.draw_grid(context.spacing, context.measure_lenght, ImageDraw.Draw(template), self._draw_grid_line)
+            self._templates[key] = template
+        return template
+
+    def page_count(self, music: ShakuMusic, context: LayoutContext=None):
+        """Get count of pages of sheet music
+
+        Args:
+            music: ShakuMusic instance
+            context: LayoutContext to draw with, built from music spacing and environment if None
+
+        Returns:
+            Count of pages
+        """
+        if context is None:
+            context = LayoutContext.from_env(music.spacing)
+        return len(self._display_lists.get_display_list(music, context).pages)
+
+    def create_images(self, music: ShakuMusic, grid_included: bool=False, context: LayoutContext=None):
         """Receives musical notation, scales it, re-aligns it and draws it on PIL Image
 
         Args:
             music: ShakuMusic instance containing notations, name and composer to draw on image
             grid_included: If True, a measure grid is drawn on sheet music image. Defaults to False.
+            context: LayoutContext to draw with, built from music spacing and environment if None
 
         Returns:
-            PIL Image instance with given details drawn on it
+            Dictionary mapping page numbers to PIL Image instances with given details drawn on them
         """
-        measures = consts.MODE_DATA[os.getenv("MODE")]["MEASURES"]
         if music is None:
             raise TypeError("No music instance provided")
-        rows = self._pos.get_row_count(music.spacing)
-        slots = self._pos.get_slot_count(measures)
-        for part in music.parts.values():
-            rel_pos = self._pos.get_relative_positions([note.lenght for note in part.notes], rows, slots, measures)
-            for i in range(len(part.notes)):
-                page = rel_pos[i]["page"] + 1
-                if page not in self._images:
-                    self._add_image(page)
-                    self._add_draft(page, self._images[page])
-                position = self._pos.get_coordinates(rel_pos[i], part.part_no, music.spacing, measures)
-                x_axis, y_axis = self._scaler(position)
-                x_axis += consts.EXPORT_NOTE_CORRECTION_ON_X_AXIS
-                text = consts.NOTE_TEXT_CODES[part.notes[i].pitch]
-                self._drafts[page].text(
-                    (x_axis, y_axis),
-                    text,
-                    font=self._note_font,
-                    anchor="lt",
-                    fill=consts.NOTE_COLOR
-                )
-        name_position = self._scaler(consts.NAME_POSITION)
-        composer_position = self._scaler(consts.COMPOSER_POSITION)
-        self._drafts[1].text(
-            name_position,
-            music.name,
-            font=self._text_font,
-            anchor="rt",
-            fill=consts.TEXT_COLOR
-            )
-        self._drafts[1].text(
-            composer_position,
-            music.composer,
-            font=self._text_font,
-            anchor="lt",
-            fill=consts.TEXT_COLOR
-            )
-        width = consts.RHYTHM_NOTATION_WIDHT_EXPORT
-        if grid_included:
-            for draft in self._drafts.values():
-                self.draw_grid(music.spacing, consts.MEASURE_LENGHT, draft, self._draw_grid_line)
-        self._draw_all_time_notations(music)
+        if context is None:
+            context = LayoutContext.from_env(music.spacing)
+        display_list = self._display_lists.get_display_list(music, context)
+        self._images = {}
+        for number, page in display_list.pages.items():
+            self._images[number] = self.render_page(page, context, grid_included)
         return self._images
 
-    def _draw_time_notation(self, notation, page):
-        fill = consts.NOTE_COLOR
-        width = consts.RHYTHM_NOTATION_WIDHT_EXPORT
-        page = self._drafts[page]
-        if len(notation) == 6:
-            notation = notation[:2] + notation[4:]
-            page.arc(notation, 0, 180, 0) 
+    def export_pages(self, music: ShakuMusic, grid_included: bool=False, context: LayoutContext=None, image_format: str="PDF"):
+        """Render pages of sheet music encoded in given format
+
+        Pages are rendered as by iter_pages. Output is identical to rendering with one worker.
+
+        Args:
+            music: ShakuMusic instance containing notations, name and composer to draw on image
+            grid_included: If True, a measure grid is drawn on sheet music image. Defaults to False.
+            context: LayoutContext to draw with, built from music spacing and environment if None
+            image_format: PIL image format to encode pages in. Defaults to "PDF".
+
+        Returns:
+            Dictionary mapping page numbers to encoded pages as bytes
+        """
+        return dict(self.iter_pages(music, grid_included, context, image_format))
+
+    def iter_pages(self, music: ShakuMusic, grid_included: bool=False, context: LayoutContext=None, image_format: str="PDF"):
+        """Render pages of sheet music encoded in given format one at a time, for streaming them to a file
+
+        Pages are rendered only as they are consumed, so at most one page per worker
+        is held in memory regardless of lenght of music. With more than one worker,
+        upcoming pages are rendered in worker processes while earlier ones are consumed,
+        each sent back encoded instead of as a raw bitmap. PDF pages are documents of
+        their own, to be copied into one document with PdfWriter. With a cache, only
+        pages not rendered with the same content and settings before are rendered.
+
+        Args:
+            music: ShakuMusic instance containing notations, name and composer to draw on image
+            grid_included: If True, a measure grid is drawn on sheet music image. Defaults to False.
+            context: LayoutContext to draw with, built from music spacing and environment if None
+            image_format: PIL image format to encode pages in. Defaults to "PDF".
+
+        Yields:
+            (page number, encoded page as bytes) -tuples in page order
+        """
+        if music is None:
+            raise TypeError("No music instance provided")
+        if context is None:
+            context = LayoutContext.from_env(music.spacing)
+        display_list = self._display_lists.get_display_list(music, context)
+        save_options = self._save_options(image_format)
+        settings = (
+            "image", image_format, self._color_mode, context.key, grid_included,
+            consts.TEXT_FONT_SIZE, consts.EXPORT_RENDERER_VERSION
+            )
+        if self._workers <= 1 or len(display_list.pages) <= 1:
+            for number, page in display_list.pages.items():
+                key, data = self._cached_page(page, settings)
+                if data is None:
+                    data = self._cache_page(key, self.encode_page(page, context, grid_included, save_options))
+                yield number, data
+            return
+        with spawn_pool(min(self._workers, len(display_list.pages))) as pool:
+            pending = deque()
+            for number, page in display_list.pages.items():
+                key, data = self._cached_page(page, settings)
+                if data is None:
+                    data = pool.submit(_render_page, (self._color_mode, page, context, grid_included, save_options))
+                pending.append((number, key, data))
+                if len(pending) >= self._workers:
+                    yield self._received_page(*pending.popleft())
+            while pending:
+                yield self._received_page(*pending.popleft())
+
+    def _cached_page(self, page: DisplayPage, settings: tuple):
+        """Internal function, get (key, encoded page) of page in cache, encoded page being None if not cached"""
+        if self._cache is None:
+            return None, None
+        key = self._cache.key(page, settings)
+        return key, self._cache.get(key)
+
+    def _cache_page(self, key: str, data: bytes):
+        """Internal function, store encoded page in cache if there is one, returning it"""
+        if self._cache is not None:
+            self._cache.put(key, data)
+        return data
+
+    def _received_page(self, number: int, key: str, data):
+        """Internal function, get cached page or wait for page rendered by worker process and cache it"""
+        if isinstance(data, bytes):
+            return number, data
+        return number, self._cache_page(key, data.result())
+
+    def _save_options(self, image_format: str):
+        """Internal function, get keyword arguments for PIL Image.save encoding pages in given format"""
+        save_options = {"format": image_format}
+        if image_format == "PDF": # same timestamp on every page, whichever process renders it
+            save_options["creationDate"] = save_options["modDate"] = time.gmtime()
+        return save_options
+
+    def render_page(self, page: DisplayPage, context: LayoutContext, grid_included: bool=False):
+        """Draw one page of display list on a new PIL Image
+
+        Args:
+            page: DisplayPage instance
+            context: LayoutContext of the sheet
+            grid_included: If True, a measure grid is drawn on page. Defaults to False.
+
+        Returns:
+            PIL Image instance
+        """
+        image = self.page_template(context, grid_included).copy()
+        self._draw_page(image, page)
+        return image
+
+    def encode_page(self, page: DisplayPage, context: LayoutContext, grid_included: bool, save_options: dict):
+        """Draw one page of display list and encode it
+
+        Args:
+            page: DisplayPage instance
+            context: LayoutContext of the sheet
+            grid_included: If True, a measure grid is drawn on page
+            save_options: keyword arguments for PIL Image.save, including format
+
+        Returns:
+            Encoded page as bytes
+        """
+        output = BytesIO()
+        self.render_page(page, context, grid_included).save(output, **save_options)
+        return output.getvalue()
+
+    def _draw_page(self, image, page: DisplayPage):
+        """Draw primitives of one page of display list
+
+        Args:
+            image: PIL Image instance of page, with measure grid already on it if included
+            page: DisplayPage instance
+        """
+        draft = ImageDraw.Draw(image)
+        for glyph in page.notes:
+            self._draw_glyph(image, glyph)
+        for text in page.texts:
+            draft.text(
+                self._scaler(text.position),
+                text.text,
+                font=self._text_font,
+                anchor="rt" if text.align == "right" else "lt",
+                fill=self._text_ink
+                )
+        for item in page.rhythms:
+            if isinstance(item, Glyph):
+                self._draw_glyph(image, item)
+            else:
+                self._draw_time_notation(draft, item)
+
+    def _draw_glyph(self, image, glyph: Glyph):
+        x_axis, y_axis = self._scaler(glyph.position)
+        x_axis += consts.EXPORT_NOTE_CORRECTION_ON_X_AXIS
+        self._glyphs.paste(
+            image,
+            (x_axis, y_axis),
+            consts.NOTE_TEXT_CODES[glyph.pitch],
+            self._note_font,
+            self._note_ink
+        )
+
+    def _draw_time_notation(self, draft, item: Line):
+        notation = self._scaler(item.points)
+        if isinstance(item, Arc):
+            x_start, y_start, x_end, y_end = notation[:2] + notation[4:]
+            if y_end < y_start: # tie from a note on previous row
+                y_start, y_end = y_end, y_start
+            draft.arc((x_start, y_start, x_end, y_end), 0, 180, self._note_ink)
         else:
-            page.line(notation, width=width, fill=fill)
-
-    def _draw_all_time_notations(self, music: ShakuMusic):
-        measures = consts.MODE_DATA[os.getenv("MODE")]["MEASURES"]
-        mode = os.getenv("MODE")
-        rhy = ShakuRhythmNotation(mode)
-        pos = ShakuPositions()
-        rows = pos.get_row_count(music.spacing)
-        slots = pos.get_slot_count(measures)
-
-        for part in music.parts.values():
-            rel_pos = pos.get_relative_positions([note.lenght for note in part.notes], rows, slots, measures)
-            posses = [pos.get_coordinates(i, part.part_no, music.spacing, measures) for i in rel_pos]
-            if mode == "Tozan":
-                i = 0
-                while i < len(part.notes):
-                    orig_i = i
-                    page = rel_pos[i]["page"]
-                    while i < len(part.notes) and rel_pos[i]["page"] == page:
-                        i += 1
-                    temp_posses = [posses[x] for x in range(orig_i, i)]
-                    temp_notes = [part.notes[x] for x in range(orig_i, i)]
-                    notations = rhy.tozan_rhytms(temp_notes, temp_posses)
-                    for notation in notations:
-                        if isinstance(notation[0], ShakuNote): # "ghost note", a note needs to be redrawn after measure line
-                            note = notation[0]
-                            position = list(notation[1])
-                            if position[1] == consts.PARTS_Y_START:
-                                position[0] -= music.spacing * consts.NOTE_ROW_SPACING
-                            text = consts.NOTE_TEXT_CODES[note.pitch]
-                            x_axis, y_axis = self._scaler(position)
-                            x_axis += consts.EXPORT_NOTE_CORRECTION_ON_X_AXIS
-                            self._drafts[page + 1].text(
-                                (x_axis, y_axis),
-                                text,
-                                font=self._note_font,
-                                anchor="lt",
-                                fill=consts.NOTE_COLOR
-                            )
-                        else:
-                            notation = self._scaler(notation)
-                            self._draw_time_notation(notation, page + 1)
+            draft.line(notation, width=consts.RHYTHM_NOTATION_WIDHT_EXPORT, fill=self._note_ink)
@@ -0,0 +1,210 @@
+import numpy as np
+from entities.shaku_part import ShakuPart
+from services.positioning import ShakuPositions
+from services.layout_context import LayoutContext
+
+class PartLayout:
+    """Relative positions and absolute coordinates of the notes of one part
+
+    Columns are numpy arrays, with an entry for each note of part. They are views of
+    preallocated arrays whose capacity is doubled when full, so adding notes writes
+    only the new rows. Views are valid until layout is next truncated or extended.
+
+    Attributes:
+        part: ShakuPart instance the layout belongs to
+        pages: page of each note (0 being first page)
+        rows: row of each note on its page
+        slots: slot of each note on its row
+        xs: x-coordinate of each note on sheet
+        ys: y-coordinate of each note on sheet
+    """
+    def __init__(self, part: ShakuPart, capacity: int=64):
+        """Constructor, initializes an empty layout
+
+        Args:
+            part: ShakuPart instance the layout belongs to
+            capacity: count of notes to allocate room for at first. Defaults to 64.
+        """
+        self._part = part
+        self._lenght = 0
+        self._pages = np.zeros(capacity, dtype=np.int64)
+        self._rows = np.zeros(capacity, dtype=np.int64)
+        self._slots = np.zeros(capacity)
+        self._xs = np.zeros(capacity)
+        self._ys = np.zeros(capacity)
+
+    def __len__(self):
+        return self._lenght
+
+    @property
+    def part(self):
+        """Get part the layout belongs to"""
+        return self._part
+
+    @property
+    def pages(self):
+        """Get page of each note"""
+        return self._pages[:self._lenght]
+
+    @property
+    def rows(self):
+        """Get row of each note"""
+        return self._rows[:self._lenght]
+
+    @property
+    def slots(self):
+        """Get slot of each note"""
+        return self._slots[:self._lenght]
+
+    @property
+    def xs(self):
+        """Get x-coordinate of each note"""
+        return self._xs[:self._lenght]
+
+    @property
+    def ys(self):
+        """Get y-coordinate of each note"""
+        return self._ys[:self._lenght]
+
+    def position(self, note_id: int):
+        """Get relative position of a note
+
+        Args:
+            note_id: number of note in part
+
+        Returns:
+            dict depicting page, row and slot of note
+        """
+        return {
+            "page": int(self.pages[note_id]),
+            "row": int(self.rows[note_id]),
+            "slot": float(self.slots[note_id])
+            }
+
+    def coordinates(self, start: int=0, end: int=None):
+        """Get absolute coordinates of a range of notes
+
+        Args:
+            start: number of first note. Defaults to 0.
+            end: number of note after last one, defaults to end of part
+
+        Returns:
+            list of (x, y) -tuples
+        """
+        return list(zip(self.xs[start:end].tolist(), self.ys[start:end].tolist()))
+
+    def page_ranges(self, first_page: int=0):
+        """Get ranges of notes on each page
+
+        Args:
+            first_page: first page to include (0 being first page). Defaults to 0.
+
+        Returns:
+            list of (page, start, end) -tuples, where notes start...end - 1 are on page
+        """
+        if len(self) == 0:
+            return []
+        pages = self.pages
+        starts = np.flatnonzero(np.concatenate(([True], pages[1:] != pages[:-1])))
+        ends = np.append(starts[1:], len(self))
+        ranges = zip(pages[starts].tolist(), starts.tolist(), ends.tolist())
+        return [page_range for page_range in ranges if page_range[0] >= first_page]
+
+    def truncate(self, note_id: int):
+        """Forget positions from given note onward
+
+        Args:
+            note_id: number of first note to forget
+        """
+        self._lenght = min(max(note_id, 0), self._lenght)
+
+    def extend(self, pages, rows, slots, xs, ys):
+        """Add positions and coordinates of the next notes
+
+        Args:
+            pages: array of pages of notes
+            rows: array of rows of notes
+            slots: array of slots of notes
+            xs: array of x-coordinates of notes
+            ys: array of y-coordinates of notes
+        """
+        start = self._lenght
+        end = start + len(pages)
+        if end > len(self._pages):
+            self._grow(end)
+        self._pages[start:end] = pages
+        self._rows[start:end] = rows
+        self._slots[start:end] = slots
+        self._xs[start:end] = xs
+        self._ys[start:end] = ys
+        self._lenght = end
+
+    def _grow(self, needed: int):
+        """Internal function, doubles capacity of columns until given count of notes fits"""
+        capacity = max(len(self._pages), 1)
+        while capacity < needed:
+            capacity *= 2
+        for name in ("_pages", "_rows", "_slots", "_xs", "_ys"):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self._lenght] = column[:self._lenght]
+            setattr(self, name, grown)
+
+class LayoutCache:
+    """Per part cache of note layouts, recomputed only from the first changed note onward
+
+    Cached layouts are valid for one layout context (spacing, measure lenght and
+    notation mode), any change in these drops all layouts.
+    """
+    def __init__(self):
+        """Constructor, initializes an empty cache"""
+        self._pos = ShakuPositions()
+        self._key = None
+        self._layouts = {}
+
+    def _set_context(self, context: LayoutContext):
+        """Internal function, drops cached layouts if layout settings have changed"""
+        if context.key == self._key:
+            return
+        self._key = context.key
+        self._layouts = {}
+
+    def get_layout(self, part: ShakuPart, context: LayoutContext):
+        """Get up to date layout of a part
+
+        Args:
+            part: ShakuPart instance to get layout for
+            context: LayoutContext of the sheet
+
+        Returns:
+            PartLayout instance covering every note of part
+        """
+        self._set_context(context)
+        first_changed = part.consume_changes(self)
+        layout = self._layouts.get(part.part_no)
+        if layout is None or layout.part is not part:
+            layout = self._layouts[part.part_no] = PartLayout(part)
+        elif first_changed is not None:
+            layout.truncate(first_changed)
+        self._extend(layout, context)
+        return layout
+
+    def _extend(self, layout: PartLayout, context: LayoutContext):
+        """Internal function, lays out notes missing from layout resuming from its last note"""
+        part = layout.part
+        done = len(layout)
+        lenghts = part.lenghts
+        if done >= len(lenghts):
+            return
+        if done == 0:
+            pages, rows, slots = self._pos.get_relative_position_arrays(
+                lenghts, context.rows, context.slots, context.measures
+                )
+        else:
+            checkpoint = layout.position(done - 1)
+            pages, rows, slots = self._pos.get_relative_position_arrays(
+                lenghts[done - 1:], context.rows, context.slots, context.measures, start=checkpoint
+                )
+            pages, rows, slots = pages[1:], rows[1:], slots[1:]
+        xs, ys = self._pos.get_coordinate_arrays(rows, slots, part.part_no, context)
+        layout.extend(pages, rows, slots, xs, ys)
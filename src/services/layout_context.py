@@ -0,0 +1,139 @@
+import os
+import config.shaku_constants as consts
+from services.positioning import ShakuPositions
+
+class LayoutContext:
+    """Immutable layout settings of a sheet and values precomputed from them
+
+    Built once per render so that positioning, rhythm notation and drawing code
+    do not need to look up environment variables or mode data in their loops.
+
+    Attributes:
+        spacing: music spacing (row size multiplier)
+        measure_lenght: lenght of a measure (1 unit = 2 quarter notes)
+        mode: notation system (eg. "Tozan")
+        mode_data: data of notation system from MODE_DATA
+        measures: whether notation system uses measures
+        rows: count of rows per page
+        slots: count of shortest note slots per row
+        row_distance: x-axis distance between rows of a part
+        measure_skip_count: count of measure skips per row
+        measure_slots: count of slots per measure
+        measure_duration: sum of note lenghts filling a measure
+        measure_height: y-axis distance between start of a measure and the next one
+        key: tuple identifying the settings, for use as a cache key
+    """
+    def __init__(self, spacing: int, measure_lenght: int, mode: str):
+        """Constructor, precomputes layout values
+
+        Args:
+            spacing: music spacing (row size multiplier)
+            measure_lenght: lenght of a measure (1 unit = 2 quarter notes)
+            mode: notation system (eg. "Tozan")
+        """
+        positioner = ShakuPositions()
+        self._spacing = spacing
+        self._measure_lenght = measure_lenght
+        self._mode = mode
+        self._mode_data = consts.MODE_DATA[mode]
+        self._measures = self._mode_data["MEASURES"]
+        self._rows = positioner.get_row_count(spacing)
+        self._slots = positioner.get_slot_count(self._measures, measure_lenght)
+        self._row_distance = consts.NOTE_ROW_SPACING * spacing
+        self._measure_skip_count = positioner.get_measure_skip_count(measure_lenght)
+        self._measure_slots = measure_lenght * 4
+        self._measure_duration = measure_lenght * 8
+        self._measure_height = self._measure_slots * consts.NOTE_Y_SPACING + consts.MEASURE_SKIP_LENGHT
+        self._start_x = tuple(
+            positioner.calculate_start(part, spacing) for part in range(consts.MAX_PARTS + 1)
+            )
+
+    @classmethod
+    def from_env(cls, spacing: int):
+        """Build a context from spacing of music and settings in environment variables
+
+        Args:
+            spacing: music spacing (row size multiplier)
+
+        Returns:
+            LayoutContext instance
+        """
+        return cls(spacing, int(os.getenv("MEASURE_LENGHT")), os.getenv("MODE"))
+
+    @property
+    def spacing(self):
+        """Get music spacing"""
+        return self._spacing
+
+    @property
+    def measure_lenght(self):
+        """Get measure lenght"""
+        return self._measure_lenght
+
+    @property
+    def mode(self):
+        """Get notation system"""
+        return self._mode
+
+    @property
+    def mode_data(self):
+        """Get data of notation system"""
+        return self._mode_data
+
+    @property
+    def measures(self):
+        """Get whether notation system uses measures"""
+        return self._measures
+
+    @property
+    def rows(self):
+        """Get count of rows per page"""
+        return self._rows
+
+    @property
+    def slots(self):
+        """Get count of slots per row"""
+        return self._slots
+
+    @property
+    def row_distance(self):
+        """Get x-axis distance between rows of a part"""
+        return self._row_distance
+
+    @property
+    def measure_skip_count(self):
+        """Get count of measure skips per row"""
+        return self._measure_skip_count
+
+    @property
+    def measure_slots(self):
+        """Get count of slots per measure"""
+        return self._measure_slots
+
+    @property
+    def measure_duration(self):
+        """Get sum of note lenghts filling a measure"""
+        return self._measure_duration
+
+    @property
+    def measure_height(self):
+        """Get y-axis distance between start of a measure and the next one"""
+        return self._measure_height
+
+    @property
+    def key(self):
+        """Get tuple identifying the settings"""
+        return (self._spacing, self._measure_lenght, self._mode)
+
+    def start_x(self, part: int):
+        """Get x-axis startpoint of a part
+
+        Args:
+            part: part number
+
+        Returns:
+            x-axis startpoint for part on sheet
+        """
+        if 0 <= part < len(self._start_x):
+            return self._start_x[part]
+        return ShakuPositions().calculate_start(part, self._spacing)
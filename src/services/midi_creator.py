@@ -49,15 +49,16 @@ class MidiTrack:
         Args:
             part: ShakuPart instance with note information to be filled to track
         """
-        for note in part.notes:
-            self._notes.append(self._notemap[note.pitch])
-            self._lenghts.append(note.lenght / 8)
+        for pitch, lenght in zip(part.pitches, part.lenghts):
+            self._notes.append(self._notemap[pitch])
+            self._lenghts.append(lenght / 8)
 
 class MidiCreator:
     """Class for generating MIDI -format audio representation from ShakuNotator's music format
 
     Attributes:
         tempo: Tempo for MIDI file
+        instrument: MIDI program number of instrument used on every track
         tracks: List of MidiTrack instances containing pitch and lenght data for each track
         volume: Volume for MIDI file
     """
@@ -71,6 +72,27 @@ class MidiCreator:
         self._tempo = int(os.getenv("TEMPO"))
         self._tracks = {}
         self._volume = int(os.getenv("VOLUME"))
+        self._instrument = int(os.getenv("MIDI_INSTRUMENT_NUMBER"))
+
+    @property
+    def tempo(self):
+        """Get tempo in beats per minute"""
+        return self._tempo
+
+    @property
+    def volume(self):
+        """Get volume (velocity) of notes"""
+        return self._volume
+
+    @property
+    def instrument(self):
+        """Get MIDI program number of instrument"""
+        return self._instrument
+
+    @property
+    def tracks(self):
+        """Get dictionary mapping track numbers to MidiTrack instances"""
+        return self._tracks
 
     def create_track(self, part: ShakuPart, ro_daimeri_pitch: int=60):
         """Generates track and adds it to list of tracks to be written together into MIDI format
@@ -89,19 +111,11 @@ class MidiCreator:
         Returns:
             MIDI -format music representation
         """
-        if len(self._tracks) == 0:
-            raise ValueError("No tracks to generate MIDI")
-        found = False
-        for track in self._tracks.values():
-            if len(track.notes) > 0:
-                found = True
-                break
-        if not found:
-            raise ValueError("No notes on any track to generate MIDI from")
+        self._check_tracks()
         file = MIDIFile(len(self._tracks))
         time = 0
         for track_id, track in self._tracks.items():
-            file.addProgramChange(track_id, track.channel, 0, int(os.getenv("MIDI_INSTRUMENT_NUMBER")))
+            file.addProgramChange(track_id, track.channel, 0, self._instrument)
             file.addTempo(track_id, time, self._tempo)
             for num, pitch in enumerate(track.notes):
                 volume = 0 if pitch < 0 else self._volume # negative pitch represents break
@@ -109,3 +123,36 @@ class MidiCreator:
                 time += (track.lenghts[num])
             time = 0
         return file
+
+    def generate_events(self):
+        """Generates note on and off events of tracks in time order, for driving a synthesizer
+
+        Events describe the same notes generate_midi writes, except breaks are left silent.
+
+        Returns:
+            List of (time in beats, channel, MIDI pitch, velocity) -tuples,
+            velocity 0 ending a note. Ends of notes precede starts of notes at same time.
+        """
+        self._check_tracks()
+        events = []
+        for track in self._tracks.values():
+            time = 0
+            for num, pitch in enumerate(track.notes):
+                if pitch > 0: # breaks are mapped to pitch 0
+                    events.append((time, track.channel, pitch, self._volume))
+                    events.append((time + track.lenghts[num], track.channel, pitch, 0))
+                time += track.lenghts[num]
+        events.sort(key=lambda event: (event[0], event[3] > 0))
+        return events
+
+    def _check_tracks(self):
+        """Internal function, raises ValueError if there are no notes to generate music from"""
+        if len(self._tracks) == 0:
+            raise ValueError("No tracks to generate MIDI")
+        found = False
+        for track in self._tracks.values():
+            if len(track.notes) > 0:
+                found = True
+                break
+        if not found:
+            raise ValueError("No notes on any track to generate MIDI from")
@@ -1,38 +1,52 @@
-import os
-import pygame
 import config.shaku_constants as consts
-from services.midi_creator import MidiCreator
-from services.conversions import MusicConverter
-from services.filing import FileManager
+from services.audio_engine import AudioEngine
 
 class MusicPlayer:
     """Class for playing music generated from Shakunotator Music -format
 
+    Music is synthesized into memory by an AudioEngine and played from there, without temporary files.
+    With a scheduler, music is streamed: playback starts as soon as the first measures
+    are synthesized, and the rest are synthesized and queued while playing.
+
     Attributes:
-        filemanager: FileManager -instance for handling loading and saving files
-        midi_creator: MidiCreator instance for generating MIDI -format music representation
+        engine: AudioEngine instance rendering and playing music
+        schedule: function calling a function after given milliseconds, eg. tkinter after
     """
-    def __init__(self):
-        """Constructor, sets up class instances and inits pygame mixer"""
-        self._filemanager = FileManager()
-        pygame.mixer.init()
+    def __init__(self, engine: AudioEngine, schedule=None):
+        """Constructor
+
+        Args:
+            engine: AudioEngine instance to render and play music with
+            schedule: function(milliseconds, function) to poll stream with, music is
+                synthesized in full before playing if None. Defaults to None.
+        """
+        self._engine = engine
+        self._schedule = schedule
 
-    def play(self, parts: list):
+    @property
+    def playing(self):
+        """Get True if music is being played"""
+        return self._engine.playing
+
+    def play(self, parts: list, muted=(), solo=()):
         """Plays inputted parts with fluidsynth
 
         Args:
             parts: List of musical score parts in Shakunotator's Part -instance format
+            muted: numbers of parts not heard. Defaults to ().
+            solo: numbers of parts heard, if any, others are not heard. Defaults to ().
         """
-        self._midi_creator = MidiCreator()
-        for part in parts:
-            self._midi_creator.create_track(part)
-        midi = self._midi_creator.generate_midi()
-        tmp_filename = "tmpshaku"
-        self._filemanager.save_midi(midi, tmp_filename + ".mid")
-        converter = MusicConverter()
-        converter.convert(tmp_filename + ".mid", tmp_filename + ".wav")
-        pygame.mixer.init()
-        pygame.mixer.music.load(tmp_filename + ".wav")
-        pygame.mixer.music.play(0, 0.0)
-        os.remove(tmp_filename + ".mid")
-        os.remove(tmp_filename + ".wav")
+        if self._schedule is None:
+            self._engine.play(self._engine.render(parts, muted=muted, solo=solo))
+            return
+        self._engine.play_stream(self._engine.stream(parts, muted=muted, solo=solo))
+        self._pump()
+
+    def _pump(self):
+        """Internal function, queues streamed music and polls again until all of it is queued"""
+        if self._engine.pump():
+            self._schedule(consts.STREAM_POLL_INTERVAL, self._pump)
+
+    def stop(self):
+        """Stops music being played"""
+        self._engine.stop()
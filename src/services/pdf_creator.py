@@ -0,0 +1,258 @@
+import zlib
+from io import BytesIO
+from PIL import Image, ImageDraw, ImageFont
+import config.shaku_constants as consts
+from entities.shaku_music import ShakuMusic
+from services.conversions import GraphicsConverter
+from services.display_list import DisplayListBuilder, DisplayPage, Glyph, Arc, Text, grid_lines
+from services.export_cache import ExportCache
+from services.layout_context import LayoutContext
+from services.pdf_writer import PdfWriter
+
+PAGE_SIZE = (595.28, 841.89) # A4 paper in points
+BEZIER_CIRCLE = 0.5523 # control point distance of a quarter circle drawn with one cubic curve
+
+def _number(value, digits: int=2):
+    """Format a number for PDF content stream"""
+    if value == int(value):
+        return str(int(value))
+    return f"{value:.{digits}f}".rstrip("0").rstrip(".")
+
+def _string(text: str):
+    """Format text as PDF literal string"""
+    return "(" + text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+def _color(color: tuple):
+    """Format an RGB colour as three PDF colour components"""
+    return " ".join(_number(value / 255, 3) for value in color)
+
+class PdfCreator:
+    """Class for generating a vector PDF document of sheet music
+
+    Notes are drawn as text with the ShakuNotator font embedded in the document,
+    and measure grid and rhythm notation as paths. Coordinates are those of
+    exported images (EXPORT_SHEET_SIZE), scaled to A4 paper. Name and composer
+    may contain any characters the text font has, so they are embedded as
+    black and white image masks rendered with the text font.
+    """
+    def __init__(self, display_lists: DisplayListBuilder=None, cache: ExportCache=None):
+        """Constructor, loads fonts and measures glyphs of note font
+
+        Args:
+            display_lists: Builder of display lists to use, a new one is created if None
+            cache: Cache of pages made by create_pdf, pages are not cached if None
+        """
+        self._display_lists = display_lists if display_lists is not None else DisplayListBuilder()
+        self._cache = cache
+        self._scaler = GraphicsConverter().scale
+        self._note_size = self._scaler(consts.SHEET_NOTE_SIZE) + consts.EXPORT_NOTE_FONT_SIZE_INCREMENT
+        self._baselines = self._glyph_baselines(ImageFont.truetype(consts.NOTE_FONT, self._note_size))
+        self._text_font = ImageFont.truetype(consts.TEXT_FONT, self._scaler(consts.TEXT_FONT_SIZE))
+
+    def _glyph_baselines(self, font: ImageFont.FreeTypeFont):
+        """Get distance of baseline from the top left anchor ImageCreator draws each glyph from
+
+        Args:
+            font: note font in export size
+
+        Returns:
+            Dictionary mapping note glyph characters to distances
+        """
+        baselines = {}
+        for code in set(consts.NOTE_TEXT_CODES.values()):
+            top = font.getbbox(code, anchor="lt")[1]
+            baseline = font.getbbox(code, anchor="ls")[1]
+            baselines[code] = top - baseline
+        return baselines
+
+    def create_pdf(self, music: ShakuMusic, grid_included: bool=False, context: LayoutContext=None):
+        """Generates a PDF document of sheet music
+
+        Each page is made into a PDF document of its own, without embedding note font,
+        and copied into the document, where all pages share one embedded note font.
+        With a cache, pages made with the same content and settings before are not made again.
+
+        Args:
+            music: ShakuMusic instance containing notations, name and composer to draw
+            grid_included: If True, a measure grid is drawn on pages. Defaults to False.
+            context: LayoutContext to draw with, built from music spacing and environment if None
+
+        Returns:
+            PDF document as bytes
+        """
+        if music is None:
+            raise TypeError("No music instance provided")
+        if context is None:
+            context = LayoutContext.from_env(music.spacing)
+        display_list = self._display_lists.get_display_list(music, context)
+        settings = ("pdf", context.key, grid_included, consts.TEXT_FONT_SIZE, consts.EXPORT_RENDERER_VERSION)
+        grid = self._grid_content(context) if grid_included else ""
+        output = BytesIO()
+        writer = PdfWriter(output)
+        font = self._add_font(writer)
+        for page in display_list.pages.values():
+            writer.add_page(self._page_document(page, grid, settings), {"F1": font})
+        writer.close()
+        return output.getvalue()
+
+    def _page_document(self, page: DisplayPage, grid: str, settings: tuple):
+        """Internal function, gets page of display list as PDF document of its own, from cache if it is there"""
+        key = self._cache.key(page, settings) if self._cache is not None else None
+        document = self._cache.get(key) if key is not None else None
+        if document is None:
+            output = BytesIO()
+            writer = PdfWriter(output)
+            self._add_page(writer, page, self._add_font(writer, embedded=False), grid)
+            writer.close()
+            document = output.getvalue()
+            if key is not None:
+                self._cache.put(key, document)
+        return document
+
+    def _add_stream(self, writer: PdfWriter, data: bytes, dictionary: str=""):
+        """Internal function, adds a compressed stream object and returns its number"""
+        data = zlib.compress(data)
+        return writer.add_object(f"<< {dictionary} /Length {len(data)} /Filter /FlateDecode >>", data)
+
+    def _add_font(self, writer: PdfWriter, embedded: bool=True):
+        """Internal function, adds note font and returns number of its font object
+
+        Args:
+            writer: PdfWriter of document
+            embedded: if False, font file is not embedded. Defaults to True.
+        """
+        metrics = ImageFont.truetype(consts.NOTE_FONT, 1000)
+        ascent, descent = metrics.getmetrics()
+        widths = " ".join(str(round(metrics.getlength(chr(code)))) for code in range(32, 127))
+        font_file = ""
+        if embedded:
+            with open(consts.NOTE_FONT, "rb") as file:
+                data = file.read()
+            font_file = f" /FontFile2 {self._add_stream(writer, data, f'/Length1 {len(data)}')} 0 R"
+        name = metrics.getname()[0]
+        descriptor = writer.add_object(
+            f"<< /Type /FontDescriptor /FontName /{name} /Flags 32 /FontBBox [0 {-descent} 1000 {ascent}]"
+            f" /ItalicAngle 0 /Ascent {ascent} /Descent {-descent} /CapHeight {ascent} /StemV 80{font_file} >>"
+            )
+        return writer.add_object(
+            f"<< /Type /Font /Subtype /TrueType /BaseFont /{name} /FirstChar 32 /LastChar 126"
+            f" /Widths [{widths}] /Encoding /WinAnsiEncoding /FontDescriptor {descriptor} 0 R >>"
+            )
+
+    def _add_page(self, writer: PdfWriter, page: DisplayPage, font: int, grid: str):
+        """Internal function, adds a page of display list and returns number of its page object"""
+        images = {}
+        content = [
+            # y-axis flipped, so that content is drawn in image coordinates from top left corner
+            f"{_number(PAGE_SIZE[0] / consts.EXPORT_SHEET_SIZE[0], 6)} 0 0"
+            f" {_number(-PAGE_SIZE[1] / consts.EXPORT_SHEET_SIZE[1], 6)} 0 {_number(PAGE_SIZE[1])} cm",
+            "0 J",
+            self._glyph_content(page.notes)
+            ]
+        for number, text in enumerate(page.texts):
+            mask, offset = self._text_mask(text)
+            if mask.width == 0 or mask.height == 0:
+                continue
+            name = f"T{number}"
+            images[name] = self._add_stream(
+                writer,
+                mask.tobytes(),
+                f"/Type /XObject /Subtype /Image /Width {mask.width} /Height {mask.height}"
+                " /ImageMask true /BitsPerComponent 1 /Decode [1 0]"
+                )
+            content.append(self._text_content(text, name, mask, offset))
+        content.append(grid)
+        content.append(self._glyph_content([item for item in page.rhythms if isinstance(item, Glyph)]))
+        content.append(self._rhythm_content([item for item in page.rhythms if not isinstance(item, Glyph)]))
+        contents = self._add_stream(writer, "\n".join(content).encode("ascii"))
+        xobjects = " ".join(f"/{name} {image} 0 R" for name, image in images.items())
+        width, height = (_number(value) for value in PAGE_SIZE)
+        return writer.add_page_object(
+            f"<< /Type /Page /Parent {writer.pages} 0 R /MediaBox [0 0 {width} {height}] /Contents {contents} 0 R"
+            f" /Resources << /Font << /F1 {font} 0 R >> /XObject << {xobjects} >> >> >>"
+            )
+
+    def _glyph_content(self, glyphs: list):
+        """Internal function, gets content stream drawing note glyphs"""
+        if not glyphs:
+            return ""
+        content = [f"{_color(consts.NOTE_COLOR)} rg BT /F1 {self._note_size} Tf"]
+        for glyph in glyphs:
+            x_axis, y_axis = self._scaler(glyph.position)
+            x_axis += consts.EXPORT_NOTE_CORRECTION_ON_X_AXIS
+            code = consts.NOTE_TEXT_CODES[glyph.pitch]
+            y_axis += self._baselines[code]
+            content.append(f"1 0 0 -1 {_number(x_axis)} {_number(y_axis)} Tm {_string(code)} Tj")
+        content.append("ET")
+        return "\n".join(content)
+
+    def _text_mask(self, text: Text):
+        """Internal function, renders text with text font as black and white image
+
+        Returns:
+            (mask, offset) -tuple, offset being (x, y) -offset of mask from text position
+        """
+        anchor = "rt" if text.align == "right" else "lt"
+        left, top, right, bottom = self._text_font.getbbox(text.text, "1", anchor=anchor)
+        mask = Image.new("1", (right - left, bottom - top), 0)
+        ImageDraw.Draw(mask).text((-left, -top), text.text, font=self._text_font, anchor=anchor, fill=255)
+        return mask, (left, top)
+
+    def _text_content(self, text: Text, name: str, mask: Image.Image, offset: tuple):
+        """Internal function, gets content stream drawing text image"""
+        x_axis, y_axis = self._scaler(text.position)
+        x_axis += offset[0]
+        y_axis += offset[1] + mask.height
+        return (
+            f"q {_color(consts.TEXT_COLOR)} rg {mask.width} 0 0 {-mask.height}"
+            f" {_number(x_axis)} {_number(y_axis)} cm /{name} Do Q"
+            )
+
+    def _grid_content(self, context: LayoutContext):
+        """Internal function, gets content stream drawing measure grid"""
+        content = [f"{_color(consts.GRID_COLOR)} RG {self._scaler(consts.GRID_LINE_WIDHT)} w"]
+        for line in grid_lines(context.spacing, context.measure_lenght):
+            x_start, y_start, x_end, y_end = (_number(value) for value in self._scaler(line))
+            content.append(f"{x_start} {y_start} m {x_end} {y_end} l")
+        content.append("S")
+        return "\n".join(content)
+
+    def _rhythm_content(self, items: list):
+        """Internal function, gets content stream drawing rhythm notation lines and ties"""
+        if not items:
+            return ""
+        content = [f"{_color(consts.NOTE_COLOR)} RG"]
+        lines = [self._scaler(item.points) for item in items if not isinstance(item, Arc)]
+        if lines:
+            content.append(f"{consts.RHYTHM_NOTATION_WIDHT_EXPORT} w")
+            for x_start, y_start, x_end, y_end in lines:
+                content.append(f"{_number(x_start)} {_number(y_start)} m {_number(x_end)} {_number(y_end)} l")
+            content.append("S")
+        arcs = [self._scaler(item.points) for item in items if isinstance(item, Arc)]
+        if arcs:
+            content.append("1 w")
+            for arc in arcs:
+                content.append(self._arc_path(arc))
+            content.append("S")
+        return "\n".join(content)
+
+    def _arc_path(self, notation: tuple):
+        """Internal function, gets path of a tie as lower half of ellipse fitting between its ends"""
+        x_start, y_start, x_end, y_end = notation[:2] + notation[4:]
+        if y_end < y_start: # tie from a note on previous row
+            y_start, y_end = y_end, y_start
+        center_x = (x_start + x_end) / 2
+        center_y = (y_start + y_end) / 2
+        radius_x = (x_end - x_start) / 2
+        radius_y = (y_end - y_start) / 2
+        points = (
+            (center_x + radius_x, center_y),
+            (center_x + radius_x, center_y + BEZIER_CIRCLE * radius_y),
+            (center_x + BEZIER_CIRCLE * radius_x, center_y + radius_y),
+            (center_x, center_y + radius_y),
+            (center_x - BEZIER_CIRCLE * radius_x, center_y + radius_y),
+            (center_x - radius_x, center_y + BEZIER_CIRCLE * radius_y),
+            (center_x - radius_x, center_y)
+            )
+        points = [f"{_number(x_axis)} {_number(y_axis)}" for x_axis, y_axis in points]
+        return f"{points[0]} m {points[1]} {points[2]} {points[3]} c {points[4]} {points[5]} {points[6]} c"
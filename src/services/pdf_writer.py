@@ -0,0 +1,164 @@
+from PIL import PdfParser
+
+INHERITED_KEYS = (b"Resources", b"MediaBox", b"CropBox", b"Rotate") # page attributes inherited from page tree
+
+class PdfWriter:
+    """Writes a PDF document into a binary file one object at a time
+
+    Every object is written as soon as it is added, and page tree, catalog and cross
+    reference table when the writer is closed, so pages can be streamed into a file
+    without keeping earlier ones in memory. Pages can be copied from PDF documents
+    of their own, eg. single pages encoded by PIL in worker processes.
+    """
+    def __init__(self, file):
+        """Constructor, writes header of document
+
+        Args:
+            file: binary file or buffer to write to, empty
+        """
+        self._file = file
+        self._position = 0
+        self._offsets = {}
+        self._kids = []
+        self._count = 0
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._pages = self.reserve()
+
+    @property
+    def pages(self):
+        """Get number of page tree object, parent of every page"""
+        return self._pages
+
+    @property
+    def page_count(self):
+        """Get count of pages written"""
+        return len(self._kids)
+
+    def _write(self, data):
+        """Internal function, writes bytes into file keeping track of position in it"""
+        self._file.write(data)
+        self._position += len(data)
+
+    def reserve(self):
+        """Get number for an object to be added later
+
+        Returns:
+            Object number
+        """
+        self._count += 1
+        return self._count
+
+    def add_object(self, dictionary, stream=None, number: int=None):
+        """Write an object
+
+        Args:
+            dictionary: PDF dictionary, or any other object, as string or bytes
+            stream: data of stream object as bytes, dictionary having its lenght. Defaults to None.
+            number: reserved object number, a new one if None
+
+        Returns:
+            Object number
+        """
+        if number is None:
+            number = self.reserve()
+        if isinstance(dictionary, str):
+            dictionary = dictionary.encode("latin-1")
+        self._offsets[number] = self._position
+        self._write(f"{number} 0 obj\n".encode("ascii"))
+        self._write(dictionary)
+        self._write(b"\n")
+        if stream is not None:
+            self._write(b"stream\n")
+            self._write(stream)
+            self._write(b"\nendstream\n")
+        self._write(b"endobj\n")
+        return number
+
+    def add_page_object(self, dictionary):
+        """Write a page object, appending it to pages of document
+
+        Args:
+            dictionary: PDF dictionary of page as string or bytes, with pages as its /Parent
+
+        Returns:
+            Object number
+        """
+        number = self.add_object(dictionary)
+        self._kids.append(number)
+        return number
+
+    def add_page(self, document: bytes, fonts: dict=None):
+        """Copy first page of a PDF document, with every object it refers to
+
+        Args:
+            document: PDF document as bytes
+            fonts: dictionary mapping font names of page to numbers of font objects
+                written before, used instead of fonts of document. Defaults to None.
+
+        Returns:
+            Object number of page
+        """
+        parser = PdfParser.PdfParser(buf=document)
+        try:
+            page = parser.read_indirect(parser.pages[0])
+            parent = parser.read_indirect(page[b"Parent"])
+            values = PdfParser.PdfDict({key: value for key, value in page.items() if key != b"Parent"})
+            for key in INHERITED_KEYS:
+                if key not in values and key in parent:
+                    values[key] = parent[key]
+            if fonts is not None:
+                resources = values[b"Resources"]
+                if isinstance(resources, PdfParser.IndirectReference):
+                    resources = parser.read_indirect(resources)
+                values[b"Resources"] = PdfParser.PdfDict(
+                    {key: value for key, value in resources.items() if key != b"Font"}
+                    )
+            values = self._copy(parser, values, {})
+        finally:
+            parser.close()
+        if fonts is not None:
+            values[b"Resources"][b"Font"] = PdfParser.PdfDict(
+                {name.encode("ascii"): PdfParser.IndirectReference(number, 0) for name, number in fonts.items()}
+                )
+        values[b"Parent"] = PdfParser.IndirectReference(self._pages, 0)
+        return self.add_page_object(PdfParser.pdf_repr(values))
+
+    def _copy(self, parser: PdfParser.PdfParser, value, copied: dict):
+        """Internal function, copies a value of parsed document, writing objects it refers to
+
+        Args:
+            parser: PdfParser of document
+            value: value to copy
+            copied: dictionary mapping references of document to numbers of objects written
+
+        Returns:
+            Copied value, referring to written objects
+        """
+        if isinstance(value, PdfParser.IndirectReference):
+            if value not in copied:
+                copied[value] = self.reserve()
+                target = self._copy(parser, parser.read_indirect(value), copied)
+                if isinstance(target, PdfParser.PdfStream):
+                    self.add_object(PdfParser.pdf_repr(target.dictionary), target.buf, copied[value])
+                else:
+                    self.add_object(PdfParser.pdf_repr(target), number=copied[value])
+            return PdfParser.IndirectReference(copied[value], 0)
+        if isinstance(value, PdfParser.PdfStream):
+            return PdfParser.PdfStream(self._copy(parser, value.dictionary, copied), bytes(value.buf))
+        if isinstance(value, PdfParser.PdfDict):
+            return PdfParser.PdfDict({key: self._copy(parser, item, copied) for key, item in value.items()})
+        if isinstance(value, list):
+            return PdfParser.PdfArray([self._copy(parser, item, copied) for item in value])
+        return value
+
+    def close(self):
+        """Write page tree, catalog and cross reference table, ending document"""
+        kids = " ".join(f"{number} 0 R" for number in self._kids)
+        self.add_object(f"<< /Type /Pages /Kids [{kids}] /Count {len(self._kids)} >>", number=self._pages)
+        catalog = self.add_object(f"<< /Type /Catalog /Pages {self._pages} 0 R >>")
+        xref = self._position
+        table = [f"xref\n0 {self._count + 1}\n0000000000 65535 f \n"]
+        for number in range(1, self._count + 1):
+            table.append(f"{self._offsets[number]:010d} 00000 n \n")
+        table.append(f"trailer\n<< /Size {self._count + 1} /Root {catalog} 0 R >>\nstartxref\n{xref}\n%%EOF\n")
+        self._write("".join(table).encode("ascii"))
@@ -1,6 +1,5 @@
-import os
+import numpy as np
 import config.shaku_constants as consts
-from services.conversions import GraphicsConverter
 
 class ShakuPositions:
     def calculate_start(self, part: int, spacing: int):
@@ -38,19 +37,26 @@ class ShakuPositions:
         row_count = (grid_x[1] - grid_x[0]) // row_size
         return row_count
 
-    def _get_measure_skip_count(self):
-        """Internal function"""
+    def get_measure_skip_count(self, measure_lenght: int):
+        """Counts how many measure skips there are going to be per row
+
+        Args:
+            measure_lenght: lenght of a measure (1 unit = 2 quarter notes)
+
+        Returns:
+            Count of measure skips per row
+        """
         y_space = consts.GRID_Y[1] - consts.GRID_Y[0]
-        measure_lenght = int(os.getenv("MEASURE_LENGHT"))
         measure_y = consts.NOTE_Y_SPACING * 4 * measure_lenght
         measure_count = y_space // measure_y
         return measure_count - 1
 
-    def get_slot_count(self, measures: bool):
+    def get_slot_count(self, measures: bool, measure_lenght: int):
         """Returns count of how many note slots there are per row
 
         Args:
             measures: whether or not the target system uses measures
+            measure_lenght: lenght of a measure (1 unit = 2 quarter notes)
 
         Returns:
             Count of how many slots per row there are
@@ -58,19 +64,21 @@ class ShakuPositions:
         y_space = consts.GRID_Y[1] - consts.GRID_Y[0]
         smallest_slot = consts.NOTE_Y_SPACING
         if measures:
-            skipcount = self._get_measure_skip_count()
+            skipcount = self.get_measure_skip_count(measure_lenght)
             y_space -= skipcount * consts.MEASURE_SKIP_LENGHT
         return y_space // smallest_slot - 1
 
-    def get_relative_positions(self, note_lenghts: list, rows: int, slots: int, by_lenght: bool, misc_notation: bool=False):
+    def get_relative_positions(self, note_lenghts: list, rows: int, slots: int, by_lenght: bool, misc_notation: bool=False, start: dict=None):
         """Get a list of relative positions where to place notes on sheet music
 
         Args:
-            notes: list of notes (ShakuNote) in given part
+            note_lenghts: lenghts of notes in given part
             rows: Amount of rows per page on sheet music
             slots: Amount of shortest note slots per row
             by_lenght: Whether notes will take room based on their lenghts
             misc_notation: True if looking for misc notation position and not notes
+            start: position of first note (page, row and slot), if resuming a previous walk.
+                Defaults to beginning of first page.
 
         Returns:
             Dictionaries depicting page, row and slot for each note
@@ -79,6 +87,10 @@ class ShakuPositions:
         page = 0
         row = 0
         slot = 0
+        if start is not None:
+            page = start["page"]
+            row = start["row"]
+            slot = start["slot"]
         for note_lenght in note_lenghts:
             if not misc_notation:
                 note_positions.append({"page": page, "row": row, "slot": slot})
@@ -94,28 +106,73 @@ class ShakuPositions:
                 note_positions.append({"page": page, "row": row, "slot": slot})
         return tuple(note_positions)
 
-    def get_coordinates(self, pos: dict, part: int, spacing: int, measures: bool):
+    def get_relative_position_arrays(self, note_lenghts, rows: int, slots: int, by_lenght: bool, misc_notation: bool=False, start: dict=None):
+        """Vectorized get_relative_positions, lays out all given notes in one pass
+
+        Works on half slots so that wrapping to next row (slot -= slots + 1) and
+        page can be computed exactly from cumulative sums with integer division.
+
+        Args:
+            note_lenghts: lenghts of notes in given part
+            rows: Amount of rows per page on sheet music
+            slots: Amount of shortest note slots per row
+            by_lenght: Whether notes will take room based on their lenghts
+            misc_notation: True if looking for misc notation position and not notes
+            start: position of first note (page, row and slot), if resuming a previous walk.
+                Defaults to beginning of first page.
+
+        Returns:
+            (pages, rows, slots) -tuple of numpy arrays with a value for each note
+        """
+        page, row, slot = 0, 0, 0
+        if start is not None:
+            page, row, slot = start["page"], start["row"], start["slot"]
+        lenghts = np.asarray(note_lenghts, dtype=np.int64)
+        increments = lenghts if by_lenght else np.full(len(lenghts), 2, dtype=np.int64)
+        start_half = int(round(slot * 2))
+        halves = start_half + np.cumsum(increments)
+        if not misc_notation:
+            halves = np.concatenate(([start_half], halves[:-1]))[:len(lenghts)]
+        row_halves = 2 * slots + 2
+        wraps = np.maximum(0, -((2 * slots - halves) // row_halves))
+        sections = page * rows + row + wraps
+        return (sections // rows, sections % rows, (halves - wraps * row_halves) / 2)
+
+    def get_coordinate_arrays(self, rows, slots, part: int, context):
+        """Vectorized get_coordinates for arrays of rows and slots
+
+        Args:
+            rows: numpy array of rows of notes
+            slots: numpy array of slots of notes
+            part: part number
+            context: LayoutContext of the sheet
+
+        Returns:
+            (xs, ys) -tuple of numpy arrays of note coordinates on sheet
+        """
+        if context.measures:
+            skip = consts.MEASURE_SKIP_LENGHT * (slots // context.measure_slots)
+        else:
+            skip = 0
+        xs = context.start_x(part) - rows * context.row_distance
+        ys = consts.PARTS_Y_START + slots * consts.NOTE_Y_SPACING + skip
+        return (xs, ys)
+
+    def get_coordinates(self, pos: dict, part: int, context):
         """Get absolute coordinates for a note on sheet
 
         Args:
             pos: dict depiction of notes relative position
             part: part number
-            spacing: music spacing (row size multiplier)
-            measures: whether or not to include measure spacing
+            context: LayoutContext of the sheet
 
         Returns:
-            [type]: [description]
+            (x, y) -coordinates of note on sheet
         """
-        start_x = self.calculate_start(part, spacing)
-        start_y = consts.PARTS_Y_START
-        y_spacing = consts.NOTE_Y_SPACING
-        if measures:
-            measure_lenght = int(os.getenv("MEASURE_LENGHT"))
-            measure_skip = consts.MEASURE_SKIP_LENGHT
-            skip = measure_skip * (pos["slot"] // (measure_lenght * 4))
+        if context.measures:
+            skip = consts.MEASURE_SKIP_LENGHT * (pos["slot"] // context.measure_slots)
         else:
             skip = 0
-        row_dist = consts.NOTE_ROW_SPACING * spacing
-        x = start_x - pos["row"] * row_dist
-        y = start_y + pos["slot"] * y_spacing + skip
+        x = context.start_x(part) - pos["row"] * context.row_distance
+        y = consts.PARTS_Y_START + pos["slot"] * consts.NOTE_Y_SPACING + skip
         return (x, y)
@@ -0,0 +1,44 @@
+from entities.shaku_part import ShakuPart
+from services.layout_context import LayoutContext
+from services.time_notation import ShakuRhythmNotation
+
+class RhythmCache:
+    """Per measure cache of rhythm notations, shared by sheet UI and exporters
+
+    Notations are cached for each measure of each page of each part, together with
+    the pitches, lenghts and positions of notes in the measure (including a possible
+    ghost note tied over from previous measure). A measure is recomputed only if
+    any of these has changed. Cached notations are valid for one layout context,
+    any change in it drops all of them.
+    """
+    def __init__(self):
+        """Constructor, initializes an empty cache"""
+        self._key = None
+        self._notation = None
+        self._pages = {}
+
+    def _set_context(self, context: LayoutContext):
+        """Internal function, drops cached notations if layout settings have changed"""
+        if context.key == self._key:
+            return
+        self._key = context.key
+        self._notation = ShakuRhythmNotation(context)
+        self._pages = {}
+
+    def get_rhytms(self, part: ShakuPart, page: int, start: int, end: int, positions: list, context: LayoutContext):
+        """Get rhythm notations of notes of a part on one page
+
+        Args:
+            part: ShakuPart instance the notes belong to
+            page: page of notes (0 being first page)
+            start: number of first note on page
+            end: number of note after last one on page
+            positions: (x, y) -coordinates of notes on page
+            context: LayoutContext of the sheet
+
+        Returns:
+            List of rhythm notations, as returned by ShakuRhythmNotation.tozan_rhytms
+        """
+        self._set_context(context)
+        measures = self._pages.setdefault((part.part_no, page), [])
+        return self._notation.tozan_rhytms(part.pitches[start:end], part.lenghts[start:end], positions, measures)
@@ -1,24 +1,137 @@
 import os
-from svgwrite import Drawing, text, image
+import base64
+from io import BytesIO, StringIO
+from concurrent.futures import as_completed
+from xml.sax.saxutils import escape
+from PIL import Image
 import config.shaku_constants as consts
 from entities.shaku_music import ShakuMusic
 from services.conversions import GraphicsConverter
-from services.image_creator import ImageCreator
-from services.positioning import ShakuPositions
-from services.time_notation import ShakuRhythmNotation
-from entities.shaku_note import ShakuNote
+from services.display_list import DisplayListBuilder, DisplayPage, Glyph, grid_lines
+from services.export_cache import ExportCache
+from services.layout_context import LayoutContext
+from services.worker_pool import spawn_pool
+
+_worker_creator = None
+
+def _write_page(job: tuple):
+    """Write one page as svg -format drawing in a worker process
+
+    Args:
+        job: (page number, page, context, grid_included) -tuple, see SvgCreator.write_page
+
+    Returns:
+        (page number, svg -format drawing as string) -tuple
+    """
+    global _worker_creator # pylint: disable=global-statement
+    if _worker_creator is None:
+        _worker_creator = SvgCreator(workers=1)
+    number, page, context, grid_included = job
+    buffer = StringIO()
+    _worker_creator.write_page(buffer, page, context, grid_included)
+    return number, buffer.getvalue()
+
+class SvgWriter:
+    """Writes an svg -format drawing straight into a text file or buffer, element by element
+
+    Markup is the same svgwrite produced for the same elements, without building
+    an element tree or validating attributes first. Defs must be written first and
+    the drawing closed last.
+    """
+    def __init__(self, file, size: tuple):
+        """Constructor, writes XML declaration and start of drawing
+
+        Args:
+            file: text file or buffer to write to
+            size: (width, height) of drawing
+        """
+        self._write = file.write
+        self._write(
+            '<?xml version="1.0" encoding="utf-8" ?>\n'
+            f'<svg baseProfile="full" height="{size[1]}" version="1.1" width="{size[0]}"'
+            ' xmlns="http://www.w3.org/2000/svg" xmlns:ev="http://www.w3.org/2001/xml-events"'
+            ' xmlns:xlink="http://www.w3.org/1999/xlink">'
+            )
+
+    def defs(self, images: list):
+        """Write definitions of images to reference with use
+
+        Args:
+            images: list of (id, data URI, (width, height)) -tuples
+        """
+        if not images:
+            self._write("<defs />")
+            return
+        self._write("<defs>")
+        for element_id, uri, size in images:
+            self._write(
+                f'<image height="{size[1]}" id="{element_id}" width="{size[0]}" x="0"'
+                f' xlink:href="{uri}" y="0" />'
+                )
+        self._write("</defs>")
+
+    def use(self, element_id: str, position: tuple):
+        """Write a reference to a defined element"""
+        self._write(f'<use x="{position[0]}" xlink:href="#{element_id}" y="{position[1]}" />')
+
+    def line(self, start: tuple, end: tuple, stroke: str, width):
+        """Write a straight line"""
+        self._write(
+            f'<line stroke="{stroke}" stroke-width="{width}" x1="{start[0]}" x2="{end[0]}"'
+            f' y1="{start[1]}" y2="{end[1]}" />'
+            )
+
+    def path(self, d: str, stroke: str, width):
+        """Write an unfilled path"""
+        self._write(f'<path d="{d}" fill="none" stroke="{stroke}" stroke-width="{width}" />')
+
+    def text(self, content: str, position: tuple, fill: str, font_size, style: str=None):
+        """Write a line of text"""
+        style = f' style="{style}"' if style is not None else ""
+        self._write(
+            f'<text fill="{fill}" font-size="{font_size}"{style} x="{position[0]}" y="{position[1]}">'
+            f"{escape(content)}</text>"
+            )
+
+    def close(self):
+        """Write end of drawing"""
+        self._write("</svg>")
+
+class _Tee:
+    """Internal class, text file writing through into another and keeping what was written"""
+    def __init__(self, file):
+        self._file = file
+        self.written = []
+
+    def write(self, text: str):
+        self._file.write(text)
+        self.written.append(text)
 
 class SvgCreator:
-    """Class for generating an svg -format vector graphics drawing of sheet music
+    """Class for generating svg -format vector graphics drawings of sheet music
 
-    Attributes:
-        svg = svgwrite.Drawing -instance - representation of an svg -format vector drawing
+    Pages are streamed into files or buffers with SvgWriter while iterating the display list,
+    see iter_writers.
     """
-    def __init__(self):
-        """Constructor, initializes svg-attribute as placeholder"""
-        self._svgs = {}
-        self._pos = ShakuPositions()
+    def __init__(self, display_lists: DisplayListBuilder=None, workers: int=None, cache: ExportCache=None):
+        """Constructor, precomputes sizes and colours of drawn elements
+
+        Args:
+            display_lists: Builder of display lists to use, a new one is created if None
+            workers: count of processes writing pages in iter_svgs,
+                defaults to EXPORT_WORKERS environment variable or 1 if it is not set
+            cache: Cache of written pages, pages are not cached if None
+        """
+        self._workers = workers if workers is not None else int(os.getenv("EXPORT_WORKERS", "1"))
+        self._cache = cache
+        self._display_lists = display_lists if display_lists is not None else DisplayListBuilder()
         self._scaler = GraphicsConverter().scale
+        self._note_size = self._scaler(consts.SHEET_NOTE_SIZE) + consts.EXPORT_NOTE_FONT_SIZE_INCREMENT
+        self._note_correction = self._scaler(consts.EXPORT_NOTE_CORRECTION_ON_X_AXIS)
+        self._note_color = self._rgb(consts.NOTE_COLOR)
+        self._grid_color = self._rgb(consts.GRID_COLOR)
+        self._text_color = self._rgb(consts.TEXT_COLOR)
+        self._glyphs = {}
 
     def _rgb(self, numbers: tuple):
         """Converts a tuple of three numbers into rgb format
@@ -37,13 +150,13 @@ class SvgCreator:
         rgb_string = rgb_string[:-1] + ")"
         return rgb_string
 
-    def _draw_line(self, page: Drawing, line: tuple, width: int, fill: tuple):
+    def _draw_line(self, page: SvgWriter, line: tuple, width: int, stroke: str):
         """Draws a line on svg image
 
         Args:
             line: Tuple describiling line by cooridinates of its ends
             width: Line width
-            fill: Line color
+            stroke: Line color as rgb string
         """
         if len(line) == 6:
             start_x = int(line[0])
@@ -52,143 +165,199 @@ class SvgCreator:
             mid_y = int(line[3])
             end_x = int(line[4])
             end_y = int(line[5])
-            d = f"M{start_x},{start_y} S{mid_x},{mid_y} {end_x},{end_y}"
-            page.add(page.path(d=d, stroke=self._rgb(fill), stroke_width=width, fill="none"))
+            page.path(f"M{start_x},{start_y} S{mid_x},{mid_y} {end_x},{end_y}", stroke, width)
         elif len(line) == 2:
-            page.add(page.line(line[0], line[1], stroke=self._rgb(fill), stroke_width=width))
+            page.line(line[0], line[1], stroke, width)
         elif len(line) == 4:
-            start = (line[0], line[1])
-            end = (line[2], line[3])
-            page.add(page.line(start, end, stroke=self._rgb(fill), stroke_width=width))
+            page.line((line[0], line[1]), (line[2], line[3]), stroke, width)
         else:
             raise ValueError("Unexpected amount of values in line")
 
-    def _draw_text(self, page: int, text_insert: str, position: tuple, fill: tuple, font_size: int, style=None):
-        """Insert text on svg image with given properties
+    def _glyph(self, file: str):
+        """Get note image as PNG data URI, downscaled to twice the size notes are drawn in
 
         Args:
-            page: page to insert text to
-            text_insert: Text to be drawn on svg
-            position: Coordinates where text is to be drawn
-            fill: Text color
-            font_size: Font size
+            file: path to image resource
+
+        Returns:
+            (data URI, width, height) -tuple
         """
-        if page not in self._svgs:
-            self._svgs[page] = self._page()
-        self._svgs[page].add(text.Text(
-            text_insert,
-            insert=position,
-            fill=self._rgb(fill),
-            font_size=str(font_size),
-            style=style)
-            )
+        if file not in self._glyphs:
+            with Image.open(file) as glyph:
+                glyph.thumbnail((self._note_size * 2, self._note_size * 2), Image.LANCZOS)
+                data = BytesIO()
+                glyph.save(data, format="PNG", optimize=True)
+            uri = "data:image/png;base64," + base64.b64encode(data.getvalue()).decode("ascii")
+            self._glyphs[file] = (uri, glyph.width, glyph.height)
+        return self._glyphs[file]
 
-    def _draw_note(self, page: Drawing, file: str, position: tuple):
-        """Draw a shakuhachi sheet music note from image onto svg sheet
+    def _add_glyphs(self, page: SvgWriter, notes: dict, pitches: set):
+        """Define note images used on page once, to be referenced by notes
+
+        Args:
+            page: svg drawing to define note images in
+            notes: dictionary mapping pitches to paths of image resources
+            pitches: pitches of notes on page
+        """
+        size = (self._note_size, self._note_size)
+        page.defs([(f"note{pitch}", self._glyph(notes[pitch])[0], size) for pitch in sorted(pitches)])
+
+    def _draw_note(self, page: SvgWriter, pitch: int, position: tuple):
+        """Draw a shakuhachi sheet music note onto svg sheet, referencing its image
 
         Args:
             page: svg drawing to draw to
-            file: path to image resource
+            pitch: note pitch, image of which has been defined on page
             position: Coordinates where note is to be drawn
         """
-        note_size = self._scaler(consts.SHEET_NOTE_SIZE)
-        note_size += consts.EXPORT_NOTE_FONT_SIZE_INCREMENT
-        size = [note_size for i in range(2)]
-        pos = (position[0] + self._scaler(consts.EXPORT_NOTE_CORRECTION_ON_X_AXIS), position[1])
-        page.add(image.Image(file, pos, size))
+        page.use(f"note{pitch}", (position[0] + self._note_correction, position[1]))
 
-    def _draw_texts(self, name, composer):
-        """Draw sheet music name and composer on svg
+    def _create_grid(self, spacing: int, measure_lenght: int, page: SvgWriter):
+        """Draws musical measure grid on svg image
 
         Args:
-            music: Shakuhachi sheet music description in Shakunotators Music -instance form
+            spacing: Width of each section of grid (1 unit = 80px)
+            measure_lenght: Height of each section of grid (1 unit = 220px)
+        """
+        width = self._scaler(consts.GRID_LINE_WIDHT)
+        for line in grid_lines(spacing, measure_lenght):
+            self._draw_line(page, self._scaler(line), width, self._grid_color)
+
+    def write_page(self, file, page: DisplayPage, context: LayoutContext, grid_included: bool=False):
+        """Writes one page of display list as svg -format drawing
+
+        Args:
+            file: text file or buffer to write to
+            page: DisplayPage instance
+            context: LayoutContext of the sheet
+            grid_included: True if measure grid will be included. Defaults to False.
         """
+        writer = SvgWriter(file, consts.EXPORT_SHEET_SIZE)
+        glyphs = page.notes + [item for item in page.rhythms if isinstance(item, Glyph)]
+        self._add_glyphs(writer, context.mode_data["NOTES"], {glyph.pitch for glyph in glyphs})
+        for glyph in page.notes:
+            self._draw_note(writer, glyph.pitch, self._scaler(glyph.position))
         font_size = self._scaler(consts.TEXT_FONT_SIZE)
-        name_pos = self._scaler(consts.NAME_POSITION)
-        self._draw_text(1, name, name_pos, consts.TEXT_COLOR, font_size, style="text-anchor:end")
-        composer_pos = self._scaler(consts.COMPOSER_POSITION)
-        self._draw_text(1, composer, composer_pos, consts.TEXT_COLOR, font_size)
+        for text in page.texts:
+            style = "text-anchor:end" if text.align == "right" else None
+            writer.text(text.text, self._scaler(text.position), self._text_color, font_size, style=style)
+        if grid_included:
+            self._create_grid(context.spacing, context.measure_lenght, writer)
+        for item in page.rhythms:
+            if isinstance(item, Glyph):
+                self._draw_note(writer, item.pitch, self._scaler(item.position))
+            else:
+                self._draw_line(writer, self._scaler(item.points), consts.RHYTHM_NOTATION_WIDHT_EXPORT, self._note_color)
+        writer.close()
 
-    def _create_grid(self, spacing: int, page: Drawing):
-        """Draws musical measure grid on svg image
+    def page_count(self, music: ShakuMusic, context: LayoutContext=None):
+        """Get count of pages of sheet music
 
         Args:
-            spacing: Width of each section of grid (1 unit = 80px)
+            music: ShakuMusic instance
+            context: LayoutContext to draw with, built from music spacing and environment if None
+
+        Returns:
+            Count of pages
         """
-        measure_lenght = consts.MEASURE_LENGHT
-        ImageCreator().draw_grid(spacing, measure_lenght, page, self._draw_line)
+        if context is None:
+            context = LayoutContext.from_env(music.spacing)
+        return len(self._display_lists.get_display_list(music, context).pages)
 
-    def _page(self):
-        """Get a new page"""
-        return Drawing(size=(consts.EXPORT_SHEET_SIZE))
+    def iter_svgs(self, music: ShakuMusic, grid_included: bool=False, context: LayoutContext=None):
+        """Generate svg -format drawings of sheet music one page at a time
 
-    def create_svg(self, music: ShakuMusic, grid_included: bool=False, mode: str="Tozan"):
-        """Generates an svg -format vector graphics drawings of sheet music
+        Pages are written as by iter_writers, each into a string of its own.
 
         Args:
             music: Shakuhachi sheet music as ShakuMusic instance
             grid_included: True if measure grid will be included. Defaults to False.
+            context: LayoutContext to draw with, built from music spacing and environment if None
 
-        Returns:
-            a list of svg formatted data, a page each from shakuhachi sheet music data 
+        Yields:
+            (page number, svg -format drawing as string) -tuples
+        """
+        for number, write in self.iter_writers(music, grid_included, context):
+            buffer = StringIO()
+            write(buffer)
+            yield number, buffer.getvalue()
+
+    def iter_writers(self, music: ShakuMusic, grid_included: bool=False, context: LayoutContext=None):
+        """Generate writers of svg -format drawings of sheet music one page at a time
+
+        Each writer writes its page into the text file given to it, and must be called
+        before the next one is generated. With one worker, pages are written straight
+        into the files as they are drawn, in page order. With more workers, pages are
+        written in worker processes and generated as soon as each is complete, in
+        whichever order they complete. With a cache, pages written with the same content
+        and settings before are generated first, without writing them again.
+
+        Args:
+            music: Shakuhachi sheet music as ShakuMusic instance
+            grid_included: True if measure grid will be included. Defaults to False.
+            context: LayoutContext to draw with, built from music spacing and environment if None
+
+        Yields:
+            (page number, function writing page into a text file) -tuples
         """
-        measures = consts.MODE_DATA[os.getenv("MODE")]["MEASURES"]
         if music is None:
             raise TypeError("No music instance provided")
-        rows = self._pos.get_row_count(music.spacing)
-        slots = self._pos.get_slot_count(measures)
-        for part in music.parts.values():
-            rel_pos = self._pos.get_relative_positions([note.lenght for note in part.notes], rows, slots, measures)
-            for i in range(len(part.notes)):
-                page = rel_pos[i]["page"] + 1 # REMEMBER TO REMOVE THIS + 1 stuff
-                if page not in self._svgs:
-                    self._svgs[page] = self._page()
-                position = self._scaler(self._pos.get_coordinates(rel_pos[i], part.part_no, music.spacing, measures))
-                img_file = consts.MODE_DATA[os.getenv("MODE")]["NOTES"][part.notes[i].pitch]
-                self._draw_note(self._svgs[page], img_file, position)
-        self._draw_texts(music.name, music.composer)
-        if grid_included:
-            for page in self._svgs.values():
-                self._create_grid(music.spacing, page)
-        self._draw_all_time_notations(music)
-        return self._svgs
-
-    def _draw_time_notation(self, notation, page):
-        fill = consts.NOTE_COLOR
-        width = consts.RHYTHM_NOTATION_WIDHT_EXPORT
-        page = self._svgs[page]
-        self._draw_line(page, notation, width, fill)
-
-    def _draw_all_time_notations(self, music: ShakuMusic):
-        measures = consts.MODE_DATA[os.getenv("MODE")]["MEASURES"]
-        mode = os.getenv("MODE")
-        rhy = ShakuRhythmNotation(mode)
-        pos = ShakuPositions()
-        rows = pos.get_row_count(music.spacing)
-        slots = pos.get_slot_count(measures)
-
-        for part in music.parts.values():
-            rel_pos = pos.get_relative_positions([note.lenght for note in part.notes], rows, slots, measures)
-            posses = [pos.get_coordinates(i, part.part_no, music.spacing, measures) for i in rel_pos]
-            if mode == "Tozan":
-                i = 0
-                while i < len(part.notes):
-                    orig_i = i
-                    page = rel_pos[i]["page"]
-                    while i < len(part.notes) and rel_pos[i]["page"] == page:
-                        i += 1
-                    temp_posses = [posses[x] for x in range(orig_i, i)]
-                    temp_notes = [part.notes[x] for x in range(orig_i, i)]
-                    notations = rhy.tozan_rhytms(temp_notes, temp_posses)
-                    for notation in notations:
-                        if isinstance(notation[0], ShakuNote): # "ghost note", a note needs to be redrawn after measure line
-                            note = notation[0]
-                            position = list(notation[1])
-                            if position[1] == consts.PARTS_Y_START:
-                                position[0] -= music.spacing * consts.NOTE_ROW_SPACING
-                            position = self._scaler(position)
-                            img_file = consts.NOTES[note.pitch]
-                            self._draw_note(self._svgs[page + 1], img_file, tuple(position))
-                        else:
-                            notation = self._scaler(notation)
-                            self._draw_time_notation(notation, page + 1)
\ No newline at end of file
+        if context is None:
+            context = LayoutContext.from_env(music.spacing)
+        display_list = self._display_lists.get_display_list(music, context)
+        pages = display_list.pages
+        keys = {}
+        if self._cache is not None:
+            settings = ("svg", context.key, grid_included, consts.TEXT_FONT_SIZE, consts.EXPORT_RENDERER_VERSION)
+            pages = {}
+            for number, page in display_list.pages.items():
+                keys[number] = self._cache.key(page, settings)
+                data = self._cache.get(keys[number])
+                if data is None:
+                    pages[number] = page
+                else:
+                    yield number, self._text_writer(data.decode("utf-8"))
+        if self._workers <= 1 or len(pages) <= 1:
+            for number, page in pages.items():
+                yield number, self._page_writer(page, context, grid_included, keys.get(number))
+            return
+        with spawn_pool(min(self._workers, len(pages))) as pool:
+            futures = [
+                pool.submit(_write_page, (number, page, context, grid_included))
+                for number, page in pages.items()
+                ]
+            for future in as_completed(futures):
+                number, svg = future.result()
+                if self._cache is not None:
+                    self._cache.put(keys[number], svg.encode("utf-8"))
+                yield number, self._text_writer(svg)
+
+    def _text_writer(self, svg: str):
+        """Internal function, get writer of an already written page"""
+        def write(file):
+            file.write(svg)
+        return write
+
+    def _page_writer(self, page: DisplayPage, context: LayoutContext, grid_included: bool, key: str=None):
+        """Internal function, get writer drawing page straight into file, and caching it if key is given"""
+        def write(file):
+            if key is None:
+                self.write_page(file, page, context, grid_included)
+                return
+            tee = _Tee(file)
+            self.write_page(tee, page, context, grid_included)
+            self._cache.put(key, "".join(tee.written).encode("utf-8"))
+        return write
+
+    def create_svg(self, music: ShakuMusic, grid_included: bool=False, context: LayoutContext=None):
+        """Generates svg -format vector graphics drawings of sheet music
+
+        Args:
+            music: Shakuhachi sheet music as ShakuMusic instance
+            grid_included: True if measure grid will be included. Defaults to False.
+            context: LayoutContext to draw with, built from music spacing and environment if None
+
+        Returns:
+            Dictionary mapping page numbers to svg -format drawings as strings
+        """
+        return dict(sorted(self.iter_svgs(music, grid_included, context)))
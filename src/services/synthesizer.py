@@ -0,0 +1,125 @@
+import os
+from collections import deque
+import numpy as np
+import config.shaku_constants as consts
+from services.midi_creator import MidiCreator
+
+class Synthesizer:
+    """Renders music of MidiCreator into PCM audio in memory with FluidSynth
+
+    Synthesizer is driven with note events directly, so no MIDI or audio files are
+    written. Audio is 16-bit stereo at the sample rate of the synthesizer. Sound font
+    is loaded once, synthesizer is reset at the start of every render, and reverb and
+    chorus of the previous render are let decay first, so the same music is always
+    rendered the same.
+    """
+    def __init__(self, sound_font: str=None, sample_rate: int=consts.SAMPLE_RATE):
+        """Constructor, starts a synthesizer and loads sound font
+
+        Args:
+            sound_font: path of SF2 sound font, defaults to SOUND_FONT environment variable
+                or default sound font of FluidSynth if it is not set
+            sample_rate: sample rate of rendered audio. Defaults to 44100.
+
+        Raises:
+            FileNotFoundError: if sound font could not be loaded
+        """
+        import fluidsynth # pylint: disable=import-outside-toplevel # loads native library
+        if sound_font is None:
+            sound_font = os.getenv("SOUND_FONT", consts.SOUND_FONT)
+        self._sample_rate = sample_rate
+        self._rendered = False
+        self._synth = fluidsynth.Synth(samplerate=float(sample_rate))
+        self._sound_font = self._synth.sfload(os.path.expanduser(sound_font))
+        if self._sound_font == -1:
+            self._synth.delete()
+            raise FileNotFoundError(f"Could not load sound font {sound_font}")
+
+    @property
+    def sample_rate(self):
+        """Get sample rate of rendered audio"""
+        return self._sample_rate
+
+    def render(self, creator: MidiCreator):
+        """Synthesizes tracks of MidiCreator
+
+        Args:
+            creator: MidiCreator instance with tracks created
+
+        Returns:
+            numpy array of 16-bit samples, with a row of (left, right) for each frame
+        """
+        return np.concatenate(list(self.iter_render(creator)))
+
+    def iter_render(self, creator: MidiCreator, boundaries: list=None):
+        """Synthesizes tracks of MidiCreator in time ordered chunks, as they are consumed
+
+        Music synthesized in chunks is the same as synthesized at once. Synthesizer must
+        not be used for anything else until all chunks are consumed.
+
+        Args:
+            creator: MidiCreator instance with tracks created
+            boundaries: ascending times in beats at which chunks end, last chunk ending after
+                release of last note. Chunks after it are empty. Whole music is one chunk if None.
+
+        Yields:
+            numpy arrays of 16-bit samples, with a row of (left, right) for each frame
+        """
+        events = creator.generate_events()
+        self._synth.system_reset()
+        self._flush()
+        for channel in {track.channel for track in creator.tracks.values()}:
+            self._synth.program_select(channel, self._sound_font, 0, creator.instrument)
+        frames_per_beat = self._sample_rate * 60 / creator.tempo
+        end = round(events[-1][0] * frames_per_beat) if events else 0
+        end += round(consts.RELEASE_SECONDS * self._sample_rate)
+        remaining = deque(min(round(time * frames_per_beat), end) for time in boundaries or ())
+        samples = []
+        frame = 0
+        for time, channel, pitch, velocity in events:
+            target = round(time * frames_per_beat)
+            while remaining and remaining[0] <= target:
+                frame = self._render_until(samples, frame, remaining.popleft())
+                yield self._chunk(samples)
+                samples = []
+            frame = self._render_until(samples, frame, target)
+            if velocity:
+                self._synth.noteon(channel, pitch, velocity)
+            else:
+                self._synth.noteoff(channel, pitch)
+        while remaining:
+            frame = self._render_until(samples, frame, remaining.popleft())
+            yield self._chunk(samples)
+            samples = []
+        self._render_until(samples, frame, end)
+        yield self._chunk(samples)
+
+    def _flush(self):
+        """Internal function, synthesizes silence until reverb and chorus of previous render have decayed
+
+        Effects have decayed when a tenth of a second of silence is no louder than dithering,
+        at most EFFECTS_FLUSH_SECONDS of silence is synthesized.
+        """
+        if self._rendered:
+            block = self._sample_rate // 10
+            for _ in range(round(consts.EFFECTS_FLUSH_SECONDS * 10)):
+                if np.abs(self._synth.get_samples(block).astype(np.int32)).max() <= 1:
+                    break
+        self._rendered = True
+
+    def _render_until(self, samples: list, frame: int, target: int):
+        """Internal function, appends samples synthesized from frame until target frame, returning frame reached"""
+        if target <= frame:
+            return frame
+        samples.append(self._synth.get_samples(target - frame))
+        return target
+
+    def _chunk(self, samples: list):
+        """Internal function, joins synthesized samples into a chunk of (left, right) -rows"""
+        if not samples:
+            return np.zeros((0, 2), dtype=np.int16)
+        return np.concatenate(samples).astype(np.int16).reshape(-1, 2)
+
+    def close(self):
+        """Stops synthesizer and frees its resources"""
+        self._synth.delete()
@@ -1,14 +1,14 @@
-import os
 import math
-from copy import deepcopy
 import config.shaku_constants as consts
 from entities.shaku_note import ShakuNote
 
 class ShakuRhythmNotation:
-    def __init__(self, mode):
-        if mode not in ["Tozan", "Kinko", "Ueda"]:
-            raise ValueError(f"Notation system {mode} not supported")
-        self.mode = mode
+    def __init__(self, context):
+        if context.mode not in ["Tozan", "Kinko", "Ueda"]:
+            raise ValueError(f"Notation system {context.mode} not supported")
+        self.mode = context.mode
+        self._measure_duration = context.measure_duration
+        self._measure_height = context.measure_height
 
     def _create_arch(self, x_start, y_start, x_end, y_end, arch=10): # get arch steepness from config
         tangent = math.atan2(y_end - y_start, x_end - x_start)
@@ -22,128 +22,157 @@ class ShakuRhythmNotation:
             return True
         return False
 
-    def _measure_rhytms(self, notes: list, positions: list): #BREAK THIS DOWN TO SUBFUNCTION FOR EACH CASE TYPE?
-        lines = []
-        total = sum([note.lenght for note in notes])
-        limit = int(os.getenv("MEASURE_LENGHT")) * 8
-        if total > limit:
-            last_note = notes[-1]
-            if last_note.pitch >= 0:
-                remainer = total - limit
-                last_note.lenght -= remainer
-                arch_start = positions[-1][1] + 2
-                arch_end = positions[0][1] + consts.NOTE_Y_SPACING * int(os.getenv("MEASURE_LENGHT")) * 4 + consts.MEASURE_SKIP_LENGHT + 4
-                arch_x = positions[-1][0] + 20 # get this from config as consts.NOTE_TO_ARCH_X_GAP (or smth)
-                remainer_note = deepcopy(last_note)
-                remainer_note.lenght = remainer
-                ghost_pos = list(positions[-1])
-                ghost_pos[1] = positions[0][1] + int(os.getenv("MEASURE_LENGHT")) * 4 * consts.NOTE_Y_SPACING + consts.MEASURE_SKIP_LENGHT
-                if ghost_pos[1] > consts.GRID_Y[1]:
-                    ghost_pos[1] = consts.PARTS_Y_START
-                lines.append((remainer_note, tuple(ghost_pos)))
-                lines.append(self._create_arch(arch_x, arch_start, arch_x, arch_end))
+    def _tie(self, pitch, lenght, positions, limit, total):
+        """Internal function, shortens an overflowing measures last note and ties the rest over
 
-        # get left note line for all 8th + 16th clusters
-        clusters = []
-        prev = None
-        tmp = []
-        for i in range(len(notes)):
-            if notes[i].lenght < 8 and (prev is None or prev.lenght >= 8 or prev.pitch < 0) and notes[i].pitch >= 0: #cluster start if true
-                tmp = [i]
-            elif len(tmp) > 0 and (notes[i].lenght >= 8 or notes[i].pitch < 0): #cluster ends on previous if true
-                tmp.append(i - 1)
-                clusters.append(tmp)
-                tmp = []
-            prev = notes[i]
+        Returns:
+            lenght of last note in measure, ghost note tuple and arch, or None if no tie is needed
+        """
+        if total <= limit or pitch < 0:
+            return lenght, None
+        remainer = total - limit
+        first_y = positions[0][1]
+        last_x, last_y = positions[-1]
+        arch_start = last_y + 2
+        arch_end = first_y + self._measure_height + 4
+        arch_x = last_x + 20 # get this from config as consts.NOTE_TO_ARCH_X_GAP (or smth)
+        ghost_y = first_y + self._measure_height
+        if ghost_y > consts.GRID_Y[1]:
+            ghost_y = consts.PARTS_Y_START
+        ghost = (ShakuNote(pitch, remainer), (last_x, ghost_y))
+        return lenght - remainer, (ghost, self._create_arch(arch_x, arch_start, arch_x, arch_end))
 
-        if len(tmp) > 0: #if cluster continues until measure end - last one is another cluster end
-            tmp.append(i)
-            clusters.append(tmp)
-        for cluster in clusters:
-            line_x = positions[cluster[0]][0] + consts.NOTE_TO_RHYTM_SPACING
-            y_start = positions[cluster[0]][1]
-            y_end = positions[cluster[-1]][1] + 10
-            lines.append((line_x, y_start, line_x, y_end))
-            if cluster[0] == cluster[1] and 4 <= notes[cluster[0]].lenght < 8: # lonesom 8th note needs a dot
-                i = cluster[0]
-                x_start = positions[i][0] + consts.NOTE_TO_RHYTM_SPACING - 1
-                x_end = x_start + 5
-                y_start = positions[i][1] + 4
-                y_end = y_start + 4 # CONSIDER GETTING THESE FROM CONFIG TOO
-                lines.append((x_start, y_start, x_end, y_end))
+    def _measure_rhytms(self, pitches: list, lenghts: list, positions: list, total: int):
+        """Internal function, rhythm notations of one measure in a single pass over its notes
 
-        # get right note line for all 16th clusters (obviously going to make a function working for both cluster cases)
-        # get left note line for all 8th + 16th clusters
-        clusters = []
-        prev = None
-        tmp = []
-        for i in range(len(notes)):
-            if notes[i].lenght < 4 and (prev is None or prev >= 4):
-                tmp = [i]
-            elif len(tmp) > 0 and notes[i].lenght >= 4:
-                tmp.append(i - 1)
-                clusters.append(tmp)
-                tmp = []
-            prev = notes[i].lenght
-        if len(tmp) > 0:
-            tmp.append(i)
-            clusters.append(tmp)
-        for cluster in clusters:
-            line_x = positions[cluster[0]][0] + consts.NOTE_TO_RHYTM_SPACING + consts.RHYTM_LINE2_TO_LINE1_SPACING
-            y_start = positions[cluster[0]][1]
-            y_end = positions[cluster[-1]][1] + 10
-            lines.append((line_x, y_start, line_x, y_end))
+        Args:
+            pitches: pitches of notes in measure
+            lenghts: lenghts of notes in measure
+            positions: (x, y) -coordinates of notes in measure
+            total: sum of lenghts
 
-        #notation for fourth notes and dotted notes
-        for i in range(len(notes)):
-            #fourths
-            if notes[i].lenght >= 8 and notes[i].lenght < 16 and notes[i].pitch >= 0:
-                line_x = positions[i][0] + consts.NOTE_TO_RHYTM_SPACING
-                y_start = positions[i][1]
-                y_end = positions[i][1] + 10
-                lines.append((line_x, y_start, line_x, y_end))
+        Returns:
+            ghost note tuple and arch if last note is tied over to next measure (else None),
+            and list of other rhythm notation lines
+        """
+        last = len(lenghts) - 1
+        last_lenght, tie = self._tie(pitches[last], lenghts[last], positions, self._measure_duration, total)
+        eighths = [] # left note line for 8th + 16th clusters, and dots of lonesome 8ths
+        sixteenths = [] # right note line for 16th clusters
+        marks = [] # fourth notes and dotted notes
+        eighth_start = None
+        sixteenth_start = None
+        first_x = positions[1][0] if last > 0 else positions[0][0]
+        for i in range(last + 1):
+            pitch = pitches[i]
+            lenght = last_lenght if i == last else lenghts[i]
+            x = first_x if i == 0 else positions[i][0]
+            y = positions[i][1]
+            if lenght < 8 and pitch >= 0:
+                if eighth_start is None:
+                    eighth_start = i
+            elif eighth_start is not None:
+                self._eighth_cluster(eighth_start, i - 1, lenghts, last_lenght, positions, first_x, eighths)
+                eighth_start = None
+            if lenght < 4:
+                if sixteenth_start is None:
+                    sixteenth_start = i
+            elif sixteenth_start is not None:
+                self._sixteenth_cluster(sixteenth_start, i - 1, positions, first_x, sixteenths)
+                sixteenth_start = None
+            if 8 <= lenght < 16 and pitch >= 0: #fourths
+                line_x = x + consts.NOTE_TO_RHYTM_SPACING
+                marks.append((line_x, y, line_x, y + 10))
+            if self._dotted(lenght): # dotted (in terms of lenght)
+                line_x = x + 10
+                marks.append((line_x, y + 10, line_x, y + 20)) # CONSIDER MAKING DIFFERENT const.UNDER_NOTE_LINE_SIZE
+        if eighth_start is not None: #if cluster continues until measure end - last one is another cluster end
+            self._eighth_cluster(eighth_start, last, lenghts, last_lenght, positions, first_x, eighths)
+        if sixteenth_start is not None:
+            self._sixteenth_cluster(sixteenth_start, last, positions, first_x, sixteenths)
+        return tie, eighths + sixteenths + marks
 
-            # dotted (in terms of lenght)
-            if self._dotted(notes[i].lenght):
-                line_x = positions[i][0] + 10
-                start_y = positions[i][1] + 10
-                end_y = start_y + 10 # CONSIDER MAKING DIFFERENT const.UNDER_NOTE_LINE_SIZE
-                lines.append((line_x, start_y, line_x, end_y))
+    def _eighth_cluster(self, start, end, lenghts, last_lenght, positions, first_x, lines):
+        """Internal function, adds left note line of an 8th/16th cluster, dotted if it is a lonesome 8th"""
+        x = first_x if start == 0 else positions[start][0]
+        line_x = x + consts.NOTE_TO_RHYTM_SPACING
+        y_start = positions[start][1]
+        lines.append((line_x, y_start, line_x, positions[end][1] + 10))
+        lenght = last_lenght if start == len(lenghts) - 1 else lenghts[start]
+        if start == end and 4 <= lenght < 8: # lonesom 8th note needs a dot
+            x_start = line_x - 1
+            y_start += 4
+            lines.append((x_start, y_start, x_start + 5, y_start + 4)) # CONSIDER GETTING THESE FROM CONFIG TOO
 
-        return lines
+    def _sixteenth_cluster(self, start, end, positions, first_x, lines):
+        """Internal function, adds right note line of a 16th cluster"""
+        x = first_x if start == 0 else positions[start][0]
+        line_x = x + consts.NOTE_TO_RHYTM_SPACING + consts.RHYTM_LINE2_TO_LINE1_SPACING
+        lines.append((line_x, positions[start][1], line_x, positions[end][1] + 10))
 
-    def tozan_rhytms(self, notes: list, positions: list):
+    def tozan_rhytms(self, pitches, lenghts, positions, measures: list=None):
+        """Get rhythm notations for consecutive notes on one page
+
+        Notes are walked once, measure by measure. A note overflowing its measure is
+        shortened and the rest of it is carried to the next measure as a "ghost note",
+        tied to the original with an arch.
+
+        Args:
+            pitches: pitches of notes
+            lenghts: lenghts of notes
+            positions: (x, y) -coordinates of notes
+            measures: cache of rhythm notations of each measure as (measure content, notations)
+                -tuples, reused for measures whose content has not changed and updated for others.
+                Defaults to None (no caching).
+
+        Returns:
+            List of rhythm notations: (ShakuNote, position) -tuples for ghost notes,
+            and tuples of 4 (line) or 6 (arch) coordinates
+        """
         rhytm_notations = []
-        measure_duration = int(os.getenv("MEASURE_LENGHT")) * 8
+        measure_duration = self._measure_duration
+        count = len(lenghts)
+        carry = None
+        measure = 0
         i = 0
-        measure_notes = []
-        measure_positions = []
-        duration = 0
-
-        while i < len(notes):
-            while i < len(notes) and duration < measure_duration:
-                duration += notes[i].lenght
-                measure_notes.append(notes[i])
-                measure_positions.append(positions[i])
+        while i < count:
+            start = i
+            duration = 0 if carry is None else carry[1]
+            while i < count and duration < measure_duration:
+                duration += lenghts[i]
                 i += 1
-            temp_posses = deepcopy(measure_positions)
-            if len(measure_positions) > 1:
-                temp_posses[0] = list(temp_posses[0])
-                temp_posses[0][0] = temp_posses[1][0] 
-                temp_posses[0] = tuple(temp_posses[0])
-            notations = self._measure_rhytms(deepcopy(measure_notes), temp_posses)
-            for notation in notations:
-                rhytm_notations.append(notation)
-            if len(notations) > 0 and isinstance(notations[0][0], ShakuNote):
-                measure_notes = [notations[0][0]]
-                ghost_pos = list(measure_positions[0])
-                ghost_pos[1] += int(os.getenv("MEASURE_LENGHT")) * 4 * consts.NOTE_Y_SPACING + consts.MEASURE_SKIP_LENGHT
-                if ghost_pos[1] > consts.GRID_Y[1]:
-                    ghost_pos[1] = consts.PARTS_Y_START
-                measure_positions = [tuple(ghost_pos)]
-                duration = notations[0][0].lenght
+            measure_pitches = pitches[start:i]
+            measure_lenghts = lenghts[start:i]
+            measure_positions = positions[start:i]
+            if carry is not None:
+                measure_pitches = [carry[0]] + list(measure_pitches)
+                measure_lenghts = [carry[1]] + list(measure_lenghts)
+                measure_positions = [carry[2]] + list(measure_positions)
+            if measures is None:
+                tie, notations = self._measure_rhytms(measure_pitches, measure_lenghts, measure_positions, duration)
+            else:
+                content = (tuple(measure_pitches), tuple(measure_lenghts), tuple(measure_positions))
+                if measure < len(measures) and measures[measure][0] == content:
+                    tie, notations = measures[measure][1]
+                else:
+                    tie, notations = self._measure_rhytms(measure_pitches, measure_lenghts, measure_positions, duration)
+                    if measure < len(measures):
+                        measures[measure] = (content, (tie, notations))
+                    else:
+                        measures.append((content, (tie, notations)))
+            measure += 1
+            if tie is None:
+                carry = None
             else:
-                measure_notes = []
-                measure_positions = []
-                duration = 0
+                ghost, arch = tie
+                rhytm_notations.append(ghost)
+                rhytm_notations.append(arch)
+                ghost_x, ghost_y = measure_positions[0]
+                ghost_y += self._measure_height
+                if ghost_y > consts.GRID_Y[1]:
+                    ghost_y = consts.PARTS_Y_START
+                carry = (ghost[0].pitch, ghost[0].lenght, (ghost_x, ghost_y))
+            rhytm_notations.extend(notations)
+        if measures is not None:
+            del measures[measure:]
         return rhytm_notations
@@ -0,0 +1,19 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+def spawn_pool(workers: int):
+    """Start a pool of worker processes for rendering exported pages
+
+    Worker processes are spawned rather than forked on every platform, so they don't
+    inherit the Tk window, mixer or audio threads of the application. A spawned process
+    imports the main module again, which must start the application only when run as a
+    script, see index.py. Functions run in the pool must be defined in modules that
+    don't import the user interface.
+
+    Args:
+        workers: count of worker processes
+
+    Returns:
+        ProcessPoolExecutor instance
+    """
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+import numpy as np
+from entities.shaku_part import ShakuPart
+from services.audio_cache import AudioCache
+from services.audio_engine import AudioEngine
+from services.export_cache import ExportCache
+
+class TestAudioCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = AudioCache(max_bytes=100)
+
+    def _part(self, part_no, pitches):
+        part = ShakuPart(part_no)
+        for pitch in pitches:
+            part.add_note(pitch, 8)
+        return part
+
+    def _samples(self, value, frames=10):
+        return np.full((frames, 2), value, dtype=np.int16)
+
+    def test_key_depends_on_notes_and_settings(self):
+        keys = {
+            self.cache.key([self._part(1, [1, 2])], (65, 100)),
+            self.cache.key([self._part(1, [1, 3])], (65, 100)),
+            self.cache.key([self._part(1, [1, 2])], (70, 100)),
+            self.cache.key([self._part(1, [1, 2]), self._part(2, [])], (65, 100)),
+            }
+        self.assertEqual(len(keys), 4)
+        self.assertIn(self.cache.key([self._part(2, [1, 2])], (65, 100)), keys)
+
+    def test_get_returns_stored_audio_as_read_only(self):
+        self.cache.put("a", self._samples(1))
+        samples = self.cache.get("a")
+        self.assertEqual(samples.tolist(), self._samples(1).tolist())
+        self.assertFalse(samples.flags.writeable)
+        self.assertIsNone(self.cache.get("b"))
+
+    def test_least_recently_used_audio_is_dropped(self):
+        for key in ("a", "b", "c"):
+            self.cache.put(key, self._samples(1))
+            if key == "b":
+                self.cache.get("a")
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.size, 80)
+
+    def test_dropped_audio_is_spilled_to_disk(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cache = AudioCache(max_bytes=100, spill=ExportCache(directory.name))
+        for key, value in (("a", 1), ("b", 2), ("c", 3)):
+            cache.put(key, self._samples(value))
+        self.assertEqual(os.listdir(directory.name), ["a"])
+        self.assertEqual(cache.get("a").tolist(), self._samples(1).tolist())
+        os.remove(os.path.join(directory.name, "a"))
+        self.assertEqual(cache.get("a").tolist(), self._samples(1).tolist())
+
+    def test_audio_can_be_stored_from_several_threads(self):
+        cache = AudioCache(max_bytes=4000)
+        def put(value):
+            for key in range(100):
+                cache.put(f"{value}-{key}", self._samples(value))
+                cache.get(f"{value}-{key // 2}")
+        threads = [threading.Thread(target=put, args=(value,)) for value in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(cache.size, len(cache) * 40)
+        self.assertLessEqual(cache.size, 4000)
+
+    def test_engine_does_not_synthesize_cached_audio(self):
+        patcher = patch.dict(os.environ, {"TEMPO": "65", "VOLUME": "100", "MIDI_INSTRUMENT_NUMBER": "73"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        started = []
+        engine = AudioEngine(sound_font="font.sf2", cache=self.cache, create_synthesizer=lambda *args: started.append(args))
+        parts = [self._part(1, [1, 2])]
+        settings = (
+            int(os.environ["TEMPO"]), int(os.environ["VOLUME"]), int(os.environ["MIDI_INSTRUMENT_NUMBER"]),
+            60, engine.sample_rate, "font.sf2"
+            )
+        self.cache.put(self.cache.key(parts, settings), self._samples(5))
+        self.assertEqual(engine.render(parts).tolist(), self._samples(5).tolist())
+        self.assertEqual(started, [])
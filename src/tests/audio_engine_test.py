@@ -0,0 +1,164 @@
+import os
+import threading
+import time
+import unittest
+from unittest.mock import patch
+import numpy as np
+import config.shaku_constants as consts
+from entities.shaku_part import ShakuPart
+from services.audio_cache import AudioCache
+from services.audio_engine import AudioEngine, mix
+
+class CountingSynthesizer:
+    """Renders a frame for each beat of each note, with pitch as sample value"""
+    def __init__(self, rendered: list):
+        self.rendered = rendered
+
+    def render(self, creator):
+        return np.concatenate(list(self.iter_render(creator)))
+
+    def iter_render(self, creator, boundaries=None):
+        self.rendered.append([note for track in creator.tracks.values() for note in track.notes])
+        samples = mix({
+            number: np.repeat(np.repeat(track.notes, [round(lenght) for lenght in track.lenghts]), 2).reshape(-1, 2)
+            for number, track in creator.tracks.items()
+            })
+        start = 0
+        for boundary in boundaries or ():
+            end = max(start, min(round(boundary), len(samples)))
+            yield samples[start:end]
+            start = end
+        yield samples[start:]
+
+    def close(self):
+        pass
+
+class TestAudioEngine(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.dict(os.environ, {
+            "TEMPO": "65", "VOLUME": "100", "MIDI_INSTRUMENT_NUMBER": "73", "SDL_AUDIODRIVER": "dummy"
+            })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.rendered = []
+        self.synthesizers = []
+        self.engine = AudioEngine(sound_font="font.sf2", cache=AudioCache(), create_synthesizer=self._synthesizer)
+        self.parts = [self._part(1, [0, 1, 2]), self._part(2, [3, 4]), self._part(3, [])]
+
+    def _synthesizer(self, sound_font, sample_rate):
+        self.synthesizers.append(CountingSynthesizer(self.rendered))
+        return self.synthesizers[-1]
+
+    def _part(self, part_no, pitches):
+        part = ShakuPart(part_no)
+        for pitch in pitches:
+            part.add_note(pitch, 8)
+        return part
+
+    def _stem(self, values):
+        return np.repeat(np.array(values, dtype=np.int16), 2).reshape(-1, 2)
+
+    def test_mix_sums_stems_padded_to_longest(self):
+        mixed = mix({1: self._stem([1, 2, 3]), 2: self._stem([10])})
+        self.assertEqual(mixed[:, 0].tolist(), [11, 2, 3])
+        self.assertEqual(mixed.dtype, np.int16)
+
+    def test_mix_clips_to_sample_range(self):
+        mixed = mix({1: self._stem([30000, -30000]), 2: self._stem([30000, -30000])})
+        self.assertEqual(mixed[:, 0].tolist(), [32767, -32768])
+
+    def test_mix_leaves_out_muted_and_unsoloed_parts(self):
+        stems = {1: self._stem([1, 1]), 2: self._stem([10]), 3: self._stem([100])}
+        self.assertEqual(mix(stems, muted=(2,))[:, 0].tolist(), [101, 1])
+        self.assertEqual(mix(stems, solo=(2, 3))[:, 0].tolist(), [110, 0])
+        self.assertEqual(mix(stems, muted=(3,), solo=(3,))[:, 0].tolist(), [0, 0])
+
+    def test_render_stems_renders_parts_with_notes(self):
+        stems = self.engine.render_stems(self.parts)
+        self.assertEqual(list(stems), [1, 2])
+        self.assertEqual(stems[2][:, 0].tolist(), [63, 64])
+
+    def test_only_changed_part_is_rendered_again(self):
+        self.engine.render(self.parts)
+        self.parts[1].edit_note(0, pitch=5)
+        mixed = self.engine.render(self.parts)
+        self.assertEqual(self.rendered, [[60, 61, 62], [63, 64], [65, 64]])
+        self.assertEqual(mixed[:, 0].tolist(), [125, 125, 62])
+
+    def test_render_raises_error_on_no_notes(self):
+        self.assertRaises(ValueError, self.engine.render, [self._part(1, [])])
+
+    def test_stream_yields_heard_parts_in_chunks(self):
+        chunks = list(self.engine.stream(self.parts, muted=(1,)))
+        self.assertEqual(np.concatenate(chunks)[:, 0].tolist(), [63, 64])
+        chunks = list(self.engine.stream(self.parts, solo=(1,), chunk_beats=2))
+        self.assertEqual([chunk[:, 0].tolist() for chunk in chunks], [[60, 61], [62]])
+
+    def test_stream_chunks_end_where_notes_end(self):
+        part = ShakuPart(1)
+        for lenght in (8, 16, 8, 8):
+            part.add_note(1, lenght)
+        chunks = list(self.engine.stream([part], chunk_beats=1))
+        self.assertEqual([len(chunk) for chunk in chunks], [1, 2, 1, 1])
+
+    def test_stream_mixes_cached_stems_at_once(self):
+        mixed = self.engine.render(self.parts)
+        chunks = list(self.engine.stream(self.parts))
+        self.assertEqual(len(self.rendered), 2)
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(chunks[0].tolist(), mixed.tolist())
+
+    def test_stream_synthesizes_only_changed_parts(self):
+        self.engine.render(self.parts)
+        self.parts[1].edit_note(0, pitch=5)
+        chunks = list(self.engine.stream(self.parts, chunk_beats=1))
+        self.assertEqual(self.rendered[2:], [[65, 64]])
+        self.assertEqual([chunk[:, 0].tolist() for chunk in chunks], [[125], [125], [62]])
+
+    def test_streamed_stems_are_cached_for_replay(self):
+        first = np.concatenate(list(self.engine.stream(self.parts, chunk_beats=1)))
+        replay = list(self.engine.stream(self.parts))
+        self.assertEqual(self.rendered, [[60, 61, 62], [63, 64]])
+        self.assertEqual(len(replay), 1)
+        self.assertEqual(replay[0].tolist(), first.tolist())
+        self.assertEqual(first[:, 0].tolist(), [123, 125, 62])
+        self.assertEqual(self.engine.render_stems(self.parts)[2][:, 0].tolist(), [63, 64])
+        self.assertEqual(len(self.rendered), 2)
+
+    def test_stream_reads_parts_when_called(self):
+        chunks = self.engine.stream(self.parts, chunk_beats=1)
+        self.parts[0].edit_note(0, pitch=5)
+        self.parts[1].add_note(1, 8)
+        self.assertEqual(np.concatenate(list(chunks))[:, 0].tolist(), [123, 125, 62])
+        self.assertEqual(self.rendered, [[60, 61, 62], [63, 64]])
+
+    def test_stream_starts_at_most_stream_synthesizers(self):
+        self.parts.append(self._part(4, [6, 7, 8, 9]))
+        mixed = AudioEngine(create_synthesizer=self._synthesizer).render(self.parts)
+        self.synthesizers.clear()
+        with patch.object(consts, "STREAM_SYNTHESIZERS", 2):
+            chunks = list(self.engine.stream(self.parts, chunk_beats=1))
+        self.assertEqual(len(self.synthesizers), 2)
+        self.assertEqual(np.concatenate(chunks).tolist(), mixed.tolist())
+
+    def test_render_does_not_stop_stream(self):
+        self.addCleanup(self.engine.close)
+        self.engine.play_stream(self.engine.stream(self.parts[:1]))
+        self.engine.render(self.parts[1:])
+        self.assertTrue(self.engine.playing)
+        self.assertEqual(len(self.synthesizers), 2)
+
+    def test_stream_is_synthesized_outside_thread_of_playback(self):
+        threads = []
+        def chunks():
+            for value in range(3):
+                threads.append(threading.current_thread())
+                yield self._stem([value] * 10)
+        self.addCleanup(self.engine.close)
+        self.engine.play_stream(chunks())
+        deadline = time.monotonic() + 10
+        while self.engine.pump() and time.monotonic() < deadline:
+            time.sleep(0.001)
+        self.assertEqual(len(threads), 3)
+        self.assertNotIn(threading.current_thread(), threads)
+        self.assertFalse(self.engine.pump())
@@ -0,0 +1,70 @@
+import os
+import unittest
+from unittest.mock import patch
+import config.shaku_constants as consts
+from entities.shaku_music import ShakuMusic
+from services.display_list import DisplayListBuilder, Glyph, Line, Arc, grid_lines
+from services.layout_context import LayoutContext
+
+class TestDisplayList(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.dict(os.environ, {"MODE": "Tozan", "MEASURE_LENGHT": "2"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.builder = DisplayListBuilder()
+        self.music = ShakuMusic()
+        self.music.name = "Name"
+        self.music.composer = "Composer"
+        self.music.add_part(1)
+        self.music.add_part(2)
+        for i in range(400):
+            self.music.parts[1].add_note(i % 20, [8, 16, 4, 12][i % 4])
+        for i in range(100):
+            self.music.parts[2].add_note(i % 20, 8)
+
+    def _display_list(self):
+        return self.builder.get_display_list(self.music, LayoutContext.from_env(self.music.spacing))
+
+    def test_every_note_has_a_glyph(self):
+        pages = self._display_list().pages.values()
+        glyphs = [glyph for page in pages for glyph in page.notes]
+        self.assertEqual(len(glyphs), 500)
+        self.assertEqual([glyph.note for glyph in glyphs if glyph.part == 2], list(range(100)))
+
+    def test_pages_are_numbered_from_one(self):
+        display_list = self._display_list()
+        self.assertEqual(list(display_list.pages), list(range(1, len(display_list.pages) + 1)))
+        self.assertGreater(len(display_list.pages), 1)
+
+    def test_titles_are_on_first_page(self):
+        texts = self._display_list().pages[1].texts
+        self.assertEqual([(text.text, text.align) for text in texts], [("Name", "right"), ("Composer", "left")])
+
+    def test_rhythm_notations_include_lines_arcs_and_ghost_notes(self):
+        items = [item for page in self._display_list().pages.values() for item in page.rhythms]
+        self.assertTrue(any(isinstance(item, Arc) for item in items))
+        self.assertTrue(any(isinstance(item, Glyph) and item.note is None for item in items))
+        self.assertTrue(any(type(item) is Line for item in items))
+
+    def test_digest_changes_only_on_edited_page(self):
+        before = {number: page.digest() for number, page in self._display_list().pages.items()}
+        last = max(before)
+        note = self._display_list().pages[last].notes[-1].note
+        self.music.parts[1].edit_note(note, pitch=(note + 1) % 20)
+        after = {number: page.digest() for number, page in self._display_list().pages.items()}
+        self.assertEqual([number for number in before if before[number] != after[number]], [last])
+
+    def test_display_list_is_reused_until_music_changes(self):
+        display_list = self._display_list()
+        self.assertIs(self._display_list(), display_list)
+        self.music.parts[2].notes[5].pitch = 3
+        self.assertIsNot(self._display_list(), display_list)
+
+    def test_empty_music_has_first_page(self):
+        self.music = ShakuMusic()
+        self.assertEqual(list(self._display_list().pages), [1])
+
+    def test_grid_lines_span_grid(self):
+        lines = grid_lines(2, 2)
+        self.assertEqual(lines[0], (consts.GRID_X[0], consts.GRID_Y[0], consts.GRID_X[0], consts.GRID_Y[1]))
+        self.assertEqual(lines[-1][1], lines[-1][3])
@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+from services.display_list import DisplayPage, Glyph
+from services.export_cache import ExportCache
+
+class TestExportCache(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.cache = ExportCache(self.directory, max_bytes=100)
+
+    def _page(self, pitch):
+        page = DisplayPage()
+        page.notes.append(Glyph(1, pitch, (10.0, 20.0), 1, 0))
+        return page
+
+    def test_get_returns_none_on_missing_page(self):
+        self.assertIsNone(self.cache.get(self.cache.key(self._page(1), ("png",))))
+
+    def test_get_returns_stored_page(self):
+        key = self.cache.key(self._page(1), ("png",))
+        self.cache.put(key, b"page")
+        self.assertEqual(self.cache.get(key), b"page")
+        self.assertEqual(ExportCache(self.directory).get(key), b"page")
+
+    def test_key_depends_on_content_and_settings(self):
+        keys = {
+            self.cache.key(self._page(1), ("png",)),
+            self.cache.key(self._page(2), ("png",)),
+            self.cache.key(self._page(1), ("svg",)),
+            }
+        self.assertEqual(len(keys), 3)
+        self.assertIn(self.cache.key(self._page(1), ("png",)), keys)
+
+    def test_least_recently_used_pages_are_evicted(self):
+        for name in ("a", "b", "c"):
+            self.cache.put(name, bytes(40))
+            if name == "b":
+                self.cache.get("a")
+        self.assertEqual(sorted(os.listdir(self.directory)), ["a", "c"])
+        self.assertEqual(self.cache.size, 80)
+        self.assertIsNone(self.cache.get("b"))
+
+    def test_order_of_use_is_kept_between_instances(self):
+        for name in ("a", "b"):
+            self.cache.put(name, bytes(40))
+            os.utime(os.path.join(self.directory, name), ns=(0, {"a": 2, "b": 1}[name]))
+        cache = ExportCache(self.directory, max_bytes=100)
+        cache.put("c", bytes(40))
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("b"))
+
+    def test_page_larger_than_cache_is_not_stored(self):
+        self.cache.put("a", bytes(101))
+        self.assertEqual(len(self.cache), 0)
@@ -1,5 +1,9 @@
+import os
+import tempfile
 import unittest
-from PIL import Image
+import wave
+import numpy as np
+from PIL import Image, PdfParser
 from services.filing import FileManager
 from tkinter import filedialog
 import config.shaku_constants as consts
@@ -42,3 +46,93 @@ class TestFileManager(unittest.TestCase):
         filedialog.asksaveasfile = lambda *args, **kw: filename
         value = self.filemanager.save_midi(midi=None)
         self.assertEqual(value, False)
+
+    def _pdf_file(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        return os.path.join(directory.name, "music.pdf")
+
+    def test_save_pdf_writes_all_pages_into_single_file(self):
+        filename = self._pdf_file()
+        filedialog.asksaveasfile = lambda *args, **kw: open(filename, "wb")
+        pages = {number: Image.new("L", (100, 140), 255) for number in range(1, 4)}
+        value = self.filemanager.save_pdf(pages)
+        self.assertEqual(value, True)
+        self.assertEqual(len(PdfParser.PdfParser(filename).pages), 3)
+        self.assertEqual(os.listdir(os.path.dirname(filename)), ["music.pdf"])
+
+    def test_save_pdf_writes_each_page_before_receiving_next_one(self):
+        filename = self._pdf_file()
+        filedialog.asksaveasfile = lambda *args, **kw: open(filename, "wb")
+        received = []
+        written = []
+        def pages():
+            for number in range(1, 5):
+                received.append(number)
+                yield number, Image.new("1", (100, 140), 1)
+        self.filemanager.save_pdf(pages(), lambda number: written.append((number, list(received))))
+        self.assertEqual(written, [(number, list(range(1, number + 1))) for number in range(1, 5)])
+        self.assertEqual(len(PdfParser.PdfParser(filename).pages), 4)
+
+    def test_save_svg_writes_pages_in_order_received(self):
+        filename = os.path.join(os.path.dirname(self._pdf_file()), "music.svg")
+        filedialog.asksaveasfile = lambda *args, **kw: open(filename, "w")
+        written = []
+        def svgs():
+            for number in (2, 3, 1):
+                yield number, f"<svg>{number}</svg>"
+                self.assertIn(number, written)
+        value = self.filemanager.save_svg(svgs(), written.append)
+        self.assertEqual(value, True)
+        self.assertEqual(written, [2, 3, 1])
+        with open(filename) as file:
+            self.assertEqual(file.read(), "<svg>1</svg>")
+        with open(filename[:-4] + "(3).svg") as file:
+            self.assertEqual(file.read(), "<svg>3</svg>")
+
+    def test_save_svg_lets_page_writers_write_into_files(self):
+        filename = os.path.join(os.path.dirname(self._pdf_file()), "music.svg")
+        filedialog.asksaveasfile = lambda *args, **kw: open(filename, "w")
+        files = []
+        def writer(number):
+            return lambda file: files.append(file) or file.write(f"<svg>{number}</svg>")
+        value = self.filemanager.save_svg([(1, writer(1)), (2, writer(2))])
+        self.assertEqual(value, True)
+        self.assertEqual([file.name for file in files], [filename, filename[:-4] + "(2).svg"])
+        with open(filename[:-4] + "(2).svg") as file:
+            self.assertEqual(file.read(), "<svg>2</svg>")
+
+    def test_save_wav_writes_stereo_audio(self):
+        filename = os.path.join(os.path.dirname(self._pdf_file()), "music.wav")
+        filedialog.asksaveasfile = lambda *args, **kw: open(filename, "wb")
+        samples = np.array([[0, 1], [-2, 3], [32767, -32768]], dtype=np.int16)
+        value = self.filemanager.save_wav(samples, 22050)
+        self.assertEqual(value, True)
+        with wave.open(filename, "rb") as audio:
+            self.assertEqual((audio.getnchannels(), audio.getsampwidth(), audio.getframerate()), (2, 2, 22050))
+            self.assertEqual(audio.readframes(3), samples.astype("<i2").tobytes())
+
+    def test_save_stems_writes_audio_of_each_part(self):
+        filename = os.path.join(os.path.dirname(self._pdf_file()), "music.wav")
+        filedialog.asksaveasfilename = lambda *args, **kw: filename
+        stems = {1: np.zeros((3, 2), dtype=np.int16), 3: np.ones((5, 2), dtype=np.int16)}
+        value = self.filemanager.save_stems(stems, 22050)
+        self.assertEqual(value, True)
+        self.assertEqual(sorted(os.listdir(os.path.dirname(filename))), ["music(part 1).wav", "music(part 3).wav"])
+        with wave.open(filename[:-4] + "(part 3).wav", "rb") as audio:
+            self.assertEqual(audio.getnframes(), 5)
+
+    def test_save_stems_leaves_specified_file_intact(self):
+        filename = os.path.join(os.path.dirname(self._pdf_file()), "music.audio")
+        with open(filename, "wb") as file:
+            file.write(b"RIFF")
+        filedialog.asksaveasfilename = lambda *args, **kw: filename
+        value = self.filemanager.save_stems({2: np.zeros((3, 2), dtype=np.int16)}, 22050)
+        self.assertEqual(value, True)
+        with open(filename, "rb") as file:
+            self.assertEqual(file.read(), b"RIFF")
+        self.assertTrue(os.path.exists(filename[:-6] + "(part 2).wav"))
+
+    def test_save_stems_returns_false_on_no_file(self):
+        filedialog.asksaveasfilename = lambda *args, **kw: ""
+        self.assertEqual(self.filemanager.save_stems({1: np.zeros((3, 2), dtype=np.int16)}, 22050), False)
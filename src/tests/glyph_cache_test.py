@@ -0,0 +1,49 @@
+import unittest
+from PIL import Image, ImageDraw, ImageFont
+import config.shaku_constants as consts
+from services.glyph_cache import GlyphCache
+
+class TestGlyphCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = GlyphCache()
+        self.font = ImageFont.truetype(consts.NOTE_FONT, 100)
+
+    def _image(self):
+        return Image.new("RGB", (400, 300), (255, 255, 255))
+
+    def test_paste_matches_drawing_text(self):
+        expected = self._image()
+        draft = ImageDraw.Draw(expected)
+        result = self._image()
+        for position, pitch in (((10, 10), 0), ((60, 40), 5), ((75.5, 50.25), 5), ((200, 150), -1)):
+            text = consts.NOTE_TEXT_CODES[pitch]
+            draft.text(position, text, font=self.font, anchor="lt", fill=consts.NOTE_COLOR)
+            self.cache.paste(result, position, text, self.font, consts.NOTE_COLOR)
+        self.assertEqual(expected.tobytes(), result.tobytes())
+
+    def test_glyph_is_rasterized_only_once(self):
+        image = self._image()
+        for x_axis in range(0, 300, 30):
+            self.cache.paste(image, (x_axis, 10), "Q", self.font, consts.NOTE_COLOR)
+        self.cache.paste(image, (10, 100), "W", self.font, (255, 0, 0))
+        self.cache.paste(image, (100, 100), "W", self.font, (0, 0, 255))
+        self.assertEqual(len(self.cache), 2)
+
+    def test_glyph_is_rasterized_again_on_other_font_size(self):
+        self.cache.get_mask("Q", self.font)
+        self.cache.get_mask("Q", ImageFont.truetype(consts.NOTE_FONT, 50))
+        self.assertEqual(len(self.cache), 2)
+
+    def test_paste_clips_glyph_partially_outside_image(self):
+        expected = self._image()
+        ImageDraw.Draw(expected).text((-20, 250), "Q", font=self.font, anchor="lt", fill=consts.NOTE_COLOR)
+        result = self._image()
+        self.cache.paste(result, (-20, 250), "Q", self.font, consts.NOTE_COLOR)
+        self.assertEqual(expected.tobytes(), result.tobytes())
+
+    def test_paste_matches_drawing_text_in_black_and_white(self):
+        expected = Image.new("1", (400, 300), 1)
+        ImageDraw.Draw(expected).text((30.5, 40.75), "Q", font=self.font, anchor="lt", fill=0)
+        result = Image.new("1", (400, 300), 1)
+        self.cache.paste(result, (30.5, 40.75), "Q", self.font, 0)
+        self.assertEqual(expected.tobytes(), result.tobytes())
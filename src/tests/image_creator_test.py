@@ -1,11 +1,23 @@
+import os
+import tempfile
 import unittest
-from PIL import Image
+from unittest.mock import patch
+from io import BytesIO
+from PIL import Image, PdfParser
 import config.shaku_constants as consts
+from entities.shaku_music import ShakuMusic
+from services.display_list import DisplayListBuilder
 from services.image_creator import ImageCreator
+from services.layout_context import LayoutContext
+from services.export_cache import ExportCache
 
 class TestImageCreator(unittest.TestCase):
     def setUp(self):
-        self.creator = ImageCreator()
+        patcher = patch.dict(os.environ, {"MODE": "Tozan", "MEASURE_LENGHT": "2"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.display_lists = DisplayListBuilder()
+        self.creator = ImageCreator(self.display_lists)
 
     def _values_grid_x(self):
         min_range = range(5, 800, 50)
@@ -90,3 +102,107 @@ class TestImageCreator(unittest.TestCase):
         measure = consts.MEASURE_LENGHT
         func = self.creator._draw_grid_line
         self.creator.draw_grid(4, measure, func)
+
+    def _music(self, note_count):
+        music = ShakuMusic()
+        music.add_part(1)
+        for i in range(note_count):
+            music.parts[1].add_note(i % 20, 8)
+        return music
+
+    def test_export_pages_returns_encoded_page_for_every_page(self):
+        music = self._music(300)
+        images = self.creator.create_images(music)
+        pages = self.creator.export_pages(music, image_format="PNG")
+        self.assertEqual(list(pages), list(images))
+        for number, data in pages.items():
+            self.assertTrue(data.startswith(b"\x89PNG"))
+
+    def test_export_pages_in_parallel_matches_serial_export(self):
+        music = self._music(300)
+        serial = ImageCreator(workers=1).export_pages(music, True, image_format="PNG")
+        parallel = ImageCreator(workers=2).export_pages(music, True, image_format="PNG")
+        self.assertGreater(len(serial), 1)
+        self.assertEqual(serial, parallel)
+
+    def test_page_template_is_rendered_once_per_grid(self):
+        context = LayoutContext(2, 2, "Tozan")
+        template = self.creator.page_template(context, True)
+        self.assertIs(self.creator.page_template(context, True), template)
+        self.assertIsNot(self.creator.page_template(LayoutContext(3, 2, "Tozan"), True), template)
+        self.assertIsNot(self.creator.page_template(context), template)
+
+    def test_render_page_does_not_draw_on_template(self):
+        music = self._music(50)
+        context = LayoutContext(2, 2, "Tozan")
+        page = self.display_lists.get_display_list(music, context).pages[1]
+        expected = self.creator.page_template(context, True).tobytes()
+        image = self.creator.render_page(page, context, True)
+        self.assertNotEqual(image.tobytes(), expected)
+        self.assertEqual(self.creator.page_template(context, True).tobytes(), expected)
+
+    def test_unsupported_color_mode_raises_error(self):
+        with self.assertRaises(ValueError):
+            ImageCreator(color_mode="CMYK")
+
+    def test_pages_are_rendered_in_color_mode(self):
+        music = self._music(50)
+        for color_mode in ("1", "L", "RGB"):
+            images = ImageCreator(color_mode=color_mode).create_images(music, True)
+            self.assertEqual(images[1].mode, color_mode)
+
+    def test_grayscale_page_matches_black_on_white_color_page(self):
+        music = self._music(100)
+        color = ImageCreator(color_mode="RGB").create_images(music, True)[1]
+        grayscale = ImageCreator(color_mode="L").create_images(music, True)[1]
+        self.assertEqual(color.convert("L").tobytes(), grayscale.tobytes())
+
+    def test_iter_pages_renders_same_pages_as_create_images(self):
+        music = self._music(300)
+        images = ImageCreator(workers=1).create_images(music, True)
+        pages = ImageCreator(workers=1).iter_pages(music, True, image_format="PNG")
+        for number, data in pages:
+            with Image.open(BytesIO(data)) as page:
+                self.assertEqual(page.tobytes(), images[number].tobytes())
+        self.assertEqual(self.creator.page_count(music), len(images))
+
+    def test_iter_pages_encodes_each_page_as_pdf_document(self):
+        music = self._music(300)
+        pages = list(ImageCreator(workers=1).iter_pages(music))
+        self.assertEqual([number for number, _ in pages], list(range(1, len(pages) + 1)))
+        for _, data in pages:
+            self.assertEqual(len(PdfParser.PdfParser(buf=data).pages), 1)
+
+    def test_iter_pages_in_parallel_matches_serial_rendering(self):
+        music = self._music(300)
+        serial = list(ImageCreator(workers=1).iter_pages(music, image_format="PNG"))
+        parallel = list(ImageCreator(workers=2).iter_pages(music, image_format="PNG"))
+        self.assertGreater(len(serial), 1)
+        self.assertEqual(serial, parallel)
+
+    def test_export_pages_renders_only_changed_pages_again(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        music = self._music(300)
+        creator = ImageCreator(workers=1, cache=ExportCache(directory.name))
+        first = creator.export_pages(music, image_format="PNG")
+        music.parts[1].edit_note(299, pitch=3)
+        rendered = []
+        render_page = creator.render_page
+        creator.render_page = lambda page, *args: rendered.append(page) or render_page(page, *args)
+        second = creator.export_pages(music, image_format="PNG")
+        self.assertEqual(len(rendered), 1)
+        self.assertEqual(second, ImageCreator(workers=1).export_pages(music, image_format="PNG"))
+        self.assertEqual([number for number in first if first[number] != second[number]], [max(first)])
+
+    def test_iter_pages_in_parallel_renders_only_changed_pages_again(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        music = self._music(300)
+        cache = ExportCache(directory.name)
+        creator = ImageCreator(workers=2, cache=cache)
+        first = list(creator.iter_pages(music, image_format="PNG"))
+        music.parts[1].edit_note(299, pitch=3)
+        second = list(creator.iter_pages(music, image_format="PNG"))
+        self.assertEqual(len(cache), len(first) + 1)
+        self.assertEqual(second, list(ImageCreator(workers=1).iter_pages(music, image_format="PNG")))
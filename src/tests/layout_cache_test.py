@@ -0,0 +1,108 @@
+import os
+import unittest
+from unittest.mock import patch
+import numpy as np
+from entities.shaku_part import ShakuPart
+from services.layout_cache import LayoutCache
+from services.layout_context import LayoutContext
+from services.positioning import ShakuPositions
+
+class TestLayoutCache(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.dict(os.environ, {"MODE": "Tozan", "MEASURE_LENGHT": "2"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = LayoutCache()
+        self.part = ShakuPart(1)
+        for i in range(300):
+            self.part.add_note(i % 20, [2, 4, 8, 16][i % 4])
+
+    def _context(self, spacing):
+        return LayoutContext.from_env(spacing)
+
+    def _full_walk(self, context):
+        pos = ShakuPositions()
+        rows = pos.get_row_count(context.spacing)
+        slots = pos.get_slot_count(True, context.measure_lenght)
+        rel_pos = pos.get_relative_positions(self.part.lenghts, rows, slots, True)
+        coordinates = [pos.get_coordinates(i, self.part.part_no, context) for i in rel_pos]
+        return rel_pos, coordinates
+
+    def _assert_matches_full_walk(self, spacing):
+        context = self._context(spacing)
+        layout = self.cache.get_layout(self.part, context)
+        rel_pos, coordinates = self._full_walk(context)
+        self.assertEqual([layout.position(i) for i in range(len(layout))], list(rel_pos))
+        self.assertEqual(layout.coordinates(), coordinates)
+
+    def test_layout_matches_full_walk(self):
+        self._assert_matches_full_walk(2)
+
+    def test_layout_after_appending_notes(self):
+        self.cache.get_layout(self.part, self._context(2))
+        self.part.add_note(3, 16)
+        self.part.add_note(4, 2)
+        self._assert_matches_full_walk(2)
+
+    def test_layout_after_editing_note_in_middle(self):
+        self.cache.get_layout(self.part, self._context(2))
+        self.part.notes[120].lenght = 16
+        self._assert_matches_full_walk(2)
+
+    def test_layout_after_removing_and_inserting_notes(self):
+        self.cache.get_layout(self.part, self._context(2))
+        self.part.remove_note(10)
+        self.part.insert_note(200, 5, 4)
+        self._assert_matches_full_walk(2)
+
+    def test_layout_after_spacing_change(self):
+        self.cache.get_layout(self.part, self._context(2))
+        self._assert_matches_full_walk(3)
+
+    def test_layout_after_measure_lenght_change(self):
+        self.cache.get_layout(self.part, self._context(2))
+        os.environ["MEASURE_LENGHT"] = "4"
+        self._assert_matches_full_walk(2)
+
+    def test_only_notes_from_edited_one_onward_are_recomputed(self):
+        self.cache.get_layout(self.part, self._context(2))
+        original = ShakuPositions.get_coordinate_arrays
+        with patch.object(ShakuPositions, "get_coordinate_arrays", autospec=True, side_effect=original) as computed:
+            self.part.notes[250].lenght = 2
+            self.cache.get_layout(self.part, self._context(2))
+        self.assertEqual([len(call.args[1]) for call in computed.call_args_list], [50])
+
+    def test_appending_note_writes_into_existing_columns(self):
+        layout = self.cache.get_layout(self.part, self._context(2))
+        columns = [layout.pages, layout.rows, layout.slots, layout.xs, layout.ys]
+        self.part.add_note(3, 16)
+        self.cache.get_layout(self.part, self._context(2))
+        self.assertEqual(len(layout), 301)
+        after = [layout.pages, layout.rows, layout.slots, layout.xs, layout.ys]
+        self.assertTrue(all(np.shares_memory(a, b) for a, b in zip(columns, after)))
+
+    def test_layout_after_appending_notes_one_by_one(self):
+        self.part = ShakuPart(1)
+        for i in range(200):
+            self.part.add_note(i % 20, [2, 4, 8, 16][i % 4])
+            self.cache.get_layout(self.part, self._context(2))
+        self._assert_matches_full_walk(2)
+
+    def test_new_part_instance_gets_new_layout(self):
+        layout = self.cache.get_layout(self.part, self._context(2))
+        other = ShakuPart(1)
+        other.add_note(1, 8)
+        self.assertEqual(len(self.cache.get_layout(other, self._context(2))), 1)
+        self.assertIsNot(self.cache.get_layout(other, self._context(2)), layout)
+
+    def test_page_ranges_cover_all_notes(self):
+        for i in range(1000):
+            self.part.add_note(1, 16)
+        layout = self.cache.get_layout(self.part, self._context(1))
+        ranges = layout.page_ranges()
+        self.assertGreater(len(ranges), 1)
+        self.assertEqual(ranges[0][1], 0)
+        self.assertEqual(ranges[-1][2], len(layout))
+        for page, start, end in ranges:
+            self.assertTrue(all(layout.pages[i] == page for i in range(start, end)))
+        self.assertEqual(layout.page_ranges(1), ranges[1:])
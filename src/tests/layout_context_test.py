@@ -0,0 +1,42 @@
+import os
+import unittest
+from unittest.mock import patch
+import config.shaku_constants as consts
+from services.layout_context import LayoutContext
+from services.positioning import ShakuPositions
+
+class TestLayoutContext(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.dict(os.environ, {"MODE": "Tozan", "MEASURE_LENGHT": "2"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pos = ShakuPositions()
+
+    def test_from_env_reads_measure_lenght_and_mode(self):
+        context = LayoutContext.from_env(3)
+        self.assertEqual(context.key, (3, 2, "Tozan"))
+
+    def test_precomputed_counts_match_positioning(self):
+        context = LayoutContext(2, 4, "Tozan")
+        self.assertEqual(context.rows, self.pos.get_row_count(2))
+        self.assertEqual(context.slots, self.pos.get_slot_count(True, 4))
+        self.assertEqual(context.measure_skip_count, self.pos.get_measure_skip_count(4))
+
+    def test_measure_values(self):
+        context = LayoutContext(2, 2, "Tozan")
+        self.assertEqual(context.measure_slots, 8)
+        self.assertEqual(context.measure_duration, 16)
+        self.assertEqual(context.measure_height, 8 * consts.NOTE_Y_SPACING + consts.MEASURE_SKIP_LENGHT)
+
+    def test_start_x_matches_positioning(self):
+        context = LayoutContext(3, 2, "Tozan")
+        for part in range(1, consts.MAX_PARTS + 1):
+            self.assertEqual(context.start_x(part), self.pos.calculate_start(part, 3))
+
+    def test_context_is_read_only(self):
+        context = LayoutContext(2, 2, "Tozan")
+        with self.assertRaises(AttributeError):
+            context.spacing = 3
+
+    def test_unknown_mode_raises_error(self):
+        self.assertRaises(KeyError, LayoutContext, 2, 2, "Unknown")
@@ -1,4 +1,6 @@
+import os
 import unittest
+from unittest.mock import patch
 from midiutil import MIDIFile
 from services.midi_creator import MidiCreator
 from entities.shaku_part import ShakuPart
@@ -6,6 +8,9 @@ from entities.shaku_note import ShakuNote
 
 class TestMidiCreator(unittest.TestCase):
     def setUp(self):
+        patcher = patch.dict(os.environ, {"TEMPO": "65", "VOLUME": "100", "MIDI_INSTRUMENT_NUMBER": "73"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
         self.creator = MidiCreator()
 
     def test_generate_midi_raises_error_if_no_data(self):
@@ -21,4 +26,18 @@ class TestMidiCreator(unittest.TestCase):
         part = ShakuPart(1, 10, 1)
         part.add_note(note)
         self.creator.create_track(part)
-        self.assertIsInstance(self.creator.generate_midi(), MIDIFile)
\ No newline at end of file
+        self.assertIsInstance(self.creator.generate_midi(), MIDIFile)
+
+    def test_generate_events_orders_note_events_by_time(self):
+        part = ShakuPart(1)
+        for pitch, lenght in ((0, 8), (-1, 8), (2, 4)):
+            part.add_note(pitch, lenght)
+        self.creator.create_track(part)
+        other = ShakuPart(2)
+        other.add_note(1, 12)
+        self.creator.create_track(other)
+        volume = int(os.environ["VOLUME"])
+        self.assertEqual(self.creator.generate_events(), [
+            (0, 0, 60, volume), (0, 1, 61, volume), (1, 0, 60, 0),
+            (1.5, 1, 61, 0), (2, 0, 62, volume), (2.5, 0, 62, 0),
+            ])
@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from PIL import PdfParser
+from entities.shaku_music import ShakuMusic
+from services.display_list import DisplayListBuilder
+from services.export_cache import ExportCache
+from services.layout_context import LayoutContext
+from services.pdf_creator import PdfCreator
+
+class TestPdfCreator(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.dict(os.environ, {"MODE": "Tozan", "MEASURE_LENGHT": "2"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.display_lists = DisplayListBuilder()
+        self.creator = PdfCreator(self.display_lists)
+        self.music = ShakuMusic()
+        self.music.name = "Name (Test)"
+        self.music.composer = "Composer"
+        self.music.add_part(1)
+        for i in range(300):
+            self.music.parts[1].add_note(i % 20, [2, 4, 8, 16][i % 4])
+
+    def _parse(self, data):
+        return PdfParser.PdfParser(buf=data)
+
+    def test_create_pdf_raises_error_on_no_music(self):
+        with self.assertRaises(TypeError):
+            self.creator.create_pdf(None)
+
+    def test_create_pdf_has_page_for_every_page_of_music(self):
+        context = LayoutContext(2, 2, "Tozan")
+        page_count = len(self.display_lists.get_display_list(self.music, context).pages)
+        pdf = self._parse(self.creator.create_pdf(self.music, True, context))
+        self.assertGreater(page_count, 1)
+        self.assertEqual(len(pdf.pages), page_count)
+
+    def test_create_pdf_embeds_note_font(self):
+        data = self.creator.create_pdf(self.music)
+        self.assertIn(b"/FontFile2", data)
+        self.assertIn(b"/BaseFont /ShakuNotator", data)
+
+    def test_create_pdf_output_is_deterministic(self):
+        self.assertEqual(self.creator.create_pdf(self.music, True), self.creator.create_pdf(self.music, True))
+
+    def test_create_pdf_of_empty_music_has_one_page(self):
+        pdf = self._parse(self.creator.create_pdf(ShakuMusic(), True))
+        self.assertEqual(len(pdf.pages), 1)
+
+    def test_create_pdf_embeds_note_font_once(self):
+        data = self.creator.create_pdf(self.music, True)
+        self.assertEqual(data.count(b"/FontFile2"), 1)
+
+    def test_create_pdf_makes_only_changed_pages_again(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cache = ExportCache(directory.name)
+        creator = PdfCreator(cache=cache)
+        creator.create_pdf(self.music, True)
+        self.music.parts[1].edit_note(299, pitch=3)
+        with patch.object(cache, "put", wraps=cache.put) as put:
+            data = creator.create_pdf(self.music, True)
+        self.assertEqual(put.call_count, 1)
+        self.assertEqual(data, PdfCreator().create_pdf(self.music, True))
@@ -0,0 +1,54 @@
+import unittest
+from io import BytesIO
+from PIL import Image, PdfParser
+from services.pdf_writer import PdfWriter
+
+class TestPdfWriter(unittest.TestCase):
+    def _document(self, *images):
+        data = BytesIO()
+        images[0].save(data, format="PDF", save_all=True, append_images=list(images[1:]))
+        return data.getvalue()
+
+    def _write(self, documents, fonts=None):
+        output = BytesIO()
+        writer = PdfWriter(output)
+        for document in documents:
+            writer.add_page(document, fonts)
+        writer.close()
+        return output.getvalue()
+
+    def test_copied_pages_keep_their_images(self):
+        images = [Image.new("L", (100, 140), 255), Image.new("RGB", (60, 80), (255, 0, 0))]
+        pdf = PdfParser.PdfParser(buf=self._write([self._document(image) for image in images]))
+        self.assertEqual(len(pdf.pages), 2)
+        for ref, image in zip(pdf.pages, images):
+            page = pdf.read_indirect(ref)
+            self.assertEqual(list(page[b"MediaBox"])[2:], [image.width, image.height])
+            xobject = pdf.read_indirect(page[b"Resources"][b"XObject"][b"image"])
+            self.assertEqual((xobject.dictionary[b"Width"], xobject.dictionary[b"Height"]), image.size)
+
+    def test_only_first_page_of_document_is_copied(self):
+        document = self._document(Image.new("1", (10, 10), 1), Image.new("1", (20, 20), 1))
+        pdf = PdfParser.PdfParser(buf=self._write([document]))
+        self.assertEqual(len(pdf.pages), 1)
+        self.assertEqual(list(pdf.read_indirect(pdf.pages[0])[b"MediaBox"])[2:], [10, 10])
+
+    def test_pages_are_written_when_added(self):
+        output = BytesIO()
+        writer = PdfWriter(output)
+        writer.add_page(self._document(Image.new("1", (10, 10), 1)))
+        size = len(output.getvalue())
+        writer.add_page(self._document(Image.new("1", (10, 10), 1)))
+        self.assertGreater(len(output.getvalue()), size)
+        self.assertEqual(writer.page_count, 2)
+
+    def test_fonts_of_page_are_replaced(self):
+        output = BytesIO()
+        writer = PdfWriter(output)
+        font = writer.add_object("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+        page = writer.add_page(self._document(Image.new("1", (10, 10), 1)), {"F1": font})
+        writer.close()
+        pdf = PdfParser.PdfParser(buf=output.getvalue())
+        resources = pdf.read_indirect(PdfParser.IndirectReference(page, 0))[b"Resources"]
+        self.assertEqual(resources[b"Font"][b"F1"], PdfParser.IndirectReference(font, 0))
+        self.assertIn(b"XObject", resources)
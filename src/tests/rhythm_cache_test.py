@@ -0,0 +1,83 @@
+import os
+import unittest
+from unittest.mock import patch
+from entities.shaku_note import ShakuNote
+from entities.shaku_part import ShakuPart
+from services.layout_cache import LayoutCache
+from services.layout_context import LayoutContext
+from services.rhythm_cache import RhythmCache
+from services.time_notation import ShakuRhythmNotation
+
+class TestRhythmCache(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.dict(os.environ, {"MODE": "Tozan", "MEASURE_LENGHT": "2"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.context = LayoutContext.from_env(2)
+        self.layouts = LayoutCache()
+        self.cache = RhythmCache()
+        self.part = ShakuPart(1)
+        for i in range(200):
+            self.part.add_note(i % 20, [2, 4, 8, 16, 6][i % 5])
+
+    def _comparable(self, pages):
+        return [
+            [(n[0].pitch, n[0].lenght, n[1]) if isinstance(n[0], ShakuNote) else n for n in notations]
+            for notations in pages
+            ]
+
+    def _get_raw(self):
+        layout = self.layouts.get_layout(self.part, self.context)
+        notations = []
+        for page, start, end in layout.page_ranges():
+            positions = layout.coordinates(start, end)
+            notations.append(self.cache.get_rhytms(self.part, page, start, end, positions, self.context))
+        return notations
+
+    def _get_all(self):
+        return self._comparable(self._get_raw())
+
+    def _new_items(self, before, after):
+        return [
+            i for page_before, page_after in zip(before, after)
+            for i, (old, new) in enumerate(zip(page_before, page_after)) if old is not new
+            ]
+
+    def _uncached(self):
+        layout = self.layouts.get_layout(self.part, self.context)
+        rhy = ShakuRhythmNotation(self.context)
+        notations = []
+        for page, start, end in layout.page_ranges():
+            positions = layout.coordinates(start, end)
+            notations.append(rhy.tozan_rhytms(self.part.pitches[start:end], self.part.lenghts[start:end], positions))
+        return self._comparable(notations)
+
+    def test_cached_notations_match_uncached(self):
+        self.assertEqual(self._get_all(), self._uncached())
+        self.assertEqual(self._get_all(), self._uncached())
+
+    def test_unchanged_measures_are_not_recomputed(self):
+        before = self._get_raw()
+        after = self._get_raw()
+        self.assertEqual([len(page) for page in after], [len(page) for page in before])
+        self.assertEqual(self._new_items(before, after), [])
+
+    def test_only_edited_measure_is_recomputed_on_pitch_change(self):
+        before = self._get_raw()
+        self.part.notes[50].pitch = 3
+        after = self._get_raw()
+        new_items = self._new_items(before, after)
+        self.assertTrue(0 < len(new_items) < 10)
+        self.assertEqual(new_items, list(range(new_items[0], new_items[-1] + 1)))
+        self.assertEqual(self._comparable(after), self._uncached())
+
+    def test_notations_after_lenght_change_match_uncached(self):
+        self._get_all()
+        self.part.notes[120].lenght = 12
+        self.part.remove_note(30)
+        self.assertEqual(self._get_all(), self._uncached())
+
+    def test_context_change_drops_cached_notations(self):
+        self._get_all()
+        self.context = LayoutContext(2, 3, "Tozan")
+        self.assertEqual(self._get_all(), self._uncached())
@@ -139,4 +139,15 @@ class TestShakuMusic(unittest.TestCase):
     def test_part_1_gets_correct_position(self):
         self.music.add_part(1)
 
+    def test_revision_changes_when_name_is_set(self):
+        revision = self.music.revision
+        self.music.name = "Changed"
+        self.assertNotEqual(self.music.revision, revision)
+
+    def test_revision_changes_when_note_is_added(self):
+        self.music.add_part(1)
+        revision = self.music.revision
+        self.music.parts[1].add_note(1, 8)
+        self.assertNotEqual(self.music.revision, revision)
+
 #continue
\ No newline at end of file
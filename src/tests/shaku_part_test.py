@@ -1,4 +1,5 @@
 import unittest
+from copy import deepcopy
 import config.shaku_constants as consts
 from entities.shaku_part import ShakuPart
 from entities.shaku_note import ShakuNote
@@ -132,4 +133,133 @@ class TestShakuPart(unittest.TestCase):
     #def _add_bunch_of_notes()
 
     #def test_setting_spacing_moves_notes_part_1_row_1(self):
-    #    self.part.add_note
\ No newline at end of file
+    #    self.part.add_note
+
+class TestShakuPartNoteStorage(unittest.TestCase):
+    def setUp(self):
+        self.part = ShakuPart(1)
+        for pitch, lenght in [(1, 8), (2, 4), (-1, 4), (5, 16)]:
+            self.part.add_note(pitch, lenght)
+
+    def test_pitches_and_lenghts_are_stored_in_order(self):
+        self.assertEqual(list(self.part.pitches), [1, 2, -1, 5])
+        self.assertEqual(list(self.part.lenghts), [8, 4, 4, 16])
+
+    def test_notes_length_matches_arrays(self):
+        self.assertEqual(len(self.part.notes), 4)
+
+    def test_note_view_reads_through(self):
+        note = self.part.notes[3]
+        self.assertEqual((note.pitch, note.lenght), (5, 16))
+
+    def test_note_view_negative_index(self):
+        self.assertEqual(self.part.notes[-1].pitch, 5)
+
+    def test_note_view_writes_through(self):
+        note = self.part.notes[1]
+        note.pitch = 7
+        note.lenght = 8
+        self.assertEqual(self.part.pitches[1], 7)
+        self.assertEqual(self.part.lenghts[1], 8)
+
+    def test_note_slice_returns_views(self):
+        notes = self.part.notes[1:3]
+        self.assertEqual([note.pitch for note in notes], [2, -1])
+
+    def test_notes_can_be_appended(self):
+        self.part.notes.append(ShakuNote(3, 2))
+        self.assertEqual(self.part.notes[-1].lenght, 2)
+
+    def test_notes_compare_equal_to_list_of_notes(self):
+        part = ShakuPart(2)
+        part.add_note(1, 8)
+        self.assertEqual(part.notes, [ShakuNote(1, 8)])
+
+    def test_deepcopy_of_view_is_detached_note(self):
+        note = deepcopy(self.part.notes[0])
+        self.assertIsInstance(note, ShakuNote)
+        note.lenght = 2
+        self.assertEqual(self.part.lenghts[0], 8)
+
+    def test_duration_until_sums_previous_lenghts(self):
+        self.assertEqual(self.part.get_duration_until(3), 16)
+
+    def test_note_view_out_of_range_raises_error(self):
+        self.assertRaises(IndexError, lambda: self.part.notes[4])
+
+
+class TestShakuPartDurationIndex(unittest.TestCase):
+    def setUp(self):
+        self.part = ShakuPart(1)
+        for pitch, lenght in [(1, 8), (2, 4), (-1, 4), (5, 16)]:
+            self.part.add_note(pitch, lenght)
+
+    def _sums(self):
+        return [sum(self.part.lenghts[:i]) for i in range(len(self.part.lenghts) + 1)]
+
+    def test_duration_until_each_note(self):
+        durations = [self.part.get_duration_until(i) for i in range(5)]
+        self.assertEqual(durations, [0, 8, 12, 16, 32])
+
+    def test_duration_until_past_end_is_total(self):
+        self.assertEqual(self.part.get_duration_until(100), 32)
+
+    def test_total_duration(self):
+        self.assertEqual(self.part.total_duration, 32)
+
+    def test_edit_note_lenght_updates_index(self):
+        self.part.notes[1].lenght = 16
+        self.assertEqual([self.part.get_duration_until(i) for i in range(5)], self._sums())
+
+    def test_insert_note_updates_index(self):
+        self.part.insert_note(1, 3, 2)
+        self.assertEqual(list(self.part.pitches), [1, 3, 2, -1, 5])
+        self.assertEqual([self.part.get_duration_until(i) for i in range(6)], self._sums())
+
+    def test_remove_note_updates_index(self):
+        self.part.remove_note(0)
+        self.assertEqual(list(self.part.lenghts), [4, 4, 16])
+        self.assertEqual([self.part.get_duration_until(i) for i in range(4)], self._sums())
+
+    def test_negative_note_numbers_count_from_end(self):
+        self.assertEqual(self.part.get_duration_until(-1), sum(self.part.lenghts[:-1]))
+        self.assertEqual(self.part.get_duration_until(-10), 0)
+        self.part.remove_note(-1)
+        self.assertEqual(self.part.total_duration, 16)
+        self.part.insert_note(-1, 3, 2)
+        self.assertEqual(list(self.part.lenghts), [8, 4, 2, 4])
+        self.part.edit_note(-2, lenght=6)
+        self.assertEqual([self.part.get_duration_until(i) for i in range(5)], self._sums())
+
+    def test_remove_note_out_of_range_raises_error(self):
+        self.assertRaises(IndexError, self.part.remove_note, 4)
+        self.assertRaises(IndexError, self.part.remove_note, -5)
+        self.assertEqual(self.part.total_duration, 32)
+
+    def test_notations_move_with_their_notes(self):
+        self.part.notations = [ShakuNotation("a", 1), ShakuNotation("b", 3)]
+        self.part.insert_note(2, 3, 2)
+        self.assertEqual([notation.relative_note for notation in self.part.notations], [1, 4])
+        self.part.remove_note(0)
+        self.assertEqual([notation.relative_note for notation in self.part.notations], [0, 3])
+        self.assertEqual(self.part.pitches[3], 5)
+
+    def test_note_at_start_of_note(self):
+        self.assertEqual(self.part.get_note_at(12), 2)
+
+    def test_note_at_middle_of_note(self):
+        self.assertEqual(self.part.get_note_at(20), 3)
+
+    def test_note_at_outside_part_is_none(self):
+        self.assertIsNone(self.part.get_note_at(32))
+        self.assertIsNone(self.part.get_note_at(-1))
+
+    def test_revision_changes_when_misc_notations_change(self):
+        revisions = [self.part.revision]
+        self.part.append_misc_notation("a")
+        revisions.append(self.part.revision)
+        self.part.clear_pre_existing_notation()
+        revisions.append(self.part.revision)
+        self.part.notations = [ShakuNotation("b", 0)]
+        revisions.append(self.part.revision)
+        self.assertEqual(len(set(revisions)), 4)
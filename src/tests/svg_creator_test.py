@@ -1,27 +1,111 @@
+import io
+import os
+import tempfile
 import unittest
-from svgwrite import Drawing
+from unittest.mock import patch
 from services.svg_creator import SvgCreator
+from services.display_list import DisplayListBuilder
+from services.layout_context import LayoutContext
+from services.export_cache import ExportCache
 from entities.shaku_music import ShakuMusic
 from entities.shaku_note import ShakuNote
+import config.shaku_constants as consts
 
 class TestMidiCreator(unittest.TestCase):
     def setUp(self):
-        self.creator = SvgCreator()
+        patcher = patch.dict(os.environ, {"MODE": "Tozan", "MEASURE_LENGHT": "2"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.display_lists = DisplayListBuilder()
+        self.creator = SvgCreator(self.display_lists)
 
     def test_create_svg_returns_drawing_instance(self):
         music = ShakuMusic()
         music.add_part(1)
         music.parts[1].add_note(ShakuNote(1, (100, 100), 8, True))
         result = self.creator.create_svg(music)
-        self.assertIsInstance(result, Drawing)
+        self.assertTrue(result[1].startswith("<?xml"))
 
     def test_create_svg_returns_drawing_with_empty_music(self):
         music = ShakuMusic()
         result = self.creator.create_svg(music)
-        self.assertIsInstance(result, Drawing)
+        self.assertTrue(result[1].startswith("<?xml"))
 
     def _send_none_to_create(self):
         self.creator.create_svg(None)
 
     def test_create_svg_generates_error_on_no_music(self):
-        self.assertRaises(TypeError, self._send_none_to_create)
\ No newline at end of file
+        self.assertRaises(TypeError, self._send_none_to_create)
+
+    def _music(self, note_count):
+        music = ShakuMusic()
+        music.add_part(1)
+        for i in range(note_count):
+            music.parts[1].add_note(i % 3, 8)
+        return music
+
+    def test_create_svg_defines_each_note_image_once_per_page(self):
+        svgs = self.creator.create_svg(self._music(60))
+        markup = svgs[1]
+        self.assertEqual(markup.count("<image"), 3)
+        self.assertEqual(markup.count("<use"), 60)
+
+    def test_create_svg_embeds_note_images(self):
+        svgs = self.creator.create_svg(self._music(10))
+        markup = svgs[1]
+        self.assertIn("data:image/png;base64,", markup)
+        self.assertNotIn(consts.MODE_DATA["Tozan"]["NOTES"][0], markup)
+
+    def test_write_page_streams_same_drawing_as_create_svg(self):
+        music = self._music(30)
+        context = LayoutContext(2, 2, "Tozan")
+        page = self.display_lists.get_display_list(music, context).pages[1]
+        file = io.StringIO()
+        self.creator.write_page(file, page, context, True)
+        self.assertEqual(file.getvalue(), self.creator.create_svg(music, True, context=context)[1])
+
+    def test_create_svg_escapes_text(self):
+        music = self._music(1)
+        music.name = "<Name> & Co"
+        markup = self.creator.create_svg(music)[1]
+        self.assertIn(">&lt;Name&gt; &amp; Co</text>", markup)
+
+    def test_iter_svgs_yields_pages_in_order_with_one_worker(self):
+        music = self._music(400)
+        numbers = [number for number, _ in SvgCreator(workers=1).iter_svgs(music)]
+        self.assertEqual(numbers, list(range(1, len(numbers) + 1)))
+        self.assertGreater(len(numbers), 1)
+
+    def test_iter_writers_with_one_worker_write_pages_straight_into_file(self):
+        music = self._music(400)
+        creator = SvgCreator(workers=1)
+        written = []
+        write_page = creator.write_page
+        creator.write_page = lambda file, *args: written.append(file) or write_page(file, *args)
+        files = {}
+        for number, write in creator.iter_writers(music):
+            files[number] = io.StringIO()
+            write(files[number])
+        self.assertEqual(written, list(files.values()))
+        self.assertEqual({number: file.getvalue() for number, file in files.items()}, SvgCreator().create_svg(music))
+
+    def test_iter_svgs_in_parallel_equals_serial(self):
+        music = self._music(400)
+        serial = SvgCreator(workers=1).create_svg(music, True)
+        parallel = dict(SvgCreator(workers=2).iter_svgs(music, True))
+        self.assertEqual(parallel, serial)
+
+    def test_iter_svgs_writes_only_changed_pages_again(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        music = self._music(400)
+        creator = SvgCreator(workers=1, cache=ExportCache(directory.name))
+        first = creator.create_svg(music)
+        music.parts[1].edit_note(399, pitch=5)
+        written = []
+        write_page = creator.write_page
+        creator.write_page = lambda file, page, *args: written.append(page) or write_page(file, page, *args)
+        second = creator.create_svg(music)
+        self.assertEqual(len(written), 1)
+        self.assertEqual(second, SvgCreator(workers=1).create_svg(music))
+        self.assertEqual([number for number in first if first[number] != second[number]], [max(first)])
@@ -0,0 +1,64 @@
+import unittest
+import config.shaku_constants as consts
+from entities.shaku_note import ShakuNote
+from services.layout_context import LayoutContext
+from services.time_notation import ShakuRhythmNotation
+
+class TestShakuRhythmNotation(unittest.TestCase):
+    def setUp(self):
+        self.context = LayoutContext(2, 2, "Tozan")
+        self.rhy = ShakuRhythmNotation(self.context)
+
+    def _positions(self, lenghts):
+        positions = []
+        y = consts.PARTS_Y_START
+        for lenght in lenghts:
+            positions.append((100, y))
+            y += lenght / 2 * consts.NOTE_Y_SPACING
+        return positions
+
+    def test_fourth_notes_get_a_line_each(self):
+        lenghts = [8, 8]
+        notations = self.rhy.tozan_rhytms([1, 2], lenghts, self._positions(lenghts))
+        line_x = 100 + consts.NOTE_TO_RHYTM_SPACING
+        self.assertEqual(notations, [(line_x, 80, line_x, 90), (line_x, 128.0, line_x, 138.0)])
+
+    def test_eighth_cluster_gets_one_line(self):
+        lenghts = [4, 4, 4, 4]
+        notations = self.rhy.tozan_rhytms([1, 2, 3, 4], lenghts, self._positions(lenghts))
+        line_x = 100 + consts.NOTE_TO_RHYTM_SPACING
+        self.assertEqual(notations, [(line_x, 80, line_x, 152.0 + 10)])
+
+    def test_lonesome_eighth_gets_a_dot(self):
+        lenghts = [4, 8, 4]
+        notations = self.rhy.tozan_rhytms([1, 2, 3], lenghts, self._positions(lenghts))
+        x = 100 + consts.NOTE_TO_RHYTM_SPACING - 1
+        self.assertIn((x, 84, x + 5, 88), notations)
+
+    def test_break_does_not_get_rhythm_lines(self):
+        lenghts = [8, 8]
+        notations = self.rhy.tozan_rhytms([-1, -1], lenghts, self._positions(lenghts))
+        self.assertEqual(notations, [])
+
+    def test_overflowing_note_is_tied_to_ghost_note(self):
+        lenghts = [8, 16]
+        notations = self.rhy.tozan_rhytms([1, 2], lenghts, self._positions(lenghts))
+        ghost, position = notations[0]
+        self.assertIsInstance(ghost, ShakuNote)
+        self.assertEqual((ghost.pitch, ghost.lenght), (2, 8))
+        self.assertEqual(position, (100, 80 + self.context.measure_height))
+        self.assertEqual(len(notations[1]), 6)
+
+    def test_ghost_note_is_carried_to_next_measure(self):
+        lenghts = [8, 16, 8]
+        notations = self.rhy.tozan_rhytms([1, 2, 3], lenghts, self._positions(lenghts))
+        ghosts = [notation for notation in notations if isinstance(notation[0], ShakuNote)]
+        self.assertEqual(len(ghosts), 1)
+        line_x = 100 + consts.NOTE_TO_RHYTM_SPACING
+        ghost_y = 80 + self.context.measure_height
+        self.assertIn((line_x, ghost_y, line_x, ghost_y + 10), notations)
+
+    def test_notes_are_not_modified(self):
+        lenghts = [8, 16]
+        self.rhy.tozan_rhytms([1, 2], lenghts, self._positions(lenghts))
+        self.assertEqual(lenghts, [8, 16])
@@ -1,5 +1,4 @@
 from tkinter import Button, Entry, constants, Frame, ttk, Label, Checkbutton, BooleanVar, Menu
-import pygame
 import os
 from PIL import Image, ImageTk
 from services.filing import FileManager
@@ -318,6 +317,9 @@ class Buttons:
     def _relay_to_save_wav(self):
         self.commands.save_wav(self.main_ui.music)
 
+    def _relay_to_save_stems(self):
+        self.commands.export_stems(self.main_ui.music)
+
     def _relay_to_save_svg(self):
         self.commands.export_svg(self.main_ui.music, self.buttons["grid_option_choice"].get())
 
@@ -364,6 +366,7 @@ class Buttons:
         export_sound_options_menu = Menu(menu, tearoff=0)
         export_sound_options_menu.add_command(label="midi", command=self._relay_to_save_midi)
         export_sound_options_menu.add_command(label="wav", command=self._relay_to_save_wav)
+        export_sound_options_menu.add_command(label="wav stems", command=self._relay_to_save_stems)
         file_menu.add_cascade(label="Export Sound", menu=export_sound_options_menu)
         file_menu.add_separator()
         file_menu.add_command(label="Upload", command=self._relay_to_upload_aws_s3)
@@ -585,11 +588,11 @@ class PlayButton():
         self.owner = owner
         self.text = text
         self.button = Button(frame, text=self.text, font="Shakunotator", command=self.press)
-        self.player = MusicPlayer()
+        self.player = MusicPlayer(main_ui.audio_engine, main_ui.window.after)
 
     def press(self):
         """Play a generated audio of the music currently being edited"""
-        if pygame.mixer.music.get_busy():
-            pygame.mixer.music.stop()
+        if self.player.playing:
+            self.player.stop()
         else:
             self.player.play(self.main_ui.music.parts.values())
@@ -9,7 +9,9 @@ from ui.messages import ShakuMessage
 import config.shaku_constants as consts
 from services.conversions import GraphicsConverter as convert
 from services.positioning import ShakuPositions
-from services.time_notation import ShakuRhythmNotation
+from services.display_list import DisplayListBuilder, Glyph, grid_lines
+from services.layout_context import LayoutContext
+from services.audio_engine import AudioEngine
 
 class SheetCanvas(Frame): # look at messages ShakuQuery for a possible easier solution
     def __init__(self, frame, main_ui):
@@ -36,20 +38,25 @@ class SheetCanvas(Frame): # look at messages ShakuQuery for a possible easier so
     def resize_scroll(self, event):
         self.sheet.configure(scrollregion=self.sheet.bbox("all"))
 
-    def add_page(self, number, spacing=2):
-        page = Page(self.main_ui, self.frame, spacing)
+    def add_page(self, number, context=None):
+        page = Page(self.main_ui, self.frame, context)
         self.pages[number] = page
 
+    def remove_unused_pages(self):
+        """Remove pages after the last one with anything drawn on it, keeping first page"""
+        while len(self.pages) > 1 and not self.pages[len(self.pages)].in_use:
+            self.pages.pop(len(self.pages)).page.destroy()
+
     def clear_pages(self):
         for page in self.pages.values():
             page.clear()
 
     def draw_title_text(self, position, text, anchor, page):
         font = consts.TEXT_FONT + " " + str(consts.TEXT_FONT_SIZE)
-        return page.page.create_text(position, text=text, fill="black", anchor=anchor, font=font)
+        return page.page.create_text(position, text=text, fill="black", anchor=anchor, font=font, tags=("text",))
 
 class Page():
-    def __init__(self, main_ui, frame, spacing=2):
+    def __init__(self, main_ui, frame, context=None):
         width=consts.SHEET_SIZE[0]
         height=consts.SHEET_SIZE[1]
         self.page = Canvas(
@@ -59,51 +66,87 @@ class Page():
             background="white",
         )
         self.page.pack(side="right", padx=3, pady=5)
-        self.spacing = spacing
+        self.context = context if context is not None else LayoutContext.from_env(2)
+        self._grid_key = None
         self.clear()
-        self.map_of_canvas_objects_to_notes = {}
         self.main_ui = main_ui
 
     def clear(self):
-        self.page.delete("all")
+        """Remove notes, rhythm notations, misc notations and texts from page
+
+        The measure grid is kept, and only rebuilt if spacing or measure lenght of
+        page context has changed.
+        """
+        for layer in ("note", "rhythm", "misc", "text"):
+            self.clear_layer(layer)
         self.texts = {}
-        self._note_notations = []
-        self._time_notations = []
+        self._note_notations = set()
         self._misc_notations = []
-        self._grid = self._create_grid(self.page, self.spacing)
+        self.map_of_canvas_objects_to_notes = {}
+        grid_key = (self.context.spacing, self.context.measure_lenght)
+        if grid_key != self._grid_key:
+            self.clear_layer("grid")
+            self._grid = self._create_grid(self.page, *grid_key)
+            self.page.tag_lower("grid")
+            self._grid_key = grid_key
+
+    @property
+    def in_use(self):
+        """Get True if there are notes, rhythm notations or misc notations on page"""
+        return any(self.page.find_withtag(layer) for layer in ("note", "rhythm", "misc"))
+
+    def clear_layer(self, layer: str):
+        """Remove all canvas objects of a layer from page
+
+        Args:
+            layer: tag of layer ("grid", "note", "rhythm", "misc" or "text")
+        """
+        self.page.delete(layer)
 
     def _draw_grid_line(self, line: tuple, target_page: Canvas):
         return target_page.create_line(
             line,
             fill=convert().rgb_to_hex(consts.GRID_COLOR),
-            width=consts.GRID_LINE_WIDHT
+            width=consts.GRID_LINE_WIDHT,
+            tags=("grid",)
             )
 
-    def _create_grid(self, target_page: Canvas, spacing):
-        measure_lenght = int(os.getenv("MEASURE_LENGHT"))
-        x_axis = list(consts.GRID_X)
-        y_axis = list(consts.GRID_Y)
-        x_axis[1] -= (x_axis[1] - x_axis[0]) % (consts.NOTE_ROW_SPACING * spacing)
-        grid = []
-        increment = consts.NOTE_ROW_SPACING * spacing
-        for temp_x in range(x_axis[0], x_axis[1] + 3, increment):
-            grid.append(self._draw_grid_line((temp_x, y_axis[0], temp_x, y_axis[1]), target_page))
-        increment = consts.VERTICAL_SPACE_PER_FOURTH_NOTE * measure_lenght
-        for temp_y in range(y_axis[0], y_axis[1] + 1, increment):
-            grid.append(self._draw_grid_line((x_axis[0], temp_y, x_axis[1], temp_y), target_page))
-        return grid
-
-    def _draw_image(self, image, position):
+    def _create_grid(self, target_page: Canvas, spacing, measure_lenght):
+        return [self._draw_grid_line(line, target_page) for line in grid_lines(spacing, measure_lenght)]
+
+    def _draw_image(self, image, position, tags=()):
         return self.page.create_image(
             position[0]-2, position[1]-3,
-            anchor=constants.NW, image=image,
+            anchor=constants.NW, image=image, tags=tags
             )
 
-    def _draw_note(self, note: ShakuNote, image, position):
-        note_notation = self._draw_image(image, position)
+    def _draw_note(self, note: ShakuNote, image, position, tags=()):
+        note_notation = self._draw_image(image, position, tags)
         self.map_of_canvas_objects_to_notes[note_notation] = note
-        self._note_notations.append(note_notation)
+        self._note_notations.add(note_notation)
         self.page.tag_bind(note_notation, "<ButtonPress-1>", self._note_click)
+        return note_notation
+
+    def delete_note(self, note_notation):
+        """Remove a note drawn with _draw_note from page
+
+        Args:
+            note_notation: canvas id of the note
+        """
+        self.page.delete(note_notation)
+        self.map_of_canvas_objects_to_notes.pop(note_notation, None)
+        self._note_notations.discard(note_notation)
+
+    def delete_tagged(self, tag: str):
+        """Remove all canvas objects with given tag from page
+
+        Args:
+            tag: canvas tag of objects to remove
+        """
+        for item in self.page.find_withtag(tag):
+            self.map_of_canvas_objects_to_notes.pop(item, None)
+            self._note_notations.discard(item)
+        self.page.delete(tag)
 
     def _note_click(self, event):
         tag = event.widget.find_closest(event.x, event.y)
@@ -112,13 +155,20 @@ class Page():
         self.page.itemconfig(tag, image=image)
         self.main_ui.chosen_note = note
 
-    def draw_misc_notation(self, image, position):
+    def draw_misc_notation(self, image, position, tags=()):
         """Draw a non-pitch, non-duration shakuhachi sheet music notation on sheet
 
         Args:
-            notation: Reference to ShakuNotation instance describing notation
+            image: image of notation
+            position: (x, y) -coordinates of notation
+            tags: canvas tags of notation in addition to "misc". Defaults to ().
         """
-        self._misc_notations.append(self._draw_image(image, position))
+        self._misc_notations.append(self._draw_image(image, position, tags=("misc",) + tuple(tags)))
+
+    def clear_misc_notations(self):
+        """Remove all non-pitch, non-duration notations from page"""
+        self.clear_layer("misc")
+        self._misc_notations = []
 
 class UI:
     """Tkinter UI for Shakunotator
@@ -145,6 +195,13 @@ class UI:
         self._messages = []
         self._active_part = None #CAN WE DELETE THIS ? refactor
         self._chosen_note = None
+        self._display_lists = DisplayListBuilder()
+        self._audio_engine = AudioEngine()
+        self._note_items = {}
+        self._misc_revisions = {}
+        self._drawn_key = None
+        self._context = None
+        self._title = None
         self.note_images = {}
         self.extra_note_images = {}
         self.red_note_images = {}
@@ -195,6 +252,16 @@ class UI:
         """Set musical part of shakuhachi notation which is under editing"""
         self._active_part = new_part
 
+    @property
+    def display_lists(self):
+        """Get display list builder (and its layout and rhythm caches) shared by sheet drawing and exports"""
+        return self._display_lists
+
+    @property
+    def audio_engine(self):
+        """Get audio engine shared by playback and audio exports"""
+        return self._audio_engine
+
     @property
     def chosen_note(self):
         return self._chosen_note
@@ -204,7 +271,8 @@ class UI:
         self._chosen_note = note
 
     def destroy_all_windows(self):
-        """Clear all message windows and main window"""
+        """Clear all message windows and main window, and shut down audio engine"""
+        self._audio_engine.close()
         for i in self.messages:
             if i.state == "active":
                 i.window.destroy()
@@ -230,18 +298,19 @@ class UI:
         Args:
             notation: Reference to ShakuNotation instance describing notation
         """
-        measures = consts.MODE_DATA[os.getenv("MODE")]["MEASURES"] # base this on consts
+        context = self._context
         image = self._notation_images[notation.notation_type]
         duration_until = part.get_duration_until(notation.relative_note)
         pos = ShakuPositions()
-        rows = pos.get_row_count(self.music.spacing)
-        slots = pos.get_slot_count(measures)
-        rel_pos = pos.get_relative_positions([duration_until], rows, slots, measures, True)[0]
-        page = self._sheet_holder.pages[rel_pos["page"] + 1] # page +1 is happening a lot -> because page ID system needs to standardize to start from either 0 or 1
-        position = list(pos.get_coordinates(rel_pos, part.part_no, self.music.spacing, measures))
+        rel_pos = pos.get_relative_positions([duration_until], context.rows, context.slots, context.measures, True)[0]
+        page_no = rel_pos["page"] + 1 # page +1 is happening a lot -> because page ID system needs to standardize to start from either 0 or 1
+        if page_no > len(self._sheet_holder.pages):
+            self._sheet_holder.add_page(page_no, context)
+        page = self._sheet_holder.pages[page_no]
+        position = list(pos.get_coordinates(rel_pos, part.part_no, context))
         position[0] += consts.NOTATION_APPENDIX_X_FROM_NOTE
         position[1] += consts.NOTATION_APPENDIX_Y_FROM_NOTE
-        page.draw_misc_notation(image, position)
+        page.draw_misc_notation(image, position, (f"misc{part.part_no}",))
 
     def add_note(self, pitch: int, lenght: int):
         """Add note into music model and draw it on sheet
@@ -261,87 +330,114 @@ class UI:
         self.update()
         return True
 
-    def _draw_all_time_notations(self):
-        measures = consts.MODE_DATA[os.getenv("MODE")]["MEASURES"]
-        mode = os.getenv("MODE")
-        rhy = ShakuRhythmNotation(mode)
-        pos = ShakuPositions()
-        rows = pos.get_row_count(self.music.spacing)
-        slots = pos.get_slot_count(measures)
+    def _draw_time_notations(self, part: ShakuPart, layout, first_page: int=0):
+        tags = ("rhythm", f"rhythm{part.part_no}")
+        for item in self._display_lists.rhythm_items(part, layout, self._context, first_page):
+            if isinstance(item, Glyph):
+                self._draw_note(None, item.pitch, item.page, item.position, tags)
+            else:
+                self._draw_time_notation(item.points, item.page, tags)
 
-        for part in self.music.parts.values():
-            rel_pos = pos.get_relative_positions([note.lenght for note in part.notes], rows, slots, measures)
-            posses = [pos.get_coordinates(i, part.part_no, self.music.spacing, measures) for i in rel_pos]
-            if mode == "Tozan":
-                i = 0
-                while i < len(part.notes):
-                    orig_i = i
-                    page = rel_pos[i]["page"]
-                    while i < len(part.notes) and rel_pos[i]["page"] == page:
-                        i += 1
-                    temp_posses = [posses[x] for x in range(orig_i, i)]
-                    temp_notes = [part.notes[x] for x in range(orig_i, i)]
-                    notations = rhy.tozan_rhytms(temp_notes, temp_posses)
-                    for notation in notations:
-                        if isinstance(notation[0], ShakuNote): # "ghost note", a note needs to be redrawn after measure line
-                            note = notation[0]
-                            position = list(notation[1])
-                            if position[1] == consts.PARTS_Y_START:
-                                position[0] -= self.music.spacing * consts.NOTE_ROW_SPACING
-                            self._draw_note(None, note.pitch, page + 1, tuple(position))
-                        else:
-                            self._draw_time_notation(notation, page)
-
-    def _draw_time_notation(self, line, page):
-        page = self._sheet_holder.pages[page + 1]
+    def _draw_time_notation(self, line, page, tags=()):
+        page = self._sheet_holder.pages[page]
         fill = convert().rgb_to_hex(consts.NOTE_COLOR)
         width = consts.RHYTHM_NOTATION_WIDHT
-        page.page.create_line(line, fill=fill, width=width, smooth=True)
+        page.page.create_line(line, fill=fill, width=width, smooth=True, tags=tags)
 
-    def _draw_note(self, note, pitch, page_no, position):
+    def _draw_note(self, note, pitch, page_no, position, tags=()):
         image = self.note_images[pitch]
         if page_no > len(self._sheet_holder.pages):
-            self._sheet_holder.add_page(page_no, self.music.spacing)
+            self._sheet_holder.add_page(page_no, self._context)
         page = self._sheet_holder.pages[page_no]
-        page._draw_note(note, image, position)
+        return (page_no, page._draw_note(note, image, position, tags))
 
-    def _draw_all_notes(self):
-        measures = consts.MODE_DATA[os.getenv("MODE")]["MEASURES"]
-        positioner = ShakuPositions()
-        rows = positioner.get_row_count(self.music.spacing)
-        slots = positioner.get_slot_count(measures)
-        for part in self.music.parts.values():
-            rel_pos = positioner.get_relative_positions([note.lenght for note in part.notes], rows, slots, measures)
-            for i in range(len(part.notes)):
-                page = rel_pos[i]["page"]
-                position = positioner.get_coordinates(rel_pos[i], part.part_no, self.music.spacing, measures)
-                self._draw_note(part.notes[i], part.notes[i].pitch, page + 1, position)
+    def _redraw_part(self, part: ShakuPart, first_changed: int):
+        """Redraw notes and rhythm notations of a part from first changed note onward
 
-        self._draw_all_time_notations()
+        Args:
+            part: ShakuPart instance to redraw
+            first_changed: number of first note whose drawing is out of date
+        """
+        pages = self._sheet_holder.pages
+        layout = self._display_lists.layouts.get_layout(part, self._context)
+        items = self._note_items.setdefault(part.part_no, [])
+        for page_no, item in items[first_changed:]:
+            pages[page_no].delete_note(item)
+        del items[first_changed:]
+        tags = ("note", f"part{part.part_no}")
+        for glyph in self._display_lists.note_glyphs(part, layout, first_changed):
+            items.append(self._draw_note(part.notes[glyph.note], glyph.pitch, glyph.page, glyph.position, tags))
+        first_page = int(layout.pages[min(first_changed, len(layout) - 1)]) if len(layout) > 0 else 0
+        for page_no, page in pages.items():
+            if page_no > first_page:
+                page.delete_tagged(f"rhythm{part.part_no}")
+        self._draw_time_notations(part, layout, first_page)
+
+    def _redraw_misc_notations(self, part: ShakuPart):
+        """Redraw misc notations of a part, if it has changed since they were drawn
 
-    def _draw_all_misc_notations(self):
-        for part in self.music.parts.values():
-            for notation in part.notations:
-                self.draw_misc_notation(part, notation)
+        Args:
+            part: ShakuPart instance to redraw misc notations of
+        """
+        if self._misc_revisions.get(part.part_no) == part.revision:
+            return
+        for page in self._sheet_holder.pages.values():
+            page.delete_tagged(f"misc{part.part_no}")
+        for notation in part.notations:
+            self.draw_misc_notation(part, notation)
+        self._misc_revisions[part.part_no] = part.revision
+
+    def update(self, full: bool=False):
+        """Update sheet based on its music instance data
 
-    def update(self):
-        """Update sheet based on its music instance data"""
+        Only notes from the first changed note of each part onward, and misc notations
+        of changed parts are redrawn, unless music, spacing, measure lenght or mode have
+        changed since last update. Pages left empty at the end are removed.
+
+        Args:
+            full: If True, sheet is cleared and everything is redrawn. Defaults to False.
+        """
+        context = LayoutContext.from_env(self.music.spacing)
+        if full or self._drawn_key != (self.music, context.key):
+            self.full_redraw(context)
+        else:
+            for part in self.music.parts.values():
+                first_changed = part.consume_changes(self)
+                if first_changed is not None:
+                    self._redraw_part(part, first_changed)
+                self._redraw_misc_notations(part)
+            self._sheet_holder.remove_unused_pages()
+        self.draw_texts()
+
+    def full_redraw(self, context: LayoutContext=None):
+        """Clear sheet and redraw all notes, rhythm notations and misc notations
+
+        Args:
+            context: LayoutContext to draw with, built from music spacing and environment if None
+        """
+        if context is None:
+            context = LayoutContext.from_env(self.music.spacing)
+        self._context = context
         for page in self._sheet_holder.pages.values():
-            page.spacing = self.music.spacing
+            page.context = context
         self._sheet_holder.clear_pages()
-        self._draw_all_notes()
-        self._draw_all_misc_notations()
-        self.draw_texts()
+        self._note_items = {}
+        self._misc_revisions = {}
+        for part in self.music.parts.values():
+            part.consume_changes(self)
+            self._redraw_part(part, 0)
+            self._redraw_misc_notations(part)
+        self._sheet_holder.remove_unused_pages()
+        self._drawn_key = (self.music, context.key)
 
     def draw_texts(self):
         """Draw name and composer on sheet"""
         self._erase_title_texts()
         front_page = self._sheet_holder.pages[1]
-        name_pos = consts.NAME_POSITION
-        front_page.texts["name"] = self._sheet_holder.draw_title_text(name_pos, self.music.name, constants.NE, front_page)
-        composer_pos = consts.COMPOSER_POSITION
-        composer = self.music.composer
-        front_page.texts["composer"] = self._sheet_holder.draw_title_text(composer_pos, composer, constants.NW, front_page)
+        name, composer = self._display_lists.title_texts(self.music)
+        for key, text in (("name", name), ("composer", composer)):
+            anchor = constants.NE if text.align == "right" else constants.NW
+            front_page.texts[key] = self._sheet_holder.draw_title_text(text.position, text.text, anchor, front_page)
 
     def _erase_title_texts(self):
         front_page = self._sheet_holder.pages[1]
@@ -358,6 +454,22 @@ class UI:
         self.music.load_json(data)
         self.update()
 
+    def show_progress(self, message: str=None):
+        """Show progress of a long running task in window title
+
+        Args:
+            message: progress to show, original title is restored if None. Defaults to None.
+        """
+        if message is None:
+            if self._title is not None:
+                self._window.title(self._title)
+                self._title = None
+        else:
+            if self._title is None:
+                self._title = self._window.title()
+            self._window.title(message)
+        self._window.update_idletasks()
+
     def clear_messages(self):
         """Remove all existing message windows"""
         for message in self._messages:
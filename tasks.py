@@ -11,6 +11,13 @@ def test(ctx):
     os.chdir('./src')
     ctx.run("pytest")
 
+@task
+def benchmark(ctx):
+    os.chdir('./src')
+    ctx.run("python3 -m benchmarks.rhythm_benchmark")
+    ctx.run("python3 -m benchmarks.glyph_benchmark")
+    ctx.run("python3 -m benchmarks.pdf_benchmark")
+
 @task
 def coverage(ctx):
     ctx.run("coverage run --branch -m pytest src")